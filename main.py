@@ -27,16 +27,15 @@
 
 ## @package main resolves some input variables and start the computing
 #
-#  The computing itself is performed in main_src.runoff
+#  The computing itself is performed in main_src.runoff,
+#  the parameters are given by main_src.config.Config
 
 
 
 
 import sys
 import os
-from    main_src.tools.tools import logical_argv
-from    main_src.tools.tools import get_argv
-import  main_src.constants   as constants
+from    main_src.config      import Config
 
 '''
 onlyshallowsurface
@@ -47,18 +46,12 @@ surfaceandsubsurfacestreamflow
 '''
 
 
-print "--------------------- INPUT PARAMETERS ---------------------"
-for item in sys.argv:
-  print item
-print "--------------------- ---------------- ---------------------"; print
-
-
 if __name__ == "__main__":
 
-
-  logical_argv(constants.PARAMETER_ARCGIS)
-  logical_argv(constants.PARAMETER_EXTRA_OUTPUT)
-  logical_argv(constants.PARAMETER_MFDA)
+  print "--------------------- INPUT PARAMETERS ---------------------"
+  for item in sys.argv:
+    print item
+  print "--------------------- ---------------- ---------------------"; print
 
 
 
@@ -75,7 +68,7 @@ if __name__ == "__main__":
   #sys.argv.append('dpre')
   sys.argv.append('full')
 
-  sys.argv.append('true'); logical_argv(constants.PARAMETER_DEBUG_PRT)
+  sys.argv.append('true')
 
 
 
@@ -84,5 +77,7 @@ if __name__ == "__main__":
 
 
   sys.argv.append(sys.path[0]+os.sep+'prt_times.in')
-  import main_src.runoff
+
+  import main_src.runoff as runoff
+  runoff.run(Config.from_argv(sys.argv))
 
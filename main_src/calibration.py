@@ -0,0 +1,448 @@
+## @package main_src.calibration calibration of the parameters against the observed hydrograph
+#
+#  The parameters of main_src.ensemble.Member are varied within the given ranges
+#  by the Nelder-Mead simplex method until the simulated discharge fits the
+#  observed one. Each parameter set is computed by main_src.runoff.run from the
+#  prepared data (Config.indata), which are loaded only once in each process.
+#  The parameter sets of the simplex are computed in parallel in a process pool.
+#
+#  The calibration is given by a text file, one keyword on each line:
+#
+#      observed        observed.txt
+#      target          point000
+#      metric          nse
+#      processes       4
+#      max_evaluations 100
+#      parameter       k                 0.2 5.0
+#      parameter       n                 0.5 2.0
+#      parameter       surface_retention 0.0 5.0
+#
+#    - \b observed   file with the observed discharge, time [s];discharge [m3/s] on each line
+#    - \b target     simulated discharge, \e pointNNN for the hydrograph point NNN,
+#                    or a column of outlets.dat (e.g. \e total) in the outlet-only mode
+#    - \b metric     nse | kge | peak, see metrics
+#    - \b processes  number of the processes of the pool
+#    - \b max_evaluations maximum number of the parameter sets
+#    - \b parameter  name, minimum and maximum of the varied parameter, see main_src.ensemble.Member
+#
+#  Every evaluated parameter set is stored in the cache calibration/cache.txt in the
+#  output directory together with its metrics, the cached sets are not computed again
+#  in the following calibrations. The cache is valid only for the same observed discharge,
+#  target and computation (the parameters of the computation and the content of the prepared
+#  data and the rainfall files), their digest is stored in the header of the cache, the cache
+#  is cleared if it differs. The best set is written in calibration/best.txt in the
+#  format of the members file of main_src.ensemble.
+#
+#  <em>python -m main_src.calibration calibration.txt [parameters of main.py]</em>
+#
+
+import os
+import sys
+import copy
+import shutil
+import hashlib
+import multiprocessing
+import numpy as np
+
+import main_src.io_functions.prt          as prt
+import main_src.tools.save_load_data      as sld
+import main_src.tools.prep_cache          as prep_cache
+from   main_src.config                import Config
+from   main_src.ensemble              import Member
+from   main_src.tools.resolve_partial_computing import names
+import main_src.runoff                    as runoff
+
+
+
+## Goodness of fit of the simulated discharge
+#
+#  @param sim simulated discharge at the times of the observation
+#  @param obs observed discharge
+#  @return dictionary nse, kge, peak
+#    - \b nse  Nash-Sutcliffe efficiency
+#    - \b kge  Kling-Gupta efficiency
+#    - \b peak relative error of the peak discharge
+def metrics(sim,obs):
+  sim = np.asarray(sim,float)
+  obs = np.asarray(obs,float)
+
+  var_obs = ((obs - obs.mean())**2).sum()
+  if var_obs > 0.0:
+    nse = 1.0 - ((sim - obs)**2).sum()/var_obs
+  else:
+    nse = -np.inf
+
+  if obs.std() > 0.0 and sim.std() > 0.0 and obs.mean() != 0.0:
+    r     = np.corrcoef(sim,obs)[0][1]
+    alpha = sim.std()/obs.std()
+    beta  = sim.mean()/obs.mean()
+    kge   = 1.0 - np.sqrt((r - 1.0)**2 + (alpha - 1.0)**2 + (beta - 1.0)**2)
+  else:
+    kge = -np.inf
+
+  if obs.max() != 0.0:
+    peak = (sim.max() - obs.max())/obs.max()
+  else:
+    peak = np.inf
+
+  return {'nse' : nse, 'kge' : kge, 'peak' : peak}
+
+
+## Objective of the metric, which is minimized
+objectives = {'nse'  : lambda m: 1.0 - m['nse'],
+              'kge'  : lambda m: 1.0 - m['kge'],
+              'peak' : lambda m: abs(m['peak'])}
+
+
+
+## Reads the observed discharge
+#
+#  @return times [s], discharge [m3/s]
+def load_observed(file_):
+  x = []
+  with open(file_,'r') as f:
+    for line in f:
+      line = line.strip()
+      if line == '' or line.startswith('#'):
+        continue
+      z = line.replace(';',' ').split()
+      x.append([float(z[0]),float(z[1])])
+  if len(x) == 0:
+    prt.error('No observed discharge in', file_)
+  x = np.array(x,float)
+  return x[:,0], x[:,1]
+
+
+
+## Reads the simulated discharge
+#
+#  @param output output directory of the computation
+#  @param target pointNNN or a column of outlets.dat
+#  @return times [s], discharge [m3/s]
+def load_simulated(output,target):
+  if target.startswith('point'):
+    file_ = output+os.sep+target+'.dat'
+    columns = ['Q[m3/s]', 'Surface_Flow[m3/s]', 'Sheet_Flow[m3/s]']
+  else:
+    file_ = output+os.sep+'outlets.dat'
+    columns = [target]
+
+  header = None
+  with open(file_,'r') as f:
+    for line in f:
+      if line.startswith('# time') or line.startswith('# Time'):
+        header = line[1:].strip().split(';')
+  if header is None:
+    prt.error('Header of the simulated discharge not found in', file_)
+
+  col = None
+  for name_ in columns:
+    if name_ in header:
+      col = header.index(name_)
+      break
+  if col is None:
+    prt.error('Simulated discharge', target, 'not found in', file_)
+
+  # the records of the surface cells end with the separator, only the two columns are read
+  x = np.loadtxt(file_,delimiter=';',comments='#',usecols=(0,col),ndmin=2)
+  return x[:,0], x[:,1]
+
+
+
+## Parameters of the computation, which do not change the simulated discharge
+output_parameters = ['output', 'output_queue', 'arcgis', 'debug_prt', 'print_time', 'prep_cache',
+                     'mass_balance', 'field_store', 'field_interval', 'field_compression',
+                     'progress_interval', 'progress_json', 'verify_steps', 'verify_cells',
+                     'verify_atol', 'verify_rtol']
+
+## Parameters of the computation given by files, their content is in the digest of the computation
+file_parameters = ['indata', 'rainfall_file', 'rainfall_zones', 'rainfall_radar']
+
+
+
+## Returns the digest of the file content, other values are returned as they are
+def file_digest(file_):
+  if file_ is None or not os.path.isfile(file_):
+    return file_
+  h = hashlib.sha1()
+  with open(file_,'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), ''):
+      h.update(block)
+  return h.hexdigest()
+
+
+
+## Returns the digest of everything the cached metrics depend on except the parameter set
+#
+#  @param config main_src.config.Config of the computations
+#  @param target simulated discharge
+#  @param obs_times, obs observed discharge
+def context_digest(config,target,obs_times,obs):
+  items = []
+  for name_ in sorted(vars(config)):
+    if name_ in output_parameters:
+      continue
+    value = getattr(config,name_)
+    if name_ in file_parameters:
+      value = file_digest(value)
+    items.append((name_,value))
+  return prep_cache.digest('calibration',target,np.asarray(obs_times,float),np.asarray(obs,float),items)
+
+
+
+## Prepared data of the process, loaded only once
+saved = None
+
+
+
+## Computes one parameter set in the process
+#
+#  @param job config, keyword arguments of Member, target, observed times and discharge
+#  @return metrics or None if the computation fails or its discharge cannot be read
+def evaluate(job):
+  global saved
+  config, kwargs, target, obs_times, obs = job
+
+  if saved is None:
+    saved = sld.load_data(config.indata)
+
+  member = Member('run_' + str(os.getpid()), **kwargs)
+  member_config = member.configure(config)
+  try:
+    runoff.run(member_config,saved,member)
+    times, sim = load_simulated(member_config.output,target)
+  except (SystemExit, IOError, ValueError):
+    return None
+  finally:
+    if os.path.exists(member_config.output):
+      shutil.rmtree(member_config.output)
+
+  return metrics(np.interp(obs_times,times,sim),obs)
+
+
+
+## Redirects the messages of the pool process into its log file
+def init_worker(dir_):
+  sys.stdout = open(dir_+os.sep+'worker_'+str(os.getpid())+'.log','w')
+
+
+
+## Calibration of the parameters
+#
+class Calibration():
+
+  ## the constructor
+  #
+  #  @param config main_src.config.Config of the computations, the computation has to be roff
+  #  @param file_ calibration file, see the package documentation
+  def __init__(self,config,file_):
+
+    self.config = copy.copy(config)
+    if self.config.partial_computing != 'roff':
+      prt.error('Calibration is computed only from the prepared data, partial computing has to be roff')
+
+    self.params    = []
+    self.lower     = []
+    self.upper     = []
+    self.metric    = 'nse'
+    self.processes = 1
+    self.max_evaluations = 100
+    self.target    = None
+    observed       = None
+
+    with open(file_,'r') as f:
+      for line in f:
+        z = line.split()
+        if len(z) == 0 or z[0].startswith('#'):
+          continue
+        if z[0] == 'parameter':
+          if z[1] not in Member.columns or z[1] == 'name':
+            prt.error('Unknown parameter of the calibration:', z[1])
+          self.params.append(z[1])
+          self.lower.append(float(z[2]))
+          self.upper.append(float(z[3]))
+        elif z[0] == 'observed':
+          observed = z[1]
+        elif z[0] == 'target':
+          self.target = z[1]
+        elif z[0] == 'metric':
+          self.metric = z[1]
+        elif z[0] == 'processes':
+          self.processes = int(z[1])
+        elif z[0] == 'max_evaluations':
+          self.max_evaluations = int(z[1])
+        else:
+          prt.error('Unknown keyword of the calibration:', z[0])
+
+    if len(self.params) == 0:
+      prt.error('No parameter of the calibration is given')
+    if observed is None or self.target is None:
+      prt.error('Observed discharge and target have to be given')
+    if self.metric not in objectives:
+      prt.error('Metric has to be', ' or '.join(sorted(objectives)))
+    if self.target.startswith('point') and self.config.outlet_only:
+      prt.error('Hydrographs of the points are not written in the outlet-only mode')
+    if not self.target.startswith('point') and not self.config.outlet_only:
+      prt.error('Target', self.target, 'is a column of outlets.dat, the outlet-only mode has to be set')
+
+    self.lower = np.array(self.lower,float)
+    self.upper = np.array(self.upper,float)
+    self.obs_times, self.obs = load_observed(observed)
+    self.context = context_digest(self.config,self.target,self.obs_times,self.obs)
+
+    if self.config.output is None:
+      self.config.output = sld.load_data(self.config.indata)[names.index('output')]
+    self.dir_ = self.config.output+os.sep+'calibration'
+    if not os.path.exists(self.dir_):
+      os.makedirs(self.dir_)
+    self.config.output = self.dir_
+
+    self.cache = {}
+    self.n_evaluations = 0
+    self.__load_cache()
+
+    prt.message('Calibration:')
+    prt.message('\t', ', '.join(self.params), 'against', observed, 'at', self.target, 'metric', self.metric)
+    prt.message('\t', len(self.cache), 'parameter sets in the cache')
+
+
+  ## key of the parameter set in the cache
+  def __key(self,values):
+    return tuple([float('%.10g' % v) for v in values])
+
+
+  ## Loads the cache of the same parameters and the same computation
+  #
+  #  the first line of the cache is the digest of the computation (context_digest),
+  #  the second one the names of the columns
+  def __load_cache(self):
+    self.cache_file = self.dir_+os.sep+'cache.txt'
+    header = ['# computation ' + self.context, '# ' + ';'.join(self.params) + ';nse;kge;peak']
+    if os.path.exists(self.cache_file):
+      with open(self.cache_file,'r') as f:
+        lines = f.read().splitlines()
+      if lines[:2] == header:
+        n = len(self.params)
+        for line in lines[2:]:
+          z = [float(v) for v in line.split(';')]
+          self.cache[self.__key(z[:n])] = {'nse' : z[n], 'kge' : z[n+1], 'peak' : z[n+2]}
+        self.cache_out = open(self.cache_file,'a')
+        return
+      prt.message('Calibration: the cache was computed with other parameters, observed discharge or computation,',
+                  'the cache is cleared')
+    self.cache_out = open(self.cache_file,'w')
+    self.cache_out.write('\n'.join(header) + '\n')
+
+
+  ## Returns the objectives of the parameter sets
+  #
+  #  the sets not in the cache are computed in the pool
+  #
+  #  @param points parameter sets scaled to 0..1
+  def __objective(self,points):
+    values = [self.__key(self.lower + np.clip(p,0.0,1.0)*(self.upper - self.lower)) for p in points]
+
+    new = []
+    for v in values:
+      if v not in self.cache and v not in new:
+        new.append(v)
+
+    if len(new) > 0:
+      jobs = [(self.config, dict(zip(self.params,v)), self.target, self.obs_times, self.obs) for v in new]
+      if self.processes > 1:
+        # the pool is started only if a parameter set is not in the cache
+        if self.pool is None:
+          self.pool = multiprocessing.Pool(self.processes,init_worker,(self.dir_,))
+        results = self.pool.map(evaluate,jobs)
+      else:
+        results = [evaluate(job) for job in jobs]
+      for v, m in zip(new,results):
+        if m is None:
+          prt.message('Calibration: computation of', dict(zip(self.params,v)), 'failed')
+          m = {'nse' : -np.inf, 'kge' : -np.inf, 'peak' : np.inf}
+        self.cache[v] = m
+        self.cache_out.write(';'.join([repr(x) for x in v]) + ';' + repr(m['nse']) + ';' + \
+          repr(m['kge']) + ';' + repr(m['peak']) + '\n')
+      self.cache_out.flush()
+
+    self.n_evaluations += len(values)
+    return [objectives[self.metric](self.cache[v]) for v in values]
+
+
+  ## Runs the calibration
+  #
+  #  @param tol the simplex is stopped if the difference of its objectives is lower
+  #  @return best parameters, metrics
+  def run(self,tol=1e-4):
+
+    self.pool = None
+    n = len(self.params)
+
+    # Nelder-Mead simplex in the parameters scaled to 0..1
+    simplex = [np.ones(n)*0.5]
+    for i in range(n):
+      p = np.ones(n)*0.5
+      p[i] = 0.75
+      simplex.append(p)
+    f = self.__objective(simplex)
+
+    while self.n_evaluations < self.max_evaluations:
+      order   = np.argsort(f)
+      simplex = [simplex[k] for k in order]
+      f       = [f[k] for k in order]
+      prt.message('Calibration:', self.n_evaluations, 'evaluations, best', self.metric, 'objective', f[0])
+      if abs(f[-1] - f[0]) < tol:
+        break
+
+      centroid = np.mean(simplex[:-1],axis=0)
+      reflected = np.clip(centroid + (centroid - simplex[-1]),0.0,1.0)
+      fr = self.__objective([reflected])[0]
+
+      if fr < f[0]:
+        expanded = np.clip(centroid + 2.0*(centroid - simplex[-1]),0.0,1.0)
+        fe = self.__objective([expanded])[0]
+        if fe < fr:
+          simplex[-1], f[-1] = expanded, fe
+        else:
+          simplex[-1], f[-1] = reflected, fr
+      elif fr < f[-2]:
+        simplex[-1], f[-1] = reflected, fr
+      else:
+        contracted = centroid + 0.5*(simplex[-1] - centroid)
+        fc = self.__objective([contracted])[0]
+        if fc < f[-1]:
+          simplex[-1], f[-1] = contracted, fc
+        else:
+          simplex = [simplex[0]] + [simplex[0] + 0.5*(p - simplex[0]) for p in simplex[1:]]
+          f = [f[0]] + self.__objective(simplex[1:])
+
+    if self.pool is not None:
+      self.pool.close()
+      self.pool.join()
+    self.cache_out.close()
+
+    k = int(np.argmin(f))
+    best = self.__key(self.lower + np.clip(simplex[k],0.0,1.0)*(self.upper - self.lower))
+    m = self.cache[best]
+
+    member = Member('best', **dict(zip(self.params,best)))
+    with open(self.dir_+os.sep+'best.txt','w') as f_:
+      f_.write('# ' + ';'.join(Member.columns) + '\n')
+      f_.write(str(member) + '\n')
+
+    prt.message('Calibration:')
+    prt.message('\t', self.n_evaluations, 'evaluations,', len(self.cache), 'parameter sets in the cache')
+    for name_, v in zip(self.params,best):
+      prt.message('\t', name_, '=', v)
+    prt.message('\t', 'NSE', m['nse'], 'KGE', m['kge'], 'peak error', m['peak'])
+
+    return dict(zip(self.params,best)), m
+
+
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    sys.exit('usage: python -m main_src.calibration calibration_file [parameters of main.py]')
+  config = Config.from_argv(['main.py'] + sys.argv[2:])
+  prt.setup(config.arcgis, config.debug_prt)
+  Calibration(config,sys.argv[1]).run()
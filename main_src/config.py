@@ -0,0 +1,233 @@
+## @package main_src.config parameters of one computation
+#
+#  The computation is started by main_src.runoff.run with a Config object:
+#
+#      from main_src.config import Config
+#      import main_src.runoff as runoff
+#
+#      config = Config(indata = 'data.save', output = 'out', end_time = 60.0,
+#                      partial_computing = 'roff', type_of_computing = 'shallowandrillsurface')
+#      runoff.run(config)
+#
+#  Several computations can be performed in one process, each with its own Config.
+#
+#  Config.from_argv reads the parameters in the order of the command line
+#  and the arcgis toolbox (see main_src.constants), '-' means the parameter is not given.
+#
+
+import sys
+
+import main_src.constants as constants
+from   main_src.tools.tools import comp_type
+
+
+## names of the parameters in the order of the command line
+#
+#  the index of each name is given by constants.PARAMETER_*
+argv_names = {constants.PARAMETER_DMT                     : 'dmt',
+              constants.PARAMETER_SOIL                    : 'soil',
+              constants.PARAMETER_SOIL_TYPE               : 'soil_type',
+              constants.PARAMETER_VEGETATION              : 'vegetation',
+              constants.PARAMETER_VEGETATION_TYPE         : 'vegetation_type',
+              constants.PARAMETER_PATH_TO_RAINFALL_FILE   : 'rainfall_file',
+              constants.PARAMETER_MAX_DELTA_T             : 'max_delta_t',
+              constants.PARAMETER_END_TIME                : 'end_time',
+              constants.PARAMETER_SURFACE_RETENTION       : 'surface_retention',
+              constants.PARAMETER_POINTS                  : 'points',
+              constants.PARAMETER_PATH_TO_OUTPUT_DIRECTORY: 'output',
+              constants.PARAMETER_TYPE_COMPUTING          : 'type_of_computing',
+              constants.PARAMETER_MFDA                    : 'mfda',
+              constants.PARAMETER_SOILVEGTABLE            : 'soilvegtable',
+              constants.PARAMETER_SOILVEGTABLE_CODE       : 'soilvegtable_code',
+              constants.PARAMETER_STREAM                  : 'stream',
+              constants.PARAMETER_STREAMTABLE             : 'streamtable',
+              constants.PARAMETER_STREAMTABLE_CODE        : 'streamtable_code',
+              constants.PARAMETER_ARCGIS                  : 'arcgis',
+              constants.PARAMETER_EXTRA_OUTPUT            : 'extra_output',
+              constants.PARAMETER_INDATA                  : 'indata',
+              constants.PARAMETER_PARTIAL_COMPUTING       : 'partial_computing',
+              constants.PARAMETER_DEBUG_PRT               : 'debug_prt',
+              constants.PARAMETER_PRINT_TIME              : 'print_time',
+              constants.PARAMETER_PRECISION               : 'precision',
+              constants.PARAMETER_MASS_BALANCE            : 'mass_balance',
+              constants.PARAMETER_RAINFALL_ZONES          : 'rainfall_zones',
+              constants.PARAMETER_RAINFALL_RADAR          : 'rainfall_radar',
+              constants.PARAMETER_OUTPUT_QUEUE            : 'output_queue',
+              constants.PARAMETER_FIELD_STORE             : 'field_store',
+              constants.PARAMETER_FIELD_INTERVAL          : 'field_interval',
+              constants.PARAMETER_FIELD_COMPRESSION       : 'field_compression',
+              constants.PARAMETER_OUTLET_ONLY             : 'outlet_only',
+              constants.PARAMETER_RAINFALL_FACTOR         : 'rainfall_factor',
+              constants.PARAMETER_PREP_CACHE              : 'prep_cache',
+              constants.PARAMETER_PROGRESS_INTERVAL       : 'progress_interval',
+              constants.PARAMETER_PROGRESS_JSON           : 'progress_json',
+              constants.PARAMETER_VERIFY_STEPS            : 'verify_steps',
+              constants.PARAMETER_VERIFY_CELLS            : 'verify_cells',
+              constants.PARAMETER_VERIFY_ATOL             : 'verify_atol',
+              constants.PARAMETER_VERIFY_RTOL             : 'verify_rtol',
+              constants.PARAMETER_HYDROGRAPH_INTERVAL     : 'hydrograph_interval'}
+
+## parameters with the true/false value
+logical = ['mfda', 'arcgis', 'extra_output', 'debug_prt', 'outlet_only']
+
+## parameters with the int value
+ints = ['output_queue', 'field_compression', 'verify_steps', 'verify_cells']
+
+## parameters with the float value
+floats = ['max_delta_t', 'end_time', 'surface_retention', 'mass_balance', 'field_interval', 'rainfall_factor',
+          'progress_interval', 'verify_atol', 'verify_rtol', 'hydrograph_interval']
+
+
+
+## Parameters of one computation
+#
+#  None means the parameter is not given, in the roff computation
+#  the value from the prepared data is then used
+#
+class Config(object):
+
+  def __init__(self, **kwargs):
+
+    ## digital elevation model
+    self.dmt = None
+    ## soil polygons
+    self.soil = None
+    ## soil type field
+    self.soil_type = None
+    ## vegetation polygons
+    self.vegetation = None
+    ## vegetation type field
+    self.vegetation_type = None
+    ## rainfall file in the cumulative form [min] [mm]
+    self.rainfall_file = None
+    ## maximum time step [s]
+    self.max_delta_t = None
+    ## end time of the computation [min]
+    self.end_time = None
+    ## surface retention [mm]
+    self.surface_retention = None
+    ## points of the hydrographs
+    self.points = None
+    ## output directory
+    self.output = None
+    ## type of computing, see main_src.tools.tools.comp_type
+    self.type_of_computing = None
+    ## multi flow direction algorithm
+    self.mfda = None
+    ## soil and vegetation table
+    self.soilvegtable = None
+    ## code of the soil and vegetation table
+    self.soilvegtable_code = None
+    ## stream shapefile
+    self.stream = None
+    ## stream shape table
+    self.streamtable = None
+    ## code of the stream shape table
+    self.streamtable_code = None
+    ## arcgis messages and rasters
+    self.arcgis = False
+    ## extra outputs in the hydrographs
+    self.extra_output = False
+    ## prepared data file
+    self.indata = None
+    ## full | dpre | roff
+    self.partial_computing = 'roff'
+    ## debug messages
+    self.debug_prt = False
+    ## file with the times of the water level rasters
+    self.print_time = None
+    ## float64 | float32, see main_src.tools.precision
+    self.precision = 'float64'
+    ## threshold of the relative error of the mass balance
+    self.mass_balance = 0.01
+    ## ascii raster of the rainfall gauge zones
+    self.rainfall_zones = None
+    ## stack of the radar rainfall rasters
+    self.rainfall_radar = None
+    ## size of the queue of the output writer, 0 for the synchronous output, see main_src.io_functions.writer
+    self.output_queue = 100
+    ## comma separated variables of the field store, see main_src.io_functions.field_store
+    self.field_store = None
+    ## interval of the field store records [s], 0 for each time step
+    self.field_interval = 0.0
+    ## zlib compression level of the field store, 0 for no compression
+    self.field_compression = 6
+    ## only the outflow of the outlets is recorded, see main_src.io_functions.outlets
+    self.outlet_only = False
+    ## multiplier of the rainfall, see main_src.processes.rainfall.ScaledRainfall
+    self.rainfall_factor = 1.0
+    ## directory of the preparation cache, see main_src.tools.prep_cache
+    self.prep_cache = None
+    ## minimum wall clock time between the progress reports [s], 0 for each time step, see main_src.io_functions.progress_bar
+    self.progress_interval = 5.0
+    ## file of the progress reports in JSON lines
+    self.progress_json = None
+    ## number of the time steps verified by the scalar computation, 0 for no verification, see main_src.tools.verification
+    self.verify_steps = 0
+    ## number of the sampled cells of the verification, 0 for all cells
+    self.verify_cells = 0
+    ## absolute tolerance of the verification
+    self.verify_atol = 1e-12
+    ## relative tolerance of the verification
+    self.verify_rtol = 1e-9
+    ## interval of the hydrograph records [s], 0 for each time step, see main_src.io_functions.hydrographs
+    self.hydrograph_interval = 0.0
+
+    for key in kwargs:
+      if not hasattr(self,key):
+        sys.exit('Unknown parameter of the computation: ' + key)
+      setattr(self,key,kwargs[key])
+
+
+  ## Creates the config from the command line parameters
+  #
+  #  @param argv sys.argv, the first item is the name of the script
+  @classmethod
+  def from_argv(cls, argv):
+    kwargs = {}
+    for id_ in argv_names:
+      if id_+1 >= len(argv):
+        continue
+      value = argv[id_+1]
+      name  = argv_names[id_]
+      if value == '-' or value is None:
+        continue
+      if name in logical:
+        value = to_logical(value)
+      elif name in ints:
+        value = int(value)
+      elif name in floats:
+        value = float(value)
+      kwargs[name] = value
+    return cls(**kwargs)
+
+
+  ## Returns the parameters in the order of the command line
+  def to_argv(self):
+    argv = ['main.py']
+    for id_ in sorted(argv_names):
+      value = getattr(self,argv_names[id_])
+      argv.append('-' if value is None else value)
+    return argv
+
+
+  ## Returns rill, subflow, stream, diffuse, see main_src.tools.tools.comp_type
+  def comp_type(self,co_=""):
+    return comp_type(self.type_of_computing,co_)
+
+
+  def __str__(self):
+    return '\n'.join([argv_names[id_] + ' = ' + str(getattr(self,argv_names[id_])) for id_ in sorted(argv_names)])
+
+
+
+## Transfers string 'true'/'false' to a logical True/False
+#
+def to_logical(value):
+  if type(value) == bool:
+    return value
+  if str(value).lower().strip() == 'true':
+    return True
+  elif str(value).lower().strip() == 'false':
+    return False
+  sys.exit('Logical parameter are not assign correctly...')
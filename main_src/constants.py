@@ -34,6 +34,26 @@ PARAMETER_PARTIAL_COMPUTING = 21
 PARAMETER_DEBUG_PRT = 22
 PARAMETER_PRINT_TIME = 23
 
+# optional input parameters, default is used if not given or '-'
+PARAMETER_PRECISION = 24
+PARAMETER_MASS_BALANCE = 25
+PARAMETER_RAINFALL_ZONES = 26
+PARAMETER_RAINFALL_RADAR = 27
+PARAMETER_OUTPUT_QUEUE = 28
+PARAMETER_FIELD_STORE = 29
+PARAMETER_FIELD_INTERVAL = 30
+PARAMETER_FIELD_COMPRESSION = 31
+PARAMETER_OUTLET_ONLY = 32
+PARAMETER_RAINFALL_FACTOR = 33
+PARAMETER_PREP_CACHE = 34
+PARAMETER_PROGRESS_INTERVAL = 35
+PARAMETER_PROGRESS_JSON = 36
+PARAMETER_VERIFY_STEPS = 37
+PARAMETER_VERIFY_CELLS = 38
+PARAMETER_VERIFY_ATOL = 39
+PARAMETER_VERIFY_RTOL = 40
+PARAMETER_HYDROGRAPH_INTERVAL = 41
+
 
 # calculation constants
 FB = math.pi / 4 # facet boundary
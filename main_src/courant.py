@@ -2,9 +2,6 @@
 
 
 import math
-import main_src.constants         as constants
-from   main_src.tools.tools       import comp_type
-from   main_src.tools.tools       import get_argv
 import main_src.io_functions.prt  as prt
 
 
@@ -18,7 +15,8 @@ class Courant():
 
   ## constructor
   #
-  def __init__(self):
+  #  @param max_delta_t maximum time step [s]
+  def __init__(self,max_delta_t):
     #self.orig_dt = dt
     self.maxh   = 0
     self.cour_speed  = 0
@@ -33,7 +31,7 @@ class Courant():
     self.co = 'sheet'
     self.co_pre = 'sheet'
     self.maxratio = 10
-    self.max_delta_t = float(get_argv(constants.PARAMETER_MAX_DELTA_T))
+    self.max_delta_t = float(max_delta_t)
     self.max_delta_t_mult = 1.0
 
 
@@ -61,7 +59,7 @@ class Courant():
   def initial_time_step(self,sur):
     sumA = sumB = sumHCrit = 0
     count = 0
-    only_surface = comp_type('surface')
+    only_surface = sur.only_surface
 
 
 
@@ -110,21 +108,25 @@ class Courant():
 
   ## Returns the adjusted/unchanged time step after a time step computation is completed.
   #
-  #  Also returns the ratio for the rill computation division.
+  #  Also adjusts the ratio for the rill computation division in each cell.
   #
-  def courant(self,rainfall,delta_t,efect_vrst,ratio):
+  #  @param ratio array of the numbers of the rill sub-steps, changed in place
+  #  @param rill_courant array of the rill Courant numbers of the time step
+  def courant(self,rainfall,delta_t,efect_vrst,ratio,rill_courant):
 
 
-    # ratio se muze zmensit  a max_delta_t_mult zvetsit
-    # pokud je courant v ryhach <= 0.2
+    # ratio bunky se muze zmensit
+    # pokud je courant v ryhach bunky < 0.1
+    # a max_delta_t_mult zvetsit pokud je courant < 0.1 ve vsech bunkach
     #
     # pokud je courant > 0.5 deje se opak
     # to je ale reseno lokalne
     # v  ./main_src/processes/rill.py
     #
+    low = (rill_courant < 0.1) & (ratio > 1)
+    ratio[low] -= 1 # ratio nemuze byt mensi nez 1
     if (self.cour_most_rill < 0.1) :
-      ratio = max(1,ratio-1) # ratio nemuze byt mensi nez 1
-      if ratio == 1 :
+      if ratio.max() == 1 :
         self.max_delta_t_mult = 1.0
       else :
         self.max_delta_t_mult = min(1.0, self.max_delta_t_mult*1/(0.9)) # max_delta_t_mult nemuze byt vetsi nez 1.0
@@ -136,8 +138,9 @@ class Courant():
     # proto se zmensuje max_delta_t_mult
     # ktery nasobi vysledne delta
     #
-    if ((ratio > self.maxratio) or (self.cour_most_rill > 1.0)) :
-      ratio = self.maxratio
+    high = ratio > self.maxratio
+    if (high.any() or (self.cour_most_rill > 1.0)) :
+      ratio[high] = self.maxratio
       #ratio = 1
       self.max_delta_t_mult *= 0.9
 
@@ -174,7 +177,7 @@ class Courant():
       #print 'fdafdsfasdfadsfadsfadsfaf'
       #return delta_t, ratio
       #print 'asdf', dt, dt*self.max_delta_t_mult, ratio
-      if ((ratio <= self.maxratio) and (self.cour_most_rill < 0.5)) :
+      if ((ratio.max() <= self.maxratio) and (self.cour_most_rill < 0.5)) :
         return delta_t, ratio
       else:
         return delta_t*self.max_delta_t_mult, ratio
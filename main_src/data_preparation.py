@@ -24,6 +24,9 @@ import numpy as np
 import main_src.processes.rainfall as rainfall
 import constants
 import main_src.flow_algorithm.arcgis_dmtfce as arcgis_dmtfce
+import main_src.tools.domain as domain
+import main_src.tools.prep_cache as prep_cache
+import main_src.tools.runoff_parameters as runoff_parameters
 
 
 
@@ -38,129 +41,6 @@ def zapis (name, array_export, l_x,l_y,spix,vpix, NoDataValue,folder):
 
 
 
-## Identification of cells at the domain boundary
-#  @param r rows
-def find_boudary_cells(r, c, mat_nan, noData, mfda):
-
-  mat_boundary =  np.zeros([r,c],float)
-
-  nr = range(r)
-  nc = range(c)
-
-  cols = []
-  rows = []
-
-  boundaryCols = []
-  boundaryRows = []
-
-  for i in nr:
-    for j in nc:
-      val = mat_nan[i][j]
-      if i == 0 or j == 0 or i == ( r - 1 ) or j == ( c - 1 ):
-        if val != noData:
-          val = -99
-      else:
-        if val != noData:
-          if mat_nan[i-1][j] == noData or mat_nan[i+1][j] == noData or mat_nan[i][j-1] == noData or mat_nan[i][j-1] == noData :
-            val = -99
-          if mat_nan[i-1][j+1] == noData or mat_nan[i+1][j+1] == noData or mat_nan[i-1][j-1] == noData or mat_nan[i+1][j-1] == noData :
-            val = -99
-      mat_boundary[i][j] = val
-
-  inDomain = False
-  inBoundary = False
-
-  for i in nr:
-    oneCol = []
-    oneColBoundary = []
-    for j in nc:
-
-      if mat_boundary[i][j]==-99 and inBoundary == False:
-        boundaryRows.append(i)
-        inBoundary = True
-      if mat_boundary[i][j]==-99 and inBoundary == True:
-        oneColBoundary.append(j)
-
-      #if (mat_boundary[i][j]==0.0 or mat_boundary[i][j]==-99) and inDomain == False:
-      if (mat_boundary[i][j]==0.0) and inDomain == False:
-        rows.append(i)
-        inDomain = True
-      #if (mat_boundary[i][j]==0.0 or mat_boundary[i][j]==-99) and inDomain == True:
-      if (mat_boundary[i][j]==0.0) and inDomain == True:
-        oneCol.append(j)
-
-    inDomain = False
-    inBoundary = False
-    cols.append(oneCol)
-    boundaryCols.append(oneColBoundary)
-
-
-
-  return boundaryRows, boundaryCols, rows, cols, mat_boundary
-
-
-
-
-## Class to find out the possible catchment outlets
-#
-class Outlet:
-
-  ## constructor
-  def __init__(self):
-
-
-    ## cells in the domain
-    self.cell = []
-
-    self.cellNeighbour = []
-    self.outletCells = []
-
-
-
-  ## Function to determine cells indexes and neighbor of all cells in the domain
-  #
-  def push(self, cellI, cellJ, mat_nan, noDataVal):
-    cn = []
-    for i in [-1,0,1]:
-      for j in [-1,0,1]:
-        if (cellI+i or cellJ+j) < 0:
-          pass
-        else:
-          if i!=0 or j!=0 :
-            try:
-              val = mat_nan[cellI+i][cellJ+j]
-              if val > -1:
-                cn.append([cellI+i, cellJ+j])
-            except:
-              pass
-    self.cell.append([cellI,cellJ])
-    self.cellNeighbour.append(cn)
-
-
-
-  ## Determine which of cells in the domain are outlet. Outlet cell is the lowers cell compared to all its neighbors
-  #
-  def find_outlets(self, dem):
-    for i in range(len(self.cell)):
-      lowest = True
-      demCell = dem[self.cell[i][0]][self.cell[i][1]]
-      cn = self.cellNeighbour[i]
-      for k in range(len(cn)):
-        if dem[cn[k][0]][cn[k][1]] < demCell:
-          lowest = False
-      if lowest:
-        self.outletCells.append(self.cell[i])
-
-
-
-
-
-
-
-
-
-
-
 ## Main function of the preparation preparation package all date raster/vector or scalar are transfered to python line fashion numpy arrays are created to store spatially distributed parameters  digital elevation model
 #
 #  The computing area is determined  as well as the boundary cells.
@@ -181,7 +61,8 @@ class Outlet:
 #        - identify common area of vector and raster data
 #        - make \e numpy arrays the vector data
 #
-#  @param args sys.argv from the prompt or arcgis toolbox interface
+#  @param args parameters in the order of the command line, see main_src.config.Config.to_argv,
+#         the arcgis toolbox parameters are read by the geoprocessor
 #  @return \b boundaryRows stores all rows of raster where is a boundary located []
 #  @return \b boundaryCols stores all columns of raster where is a boundary located [][]
 #  @return \b mat_boundary array stores -99 at the boudary cells NoDataValue outside the computational domain and zeros in the domain \e numpy[][]
@@ -292,7 +173,7 @@ def prepare_data(args):
 
   arcpy.CopyRaster_management(dmt, dmt_copy)
   #corners deleting
-  dmt_fill,flow_direction,flow_accumulation,slope_orig = arcgis_dmtfce.dmtfce(dmt_copy,temp, "TRUE", "TRUE", "NONE")
+  dmt_fill,flow_direction,flow_accumulation,slope_orig = arcgis_dmtfce.cached_dmtfce(dmt_copy,temp, "TRUE", "TRUE", "NONE")
   copydmt_Array = arcpy.RasterToNumPyArray(dmt_copy)
   copySlope_Array = arcpy.RasterToNumPyArray(slope_orig)
   mat_slope = arcpy.RasterToNumPyArray(slope_orig)
@@ -757,72 +638,15 @@ def prepare_data(args):
 
 
   # calculating the "a" parameter
-  for i in range(rows):
-    for j in range(cols):
-      slope = mat_slope[i][j]
-      par_x = mat_x[i][j]
-      par_y = mat_y[i][j]
-      if i == 3 and j == 90:
-        cxs = 5
-
-      if par_x == NoDataValue or par_y ==NoDataValue or slope == NoDataValue:
-          par_a = NoDataValue
-          par_aa = NoDataValue
-          exp = 0
-
-      elif par_x == NoDataValue or par_y ==NoDataValue or slope == 0.0:
-          par_a = 0.0001
-          par_aa = par_a / 100 / mat_n[i][j]
-          exp = 0
-
-      else:
-          exp = np.power(slope, par_y)
-          par_a = par_x * exp
-          par_aa = par_a / 100 / mat_n[i][j]
-
-      mat_a[i][j] = par_a
-      mat_aa [i][j] = par_aa
+  mat_a, mat_aa = prep_cache.cache.cached('parameter_a', runoff_parameters.parameter_a, mat_slope, mat_x, mat_y, mat_n, NoDataValue)
 
 
 
   # critical water level
   if type_of_computing != 0:
       arcpy.AddMessage("Computing critical level")
-      mat_hcrit_tau = np.zeros([rows,cols],float)
-      mat_hcrit_v = np.zeros([rows,cols],float)
-      mat_hcrit_flux = np.zeros([rows,cols],float)
-      mat_hcrit = np.zeros([rows,cols],float)
-      for i in range(rows):
-          for j in range(cols):
-              if mat_slope[i][j] != NoDataValue and mat_tau[i][j] != NoDataValue:
-                  slope = mat_slope[i][j]
-                  tau_crit = mat_tau[i][j]
-                  v_crit = mat_v[i][j]
-                  b = mat_b[i][j]
-                  a = mat_a[i][j]
-                  aa = mat_aa[i][j]
-                  flux_crit = tau_crit * v_crit
-                  exp = 1/(b - 1)
-
-                  if slope == 0.0:
-                      hcrit_tau = hcrit_v = hcrit_flux = 1000
-
-
-                  else:
-                      hcrit_v = np.power((v_crit/aa),exp) # h critical from v (10 je kuli jednotkam, bude jinak)
-                      hcrit_tau = tau_crit / 98.07 / slope # h critical from tau
-                      hcrit_flux = np.power((flux_crit/slope/98.07/aa),(1 / mat_b[i][j]))#kontrola jednotek
-
-                  mat_hcrit_tau[i][j] = hcrit_tau
-                  mat_hcrit_v[i][j] = hcrit_v
-                  mat_hcrit_flux[i][j] = hcrit_flux
-                  hcrit = min (hcrit_tau, hcrit_v, hcrit_flux)
-                  mat_hcrit[i][j] = hcrit
-              else:
-                  mat_hcrit_tau[i][j] = NoDataValue
-                  mat_hcrit_v[i][j] = NoDataValue
-                  mat_hcrit_flux[i][j] = NoDataValue
-                  mat_hcrit[i][j] = NoDataValue
+      mat_hcrit_tau, mat_hcrit_v, mat_hcrit_flux, mat_hcrit = prep_cache.cache.cached('critical_level', runoff_parameters.critical_level,
+                                                                                      mat_slope, mat_tau, mat_v, mat_b, mat_aa, NoDataValue)
 
       rhcrit_tau = arcpy.NumPyArrayToRaster(mat_hcrit_tau, ll_corner, spix, vpix, "#" )
       rhcrit_tau.save(temp+os.sep+"hcrit_tau")
@@ -943,19 +767,8 @@ def prepare_data(args):
   arcpy.AddMessage("Stream preparation has finished")
 
 
-  boundaryRows, boundaryCols, rrows, rcols, mat_boundary = find_boudary_cells(rows, cols, mat_nan, NoDataValue, mfda)
-  rada = Outlet()
-
-
-  for i in boundaryRows:
-    for j in boundaryCols[i]:
-      rada.push(i,j,mat_nan,NoDataValue)
-
-
-  rada.find_outlets(mat_dmt_fill)
-
-
-  outletCells = rada.outletCells
+  boundaryRows, boundaryCols, rrows, rcols, mat_boundary = domain.find_boundary_cells(rows, cols, mat_nan, NoDataValue)
+  outletCells = domain.find_outlets(mat_boundary, mat_nan, mat_dmt_fill)
 
 
   arcpy.AddMessage("Data preparation has been finished")
@@ -973,36 +786,3 @@ def prepare_data(args):
     output, pixel_area, points, poradi,  end_time, spix, state_cell, \
     temp, type_of_computing, vpix, mfda, sr, itera,  \
       toky, cell_stream, mat_tok_usek, STREAM_RATIO, tokyLoc
-
-
-
-
-
-
-
-
-boundaryRows, boundaryCols, mat_boundary, rrows, rcols, outletCells, x_coordinate, y_coordinate,\
-    NoDataValue, array_points, \
-    cols, rows, combinatIndex, delta_t,  \
-    mat_pi, mat_ppl, \
-    surface_retention, mat_inf_index, mat_hcrit, mat_aa, mat_b,\
-    mat_fd, mat_dmt, mat_efect_vrst, mat_slope, mat_nan, \
-    mat_a,   \
-    mat_n,   \
-    output, pixel_area, points, poradi,  end_time, spix, state_cell, \
-    temp, type_of_computing, vpix, mfda, sr, itera, \
-    toky, cell_stream, mat_tok_usek, STREAM_RATIO, tokyLoc = prepare_data(sys.argv)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
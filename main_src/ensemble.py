@@ -0,0 +1,338 @@
+## @package main_src.ensemble computation of several parameter sets of one catchment
+#
+#  The members of the ensemble differ in the parameters of the surface runoff,
+#  all of them are computed from the same prepared data (Config.indata) in one
+#  process. The data are loaded only once and the flow directions are shared
+#  (see main_src.main_classes.Flow.shared_routing).
+#
+#  The sheet flow (onlyshallowsurface) in the outlet-only mode (main_src.config.Config.outlet_only)
+#  is computed for all members together in one time loop (run_together): the state arrays
+#  have the leading axis of the members (main_src.main_classes.SurfaceMembers), the inflows of all
+#  members are routed by one routing operator and the time step is common, the shortest time step
+#  of the Courant condition of the members. The cost of the time loop is shared by the members.
+#  The other types of computing are computed member by member by main_src.runoff.run,
+#  each with its own time loop and adaptive time step (the rills are computed cell by cell).
+#
+#  The members are read from a text file, the first line gives the names
+#  of the columns separated by ';', '-' means the value is not changed:
+#
+#      # name;surface_retention;k;s;n;hcrit;rainfall
+#      base;-;1.0;1.0;1.0;1.0;1.0
+#      wet;2.0;0.5;0.5;1.2;1.0;1.3
+#
+#    - \b name              name of the member, output directory in Config.output
+#    - \b surface_retention surface retention [mm]
+#    - \b k, \b s           multipliers of the Philip infiltration parameters (conductivity, sorptivity)
+#    - \b n                 multiplier of the Manning n (sheet and rill flow)
+#    - \b hcrit             multiplier of the critical water level
+#    - \b rainfall          multiplier of the rainfall
+#
+#  The ensemble is computed by:\n
+#  <em>python -m main_src.ensemble members.txt [parameters of main.py]</em>\n
+#  together with the outlet-only mode only the outlet hydrographs of the members are written.
+#  The file ensemble.txt in Config.output lists the members and their computing time,
+#  the members computed together share the computing time equally.
+#
+
+import os
+import sys
+import copy
+import time
+
+import numpy as np
+
+import main_src.io_functions.prt          as prt
+import main_src.io_functions.progress_bar as progress_bar
+import main_src.processes.rainfall        as rain_f
+import main_src.tools.save_load_data      as sld
+import main_src.tools.precision           as precision
+import main_src.tools.prep_cache          as prep_cache
+from   main_src.config                import Config
+from   main_src.courant               import Courant
+from   main_src.main_classes.General  import Globals, set_globals
+from   main_src.main_classes.SurfaceMembers import surface_members_class
+from   main_src.io_functions.outlets  import Outlets
+from   main_src.io_functions.writer   import output_writer
+from   main_src.tools.resolve_partial_computing import names, resolve
+from   main_src.tools.tools           import comp_type, int_comp_type
+import main_src.runoff                    as runoff
+
+
+
+## Parameters of one member of the ensemble
+#
+class Member(object):
+
+  ## names of the member parameters, columns of the members file
+  columns = ['name', 'surface_retention', 'k', 's', 'n', 'hcrit', 'rainfall']
+
+  def __init__(self, name, surface_retention=None, k=1.0, s=1.0, n=1.0, hcrit=1.0, rainfall=1.0):
+    ## name of the member, output directory
+    self.name = name
+    ## surface retention [mm], None for the value of the config
+    self.surface_retention = surface_retention
+    ## multiplier of the Philip k (hydraulic conductivity)
+    self.k = float(k)
+    ## multiplier of the Philip s (sorptivity)
+    self.s = float(s)
+    ## multiplier of the Manning n
+    self.n = float(n)
+    ## multiplier of the critical water level
+    self.hcrit = float(hcrit)
+    ## multiplier of the rainfall
+    self.rainfall = float(rainfall)
+
+
+  ## Returns the config of the member
+  #
+  #  @param config main_src.config.Config of the ensemble
+  def configure(self, config):
+    config = copy.copy(config)
+    config.output = config.output + os.sep + self.name
+    if self.surface_retention is not None:
+      config.surface_retention = self.surface_retention
+    config.rainfall_factor = float(config.rainfall_factor)*self.rainfall
+    return config
+
+
+  ## Applies the multipliers to the prepared data
+  #
+  #  called in main_src.runoff.run, the arrays are replaced,
+  #  the arrays shared by the members are not changed
+  #
+  #  @param data main_src.tools.resolve_partial_computing.PreparedData
+  def apply(self, data):
+    data.combinatIndex = [[iii[0], iii[1]*self.k, iii[2]*self.s] + list(iii[3:]) for iii in data.combinatIndex]
+    if self.n != 1.0:
+      # the parameter of the sheet flow is a/100/n, see main_src.data_preparation
+      data.mat_n  = data.mat_n*self.n
+      data.mat_aa = data.mat_aa/self.n
+    if self.hcrit != 1.0:
+      data.mat_hcrit = data.mat_hcrit*self.hcrit
+
+
+  def __str__(self):
+    sep = ';'
+    return self.name + sep + ('-' if self.surface_retention is None else str(self.surface_retention)) + sep + \
+      str(self.k) + sep + str(self.s) + sep + str(self.n) + sep + str(self.hcrit) + sep + str(self.rainfall)
+
+
+
+## Reads the members of the ensemble
+#
+#  @param file_ members file, see the package documentation
+#  @return list of Member
+def load_members(file_):
+  members = []
+  header = None
+  with open(file_,'r') as f:
+    for line in f:
+      line = line.strip()
+      if line == '':
+        continue
+      z = [item.strip() for item in line.lstrip('#').split(';')]
+      if header is None:
+        header = z
+        for name_ in header:
+          if name_ not in Member.columns:
+            prt.error('Unknown column of the members file:', name_, '\n\tavailable are:', ', '.join(Member.columns))
+        if 'name' not in header:
+          prt.error('Members file has to contain the column name')
+        continue
+      if len(z) != len(header):
+        prt.error('Wrong number of the values in the members file:', line)
+      kwargs = {}
+      for name_, value in zip(header,z):
+        if value == '-':
+          continue
+        kwargs[name_] = value if name_ == 'name' else float(value)
+      members.append(Member(**kwargs))
+
+  names_ = [member.name for member in members]
+  if len(set(names_)) != len(names_):
+    prt.error('Names of the members have to be unique')
+  return members
+
+
+
+## Outlet hydrographs of one member computed together with the others
+#
+class MemberOutlets(Outlets):
+
+  ## the constructor
+  #
+  #  @param member index of the member in main_src.main_classes.SurfaceMembers
+  def __init__(self,outletCells,output,surface,writer,member):
+    self.member = member
+    Outlets.__init__(self,outletCells,output,surface,writer)
+    self.cells = surface.cell[self.cells_i,self.cells_j]
+
+
+  ## Records the outflow of the time step
+  def update(self,time,dt):
+    outflow = np.zeros([len(self.volume)],float)
+    np.add.at(outflow,self.outlet,self.exit_sheet*self.surface.V_runoff[self.member][self.cells])
+    self.volume += outflow
+    self.writer.put(self.write,time,dt,outflow)
+
+
+
+## Returns True if the members are computed together in one time loop
+#
+#  @param config main_src.config.Config of the ensemble
+#  @param saved data list loaded from Config.indata
+def together(config,saved):
+  type_of_computing = config.type_of_computing
+  if type_of_computing is None:
+    type_of_computing = int_comp_type(saved[names.index('type_of_computing')])
+  return bool(config.outlet_only) and comp_type(type_of_computing,'surface')
+
+
+
+## Computes the sheet flow of all members together in one time loop
+#
+#  the time loop of main_src.runoff.run with the sheet flow only and the common time step
+#
+#  @param config main_src.config.Config of the ensemble
+#  @param members list of Member
+#  @param saved data list loaded from Config.indata
+#  @return computing time [s]
+def run_together(config,members,saved):
+
+  config = copy.copy(config)
+  precision.setup(config.precision)
+  prep_cache.setup(config.prep_cache)
+
+  data = resolve(config,saved)
+  set_globals(data,config)
+  prt.message('Members are computed together in one time loop')
+
+  output = data.output
+  end_time = data.end_time
+  maxIter = 40
+
+  writer = output_writer(0 if config.arcgis else config.output_queue)
+  progress_bar.setup(config.arcgis, config.progress_interval,
+                     len(members)*sum([len(data.rcols[i]) for i in data.rrows]), end_time, config.progress_json)
+
+  start = time.time()
+
+  # the rainfall of the members is multiplied in the surface
+  rain_config = copy.copy(config)
+  rain_config.rainfall_factor = 1.0
+  rain_src = rain_f.rainfall_source(data.sr,data.itera,Globals,rain_config)
+
+  Surface = surface_members_class(Globals)
+  surface = Surface(members,data,config.rainfall_factor)
+
+  outlets = []
+  for k, member in enumerate(members):
+    os.makedirs(output+os.sep+member.name)
+    outlets.append(MemberOutlets(data.outletCells,output+os.sep+member.name,surface,writer,k))
+
+  courants = [Courant(config.max_delta_t) for member in members]
+  delta_t = courants[0].max_delta_t
+  delta_t_pre = delta_t
+  total_time = 0.0
+
+  # there are no rills, the arrays of the rill sub-steps are not changed
+  ratio = np.ones([Globals.r,Globals.c],int)
+  rill_courant = np.zeros([Globals.r,Globals.c],float)
+
+  while ( total_time < end_time ):
+
+    surface.save()
+    iter_ = 0
+
+    while (iter_ < maxIter):
+      iter_ += 1
+      surface.undo()
+      for courant in courants:
+        courant.reset()
+
+      rainfall = rain_src.timestep_rainfall(total_time,delta_t_pre)
+      surface.do(rainfall,total_time,delta_t,delta_t_pre,courants)
+
+      # the common time step is the shortest time step of the members
+      delta_t_tmp = delta_t
+      delta_t = min([courant.courant(rainfall,delta_t,data.spix,ratio,rill_courant)[0] for courant in courants])
+
+      if (delta_t_tmp == delta_t): break
+
+    if iter_ >= maxIter :
+      for outlet in outlets:
+        outlet.close()
+      writer.put(progress_bar.pb.close)
+      writer.close()
+      prt.error("max iteration in time step was reached\n","\tmaxIter = ", maxIter, '\n\tpartial results are saved in ', output, 'directory')
+
+    timeperc = 100 * (total_time+delta_t) / end_time
+    writer.put(progress_bar.pb.update,timeperc,delta_t,iter_,total_time+delta_t)
+
+    for outlet in outlets:
+      outlet.update(total_time+delta_t,delta_t)
+    surface.update()
+
+    delta_t_pre = delta_t
+    if ( end_time - total_time ) < delta_t and ( end_time - total_time ) > 0:
+      delta_t = end_time - total_time
+
+    total_time = total_time + delta_t
+
+  for outlet in outlets:
+    outlet.close()
+  writer.put(progress_bar.pb.close)
+  writer.close()
+
+  computing_time = time.time()-start
+  prt.message('Total computing time: ',str(computing_time))
+  return computing_time
+
+
+
+## Computes all members of the ensemble
+#
+#  the members are computed together by run_together if it is possible, see together,
+#  otherwise one after another by main_src.runoff.run
+#
+#  @param config main_src.config.Config of the ensemble, the computation has to be roff
+#  @param members list of Member
+def run(config, members):
+
+  prt.setup(config.arcgis, config.debug_prt)
+  if config.partial_computing != 'roff':
+    prt.error('Ensemble is computed only from the prepared data, partial computing has to be roff')
+
+  saved = sld.load_data(config.indata)
+
+  config = copy.copy(config)
+  if config.output is None:
+    config.output = saved[names.index('output')]
+
+  sep = ';'
+  if together(config,saved):
+    # the output directory is created again in resolve
+    computing_time = run_together(config,members,saved)
+    with open(config.output+os.sep+'ensemble.txt','w') as f:
+      f.write('# ' + sep.join(Member.columns) + sep + 'computing time [s]\n')
+      for member in members:
+        f.write(str(member) + sep + str(computing_time/len(members)) + '\n')
+    return
+
+  if not os.path.exists(config.output):
+    os.makedirs(config.output)
+
+  with open(config.output+os.sep+'ensemble.txt','w') as f:
+    f.write('# ' + sep.join(Member.columns) + sep + 'computing time [s]\n')
+    for member in members:
+      start = time.time()
+      runoff.run(member.configure(config),saved,member)
+      f.write(str(member) + sep + str(time.time()-start) + '\n')
+      f.flush()
+
+
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    sys.exit('usage: python -m main_src.ensemble members_file [parameters of main.py]')
+  run(Config.from_argv(['main.py'] + sys.argv[2:]), load_members(sys.argv[1]))
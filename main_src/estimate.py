@@ -0,0 +1,317 @@
+## @package main_src.estimate peak memory and wall time of the computation before it is started
+#
+#  The estimate is made from the prepared data (Config.indata) without the computation:
+#    - \b memory     the interpreter and the loaded data plus the memory per raster cell
+#                    (the surface objects and the arrays are held for all cells of the raster)
+#                    plus the reaches and their stage tables
+#    - \b time steps the least and the most time steps of the Courant condition (main_src.courant.Courant)
+#                    of the sheet flow, the water levels are bounded from the slopes (mat_aa, mat_b),
+#                    the flow directions and the rainfall, see SheetFlow
+#    - \b wall time  the construction of the arrays plus the time steps times the domain cells
+#                    times the cost of one cell in one time step
+#
+#  The coefficients depend on the type of computing, they were fitted by main_src.tools.benchmark
+#  on its catchments (40x26 to 240x160 cells of 5 m, 5 min of the rainfall) with python 2.7,
+#  numpy 1.16 and one core, the memory per reach is not fitted. The coefficients have to be
+#  fitted again after the changes of the computation:\n
+#  <em>python -m main_src.tools.benchmark directory 5</em>\n
+#  The time step of the computation follows the actual water levels which are not steady,
+#  the time steps and the wall time are therefore given as a range.
+#
+#  The estimate is made by the dry run:\n
+#  <em>python -m main_src.estimate [parameters of main.py]</em>
+#
+
+import sys
+import numpy as np
+
+import main_src.io_functions.prt                  as prt
+import main_src.tools.save_load_data              as sld
+from   main_src.config                        import Config
+from   main_src.courant                       import Courant
+from   main_src.tools.resolve_partial_computing import PreparedData
+from   main_src.tools.tools                   import comp_type, int_comp_type
+
+
+
+## memory of the interpreter, numpy and the modules [kB]
+base_memory = 24600.0
+
+## memory per raster cell [kB], the surface flow and the additions of the components
+cell_memory = {'surface' : 4.95,
+               'rill'    : 0.55,
+               'stream'  : 0.02,
+               'subflow' : 0.20}
+
+## memory per reach [kB], the reach arrays and the stage tables
+reach_memory = 4.3
+
+## wall time of one domain cell in one time step [s], the surface flow and the additions of the components
+cell_step_time = {'surface' : 71e-6,
+                  'rill'    : 5e-6,
+                  'stream'  : 11e-6,
+                  'subflow' : 3e-6}
+
+## wall time of the construction per raster cell [s]
+cell_init_time = 72e-6
+
+## row and column offsets of the D8 flow directions
+d8 = {1 : (0, 1), 2 : (1, 1), 4 : (1, 0), 8 : (1, -1), 16 : (0, -1), 32 : (-1, -1), 64 : (-1, 0), 128 : (-1, 1)}
+
+
+
+## Sheet flow of the domain cells and its time steps
+#
+#  The water level of the sheet flow is bounded by two simple models, the time steps of the Courant
+#  condition (main_src.courant.Courant) of these levels bound the time steps of the computation:
+#    - \b least the water level of each cell is the rainfall excess of the cell itself (the rainfall
+#              minus the interception, the infiltration of Philip and the surface retention)
+#              up to its steady level, the time step is given by the Courant condition
+#    - \b most  the steady water level of the highest intensity so far is reached in all cells as soon
+#              as the rainfall excess ponds anywhere, the time step is cour_least of the Courant condition
+#
+#  The steady level drains the rainfall excess of the cells upstream, the cells are accumulated along
+#  the D8 flow directions (mat_fd), the flow of the multiple flow directions is not divided. The stream
+#  cells take the flow over and do not pass it further, in the least model of the rill types the rills
+#  take the flow from upstream.
+#
+class SheetFlow(object):
+
+  ## the constructor
+  #
+  #  @param data main_src.tools.resolve_partial_computing.PreparedData
+  #  @param isRill the sheet flow is limited by the critical water level and flows into the rills
+  #  @param stream the stream cells are marked in data.mat_tok_usek
+  def __init__(self, data, isRill, stream):
+    self.isRill = isRill
+    self.retention = data.surface_retention
+    rows = np.array([i for i in data.rrows for j in data.rcols[i]], int)
+    cols = np.array([j for i in data.rrows for j in data.rcols[i]], int)
+    n = len(rows)
+
+    cell = -np.ones([data.rows, data.cols], int)
+    cell[rows,cols] = np.arange(n)
+
+    fd = np.asarray(data.mat_fd)[rows,cols].astype(int)
+    di = np.array([d8.get(code, (0, 0))[0] for code in fd], int)
+    dj = np.array([d8.get(code, (0, 0))[1] for code in fd], int)
+    inside = (rows+di >= 0) & (rows+di < data.rows) & (cols+dj >= 0) & (cols+dj < data.cols) & ((di != 0) | (dj != 0))
+    receiver = -np.ones(n, int)
+    receiver[inside] = cell[rows[inside]+di[inside],cols[inside]+dj[inside]]
+
+    self.sheet = np.ones(n, bool)
+    if stream:
+      self.sheet = np.asarray(data.mat_tok_usek)[rows,cols] < 1000
+      receiver[~self.sheet] = -1
+
+    # the cells are accumulated from the ridges, the cell is passed on when all its donors are done
+    self.area = np.ones(n)
+    donors = np.bincount(receiver[receiver >= 0], minlength=n)
+    front = np.nonzero(donors == 0)[0]
+    while len(front) > 0:
+      front = front[receiver[front] >= 0]
+      np.add.at(self.area, receiver[front], self.area[front])
+      np.subtract.at(donors, receiver[front], 1)
+      front = np.unique(receiver[front][donors[receiver[front]] == 0])
+    self.area *= data.pixel_area
+    self.pixel_area = data.pixel_area
+
+    index = np.asarray(data.mat_inf_index)[rows,cols].astype(int)
+    combinations = dict([(int(z[0]), z) for z in data.combinatIndex])
+    self.k     = np.array([combinations[i][1] for i in index], float)
+    self.s     = np.array([combinations[i][2] for i in index], float)
+    self.ppl   = np.asarray(data.mat_ppl, float)[rows,cols]
+    self.pi    = np.asarray(data.mat_pi, float)[rows,cols]
+    self.a     = np.asarray(data.mat_aa, float)[rows,cols]
+    self.b     = np.asarray(data.mat_b, float)[rows,cols]
+    self.width = np.asarray(data.mat_efect_vrst, float)[rows,cols]
+    self.hcrit = np.asarray(data.mat_hcrit, float)[rows,cols]
+
+
+  ## Returns the steady water level of the sheet flow [m]
+  #
+  #  the specific discharge q = a*h^b drains the rainfall excess of the area
+  #
+  #  @param intensity rainfall intensity [m/s]
+  #  @param area drained area of each cell [m2]
+  def steady(self, intensity, area):
+    q = np.maximum(intensity - self.k, 0.0)*area/self.width
+    return (q/self.a)**(1.0/self.b)
+
+
+  ## Returns the time step of the Courant condition of the water levels
+  #
+  #  the velocity is v = a*h^(b-1), the time step is mat_efect_vrst*cour_crit*cour_coef/v of the fastest cell
+  #
+  #  @param h water level of each cell [m]
+  #  @param courant main_src.courant.Courant
+  def time_step(self, h, courant):
+    if self.isRill:
+      h = np.minimum(h, self.hcrit)
+    v = self.a*h**(self.b - 1.0)
+    dt = self.width*courant.cour_crit*courant.cour_coef/np.maximum(v, 1e-30)
+    return min(dt[self.sheet].min(), courant.max_delta_t)
+
+
+  ## Returns the number of the time steps to the end time
+  #
+  #  @param times, depth cumulative rainfall [s], [m]
+  #  @param end_time end time of the computation [s]
+  #  @param courant main_src.courant.Courant
+  #  @param most the most time steps, else the least time steps
+  def steps(self, times, depth, end_time, courant, most):
+    area = self.area if most or not self.isRill else self.pixel_area
+    excess = np.zeros(len(self.k))
+    intercepted = np.zeros(len(self.k))
+    h = np.zeros(len(self.k))
+    intensity = 0.0
+    total_time = 0.0
+    steps = 0
+    while total_time < end_time:
+      if most:
+        if (excess > self.retention).any():
+          h = np.maximum(h, self.steady(intensity, area))
+        delta_t = courant.cour_least*self.time_step(h, courant)
+      else:
+        h = np.minimum(np.maximum(excess - self.retention, 0.0), self.steady(intensity, area))
+        delta_t = self.time_step(h, courant)
+
+      rainfall = np.interp(total_time + delta_t, times, depth) - np.interp(total_time, times, depth)
+      intensity = max(intensity, rainfall/delta_t) if most else rainfall/delta_t
+      interception = np.where(intercepted >= self.pi, 0.0, self.ppl*rainfall)
+      intercepted += interception
+      infiltration = (0.5*self.s/np.sqrt(total_time + delta_t) + self.k)*delta_t
+      excess = np.maximum(excess + rainfall - interception - infiltration, 0.0)
+
+      total_time += delta_t
+      steps += 1
+    return steps
+
+
+
+## Estimate of one computation
+#
+class Estimate(object):
+
+  ## the constructor
+  #
+  #  @param rows, cols size of the raster
+  #  @param n_cells number of the domain cells
+  #  @param type_of_computing see main_src.tools.tools.comp_type
+  #  @param n_reaches number of the stream reaches
+  #  @param sr rainfall records [end of the interval [s], intensity [m/s]]
+  #  @param end_time end time of the computation [s]
+  #  @param max_delta_t maximum time step [s]
+  #  @param sheet SheetFlow of the domain cells
+  def __init__(self, rows, cols, n_cells, type_of_computing, n_reaches, sr, end_time, max_delta_t, sheet):
+    self.rows = rows
+    self.cols = cols
+    self.n_cells = n_cells
+    self.type_of_computing = type_of_computing
+    self.n_reaches = n_reaches
+    self.end_time = float(end_time)
+    self.max_delta_t = float(max_delta_t)
+
+    isRill, subflow, stream, diffuse = comp_type(type_of_computing)[:4]
+    components = ['surface']
+    if isRill:
+      components.append('rill')
+    if stream:
+      components.append('stream')
+    if subflow:
+      components.append('subflow')
+
+    # the rainfall starts at the end of the last record without rainfall
+    sr = np.asarray(sr, float).reshape(-1,2)
+    wet = np.nonzero(sr[:,1] > 0.0)[0]
+    if len(wet) == 0:
+      self.rain_start = self.end_time
+      self.rain_end   = self.end_time
+    else:
+      self.rain_start = sr[wet[0]-1,0] if wet[0] > 0 else 0.0
+      self.rain_end   = sr[wet[-1],0]
+    self.rain_start = min(self.rain_start, self.end_time)
+
+    # the cumulative rainfall, there is no rainfall after the records
+    courant = Courant(self.max_delta_t)
+    times = np.append(0.0, sr[:,0])
+    depth = np.append(0.0, np.cumsum(np.diff(times)*sr[:,1]))
+    peak = sr[:,1][sr[:,0] - np.diff(times) < self.end_time].max() if len(sr) else 0.0
+    self.delta_t = sheet.time_step(sheet.steady(peak, sheet.area), courant)
+    self.steps_min = sheet.steps(times, depth, self.end_time, courant, False)
+    self.steps_max = sheet.steps(times, depth, self.end_time, courant, True)
+
+    self.memory = base_memory + rows*cols*sum([cell_memory[name_] for name_ in components]) + \
+                  n_reaches*reach_memory
+    step_time = n_cells*sum([cell_step_time[name_] for name_ in components])
+    self.time_min = rows*cols*cell_init_time + self.steps_min*step_time
+    self.time_max = rows*cols*cell_init_time + self.steps_max*step_time
+
+
+  ## Prints the estimate
+  def report(self):
+    prt.message('Estimate of the computation:')
+    prt.message('\traster                 ', self.rows, 'x', self.cols)
+    prt.message('\tdomain cells           ', self.n_cells)
+    prt.message('\ttype of computing      ', self.type_of_computing)
+    prt.message('\treaches                ', self.n_reaches)
+    prt.message('\trainfall [s]           ', self.rain_start, '-', self.rain_end)
+    prt.message('\tend time [s]           ', self.end_time)
+    prt.message('\ttime step [s]          ', self.max_delta_t, 'max,', '%.2f' % self.delta_t, 'at the peak rainfall')
+    prt.message('\ttime steps             ', self.steps_min, '-', self.steps_max)
+    prt.message('\tpeak memory [MB]       ', '%.0f' % (self.memory/1024.0))
+    prt.message('\twall time [s]          ', '%.1f' % self.time_min, '-', '%.1f' % self.time_max)
+
+
+
+## Returns the estimate of the computation from the prepared data
+#
+#  the parameters given in the config replace the saved ones as in the roff computation
+#
+#  @param config main_src.config.Config
+#  @param saved data list already loaded from Config.indata
+def estimate(config, saved=None):
+  if config.partial_computing != 'roff':
+    prt.error('The estimate is made from the prepared data, partial_computing has to be roff')
+
+  if saved is None:
+    saved = sld.load_data(config.indata)
+  data = PreparedData(saved)
+
+  if config.end_time is None:
+    end_time = data.end_time
+  else:
+    end_time = float(config.end_time)*60.0
+
+  if config.max_delta_t is None:
+    max_delta_t = data.delta_t
+  else:
+    max_delta_t = config.max_delta_t
+
+  if config.type_of_computing is None:
+    type_of_computing = int_comp_type(data.type_of_computing)
+  else:
+    type_of_computing = config.type_of_computing
+
+  if config.surface_retention is not None:
+    data.surface_retention = float(config.surface_retention)/1000
+
+  if config.rainfall_file is None:
+    sr = data.sr
+  else:
+    import main_src.processes.rainfall as rainfall
+    sr, itera = rainfall.load_precipitation(config.rainfall_file)
+
+  isRill, subflow, stream = comp_type(type_of_computing)[:3]
+  n_reaches = len(data.toky[0]) if stream else 0
+  n_cells = sum([len(data.rcols[i]) for i in data.rrows])
+
+  return Estimate(data.rows, data.cols, n_cells, type_of_computing, n_reaches, sr,
+                  end_time, max_delta_t, SheetFlow(data, isRill, stream))
+
+
+
+if __name__ == "__main__":
+  config = Config.from_argv(['main.py'] + sys.argv[1:])
+  prt.setup(config.arcgis, config.debug_prt)
+  estimate(config).report()
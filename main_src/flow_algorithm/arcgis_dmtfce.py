@@ -3,6 +3,7 @@ import arcgisscripting
 gp = arcgisscripting.create()
 import sys
 import os
+import main_src.tools.prep_cache as prep_cache
 def dmtfce(dmt, save_dir, fill, filtr, fl_dir):
     # loading file soil_type_values
     # filling the sink areas in raster
@@ -43,3 +44,28 @@ def dmtfce(dmt, save_dir, fill, filtr, fl_dir):
       arcpy.AddMessage( "Unexpected error during slope calculation:", sys.exc_info()[0])
       raise
     return dmt_fill,flow_direction,flow_accumulation,slope
+
+
+
+## names of the rasters of dmtfce in the cache directory
+cached_names = ['fill', 'fl_dir', 'facc', 'slope']
+
+
+## dmtfce with the rasters stored in the preparation cache
+#
+#  the key is the content and the extent of the dmt, see main_src.tools.prep_cache
+def cached_dmtfce(dmt, save_dir, fill, filtr, fl_dir):
+    desc = arcpy.Describe(dmt)
+    key = prep_cache.digest(arcpy.RasterToNumPyArray(dmt), desc.extent.XMin, desc.extent.YMin,
+                            desc.MeanCellWidth, desc.MeanCellHeight, desc.noDataValue,
+                            desc.SpatialReference.name, fill, filtr, fl_dir)
+    cache_dir, done = prep_cache.cache.directory('dmtfce', key)
+    if done:
+      return tuple([arcpy.Raster(cache_dir+os.sep+name_) for name_ in cached_names])
+
+    rasters = dmtfce(dmt, save_dir, fill, filtr, fl_dir)
+    if cache_dir is not None:
+      for raster, name_ in zip(rasters, cached_names):
+        arcpy.CopyRaster_management(raster, cache_dir+os.sep+name_)
+      prep_cache.cache.done(cache_dir)
+    return rasters
@@ -1,4 +1,4 @@
-__all__ = ["hydrographs", "prt", "progress_bar", "post_proc"]
+__all__ = ["hydrographs", "prt", "progress_bar", "post_proc", "mass_balance", "writer", "field_store", "outlets"]
 
 
 
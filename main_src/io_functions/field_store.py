@@ -0,0 +1,301 @@
+#!/usr/bin/python
+
+## @package main_src.io_functions.field_store chunked store of the full-field time series
+#
+#  The selected variables of all cells are recorded during the computation
+#  (main_src.config.Config.field_store, optional parameter constants.PARAMETER_FIELD_STORE,
+#  e.g. <em>h,h_rill,q,infiltration</em>) in the interval
+#  Config.field_interval [s] (constants.PARAMETER_FIELD_INTERVAL, 0 means each time step).
+#
+#  The store is the directory \b fields in the output directory:
+#    - \b fields.bin the chunks appended one after another
+#    - \b index.txt the header, the record times and the position of each chunk
+#
+#  One chunk contains chunk_times records of one variable in one tile
+#  of tile x tile cells (time x row x col), optionally compressed by zlib
+#  (Config.field_compression, constants.PARAMETER_FIELD_COMPRESSION, 0 means no compression).
+#  The chunks are written when chunk_times records are collected, the index
+#  contains only the written chunks, the store can be therefore read
+#  during the computation.
+#
+#  FieldStoreReader reads the field of one time or the series of one cell
+#  without loading the whole store:\n
+#  <em>python -m main_src.io_functions.field_store output_dir/fields variable row col</em>
+#
+
+import os
+import sys
+import zlib
+import numpy as np
+
+import main_src.io_functions.prt  as prt
+
+
+
+## Values of the recorded variables in the cell
+#
+#  @param arr main_src.main_classes.Surface.SurArrs of the cell
+#  @param dt time step
+variables = {'h'            : lambda arr, dt: arr.h,
+             'h_rill'       : lambda arr, dt: arr.h_rill,
+             'h_total'      : lambda arr, dt: arr.h_total,
+             'q'            : lambda arr, dt: (arr.V_runoff + arr.V_runoff_rill)/dt,
+             'infiltration' : lambda arr, dt: arr.infiltration,
+             'V_rest'       : lambda arr, dt: arr.V_rest + arr.V_rill_rest}
+
+
+
+## Records the fields of the selected variables into the chunked store
+#
+class FieldStore():
+
+  ## the constructor
+  #
+  #  @param names comma separated names of the variables, see variables
+  #  @param interval interval of the records [s], 0 for each time step
+  #  @param compression zlib compression level, 0 for no compression
+  #  @param output output directory
+  #  @param G main_src.main_classes.General.Globals
+  #  @param writer main_src.io_functions.writer.OutputWriter, the chunks are written by the writer
+  #  @param chunk_times number of the records in one chunk
+  #  @param tile number of the rows and columns of the chunk
+  #  @param dtype type of the stored values
+  def __init__(self,names,interval,compression,output,G,writer,chunk_times=16,tile=64,dtype=np.float32):
+
+    self.names = [name_.strip() for name_ in names.split(',') if name_.strip() != '']
+    for name_ in self.names:
+      if name_ not in variables:
+        prt.error('Unknown variable of the field store:', name_, '\n\tavailable are:', ', '.join(sorted(variables)))
+
+    self.interval    = float(interval)
+    self.compression = int(compression)
+    self.chunk_times = chunk_times
+    self.tile        = tile
+    self.dtype       = np.dtype(dtype)
+    self.writer      = writer
+
+    self.r  = G.r
+    self.c  = G.c
+    self.rr = G.rr
+    self.rc = G.rc
+    self.NoDataValue = G.NoDataValue
+
+    self.next_time = 0.0
+    self.n_records = 0
+    self.n_chunks  = 0
+    self.offset    = 0
+    self.times     = []
+    self.buffer    = dict([(name_, np.zeros([chunk_times,self.r,self.c],self.dtype)) for name_ in self.names])
+
+    self.dir_ = output+os.sep+'fields'
+    if not os.path.exists(self.dir_):
+      os.makedirs(self.dir_)
+    self.data  = open(self.dir_+os.sep+'fields.bin','wb')
+    self.index = open(self.dir_+os.sep+'index.txt','w')
+    self.index.write('# smoderp field store\n')
+    self.index.write('rows '        + str(self.r) + '\n')
+    self.index.write('cols '        + str(self.c) + '\n')
+    self.index.write('dtype '       + self.dtype.name + '\n')
+    self.index.write('nodata '      + str(self.NoDataValue) + '\n')
+    self.index.write('tile '        + str(tile) + '\n')
+    self.index.write('chunk_times ' + str(chunk_times) + '\n')
+    self.index.write('compression ' + str(self.compression) + '\n')
+    self.index.write('variables '   + ' '.join(self.names) + '\n')
+    self.index.flush()
+
+    prt.message('Field store:')
+    prt.message('\t', ', '.join(self.names), 'every', self.interval, '[s] into', self.dir_)
+
+
+  ## Records the fields if the record time is reached
+  #
+  #  called in main_src.runoff after each time step, the snapshot of the
+  #  fields is made here and written by the writer
+  #
+  #  @param time time at the end of the time step
+  #  @param dt time step
+  #  @param surface main_src.main_classes.Surface.Surface
+  def record(self,time,dt,surface):
+
+    if time < self.next_time:
+      return
+    if self.interval > 0.0:
+      while self.next_time <= time:
+        self.next_time += self.interval
+
+    fields = {}
+    for name_ in self.names:
+      fce = variables[name_]
+      tmp = np.empty([self.r,self.c],self.dtype)
+      tmp.fill(self.NoDataValue)
+      for i in self.rr:
+        for j in self.rc[i]:
+          tmp[i][j] = fce(surface.arr[i][j],dt)
+      fields[name_] = tmp
+
+    self.writer.put(self.append,time,fields)
+
+
+  ## Appends the record to the chunk buffers, full buffers are written
+  def append(self,time,fields):
+    k = self.n_records % self.chunk_times
+    for name_ in self.names:
+      self.buffer[name_][k] = fields[name_]
+    self.times.append(time)
+    self.n_records += 1
+    if k + 1 == self.chunk_times:
+      self.__flush()
+
+
+  ## Writes the buffered records, the chunks of all tiles and variables
+  def __flush(self):
+    n = len(self.times)
+    if n == 0:
+      return
+    block = (self.n_records - n) // self.chunk_times
+
+    for k in range(n):
+      self.index.write('T ' + str(block*self.chunk_times + k) + ' ' + repr(self.times[k]) + '\n')
+
+    for name_ in self.names:
+      for ti in range(0,self.r,self.tile):
+        for tj in range(0,self.c,self.tile):
+          chunk = np.ascontiguousarray(self.buffer[name_][:n,ti:ti+self.tile,tj:tj+self.tile]).tostring()
+          if self.compression > 0:
+            chunk = zlib.compress(chunk,self.compression)
+          self.data.write(chunk)
+          self.index.write('C ' + name_ + ' ' + str(block) + ' ' + str(n) + ' ' + str(ti//self.tile) + ' ' + \
+            str(tj//self.tile) + ' ' + str(self.offset) + ' ' + str(len(chunk)) + '\n')
+          self.offset += len(chunk)
+          self.n_chunks += 1
+
+    self.data.flush()
+    self.index.flush()
+    self.times = []
+
+
+  ## Writes the rest of the records and closes the store
+  def close(self):
+    self.writer.put(self.__close)
+
+  def __close(self):
+    self.__flush()
+    self.data.close()
+    self.index.close()
+    prt.message('Field store:')
+    prt.message('\t', self.n_records, 'records in', self.n_chunks, 'chunks,', self.offset, 'bytes')
+
+
+
+## Empty class if the fields are not recorded
+class FieldStorePass():
+  def record(self,time,dt,surface):
+    pass
+  def close(self):
+    pass
+
+
+
+## Returns the field store of the computation
+#
+#  @param config main_src.config.Config
+def field_store(config,output,G,writer):
+  if config.field_store is None:
+    return FieldStorePass()
+  return FieldStore(config.field_store,config.field_interval,config.field_compression,output,G,writer)
+
+
+
+## Random access to the field store
+#
+#  only the chunks containing the requested time or cell are read
+#
+class FieldStoreReader():
+
+  ## the constructor
+  #
+  #  @param dir_ directory of the store
+  def __init__(self,dir_):
+    self.dir_   = dir_
+    self.times  = []
+    self.chunks = {}
+    header = {}
+    with open(dir_+os.sep+'index.txt','r') as f:
+      for line in f:
+        z = line.split()
+        if len(z) == 0 or z[0].startswith('#'):
+          continue
+        if z[0] == 'T':
+          self.times.append(float(z[2]))
+        elif z[0] == 'C':
+          # variable, block, tile row, tile col : records, offset, length
+          self.chunks[(z[1],int(z[2]),int(z[4]),int(z[5]))] = (int(z[3]),int(z[6]),int(z[7]))
+        else:
+          header[z[0]] = z[1:]
+
+    self.r           = int(header['rows'][0])
+    self.c           = int(header['cols'][0])
+    self.dtype       = np.dtype(header['dtype'][0])
+    self.NoDataValue = float(header['nodata'][0])
+    self.tile        = int(header['tile'][0])
+    self.chunk_times = int(header['chunk_times'][0])
+    self.compression = int(header['compression'][0])
+    self.names       = header['variables']
+    self.times       = np.array(self.times,float)
+
+
+  ## Returns the chunk as an array [records, rows, cols]
+  def __chunk(self,name_,block,ti,tj):
+    n, offset, length = self.chunks[(name_,block,ti,tj)]
+    with open(self.dir_+os.sep+'fields.bin','rb') as f:
+      f.seek(offset)
+      chunk = f.read(length)
+    if self.compression > 0:
+      chunk = zlib.decompress(chunk)
+    rows = min(self.tile,self.r-ti*self.tile)
+    cols = min(self.tile,self.c-tj*self.tile)
+    return np.fromstring(chunk,self.dtype).reshape([n,rows,cols])
+
+
+  ## Index of the last record at or before the time t
+  def time_index(self,t):
+    return max(int(np.searchsorted(self.times,t,'right'))-1,0)
+
+
+  ## Returns the field of the variable in the record k
+  def field(self,name_,k):
+    block = k // self.chunk_times
+    arr = np.empty([self.r,self.c],self.dtype)
+    for ti in range((self.r+self.tile-1)//self.tile):
+      for tj in range((self.c+self.tile-1)//self.tile):
+        arr[ti*self.tile:(ti+1)*self.tile,tj*self.tile:(tj+1)*self.tile] = \
+          self.__chunk(name_,block,ti,tj)[k % self.chunk_times]
+    return arr
+
+
+  ## Returns the field of the variable at the time t
+  def field_at(self,name_,t):
+    return self.field(name_,self.time_index(t))
+
+
+  ## Returns the time series of the variable in the cell i, j
+  #
+  #  @return times, values
+  def series(self,name_,i,j):
+    ti, tj = i // self.tile, j // self.tile
+    n_blocks = (len(self.times)+self.chunk_times-1)//self.chunk_times
+    values = [self.__chunk(name_,block,ti,tj)[:,i % self.tile,j % self.tile] for block in range(n_blocks)]
+    if len(values) == 0:
+      return self.times, np.zeros([0],self.dtype)
+    return self.times, np.concatenate(values)
+
+
+
+if __name__ == "__main__":
+  if len(sys.argv) < 5:
+    sys.exit('usage: python -m main_src.io_functions.field_store store_dir variable row col')
+  reader = FieldStoreReader(sys.argv[1])
+  times, values = reader.series(sys.argv[2],int(sys.argv[3]),int(sys.argv[4]))
+  sys.stdout.write('# time;' + sys.argv[2] + '\n')
+  for t, v in zip(times,values):
+    sys.stdout.write(str(t) + ';' + str(v) + '\n')
@@ -1,17 +1,26 @@
+## @package main_src.io_functions.hydrographs hydrographs of the points
+#
+#  One file point<id>.dat is written for each point of the hydrographs, the record
+#  is written after each time step. The records of the time step are collected and
+#  passed to the writer as one job (Hydrographs.flush). With the aggregation interval (main_src.config.Config.hydrograph_interval,
+#  optional parameter constants.PARAMETER_HYDROGRAPH_INTERVAL) the time steps are aggregated
+#  into one record per interval, see AggregatedHydrographs.
+#
+
 import sys
+import math
 import numpy as np
 import os
-from   main_src.tools.tools  import comp_type
 import main_src.io_functions.prt as prt
-from   main_src.tools.tools import get_argv
-import main_src.constants as constants
+from   main_src.io_functions.writer import OutputWriterPass
 
-extraout = get_argv(constants.PARAMETER_EXTRA_OUTPUT)
-rill, subflow, stream, diffuse = comp_type() 
-    
 
 class Hydrographs:
-  def __init__(self,array_points,outdirr,mat_tok_usek,G):
+
+  ## the constructor
+  #
+  #  @param writer main_src.io_functions.writer.OutputWriter, the lines are written by the writer
+  def __init__(self,array_points,outdirr,mat_tok_usek,G,writer=None):
     points = array_points
     ipi    = points.shape[0]
     jpj    = 5
@@ -20,6 +29,11 @@ class Hydrographs:
     self.inSurface = []
     self.inStream = []
 
+    rill     = G.isRill
+    subflow  = G.subflow
+    stream   = G.stream
+    extraout = G.extra_output
+
 
     for ip in range(ipi):
       for jp in [0,1,2]:
@@ -68,7 +82,7 @@ class Hydrographs:
    
    
     counter = 0
-    if (mat_tok_usek != None) and (stream == True):
+    if (mat_tok_usek is not None) and (stream == True):
       for ip in range(ipi):
         l = point_int[ip][1]
         m = point_int[ip][2]
@@ -90,6 +104,10 @@ class Hydrographs:
     self.subflow = subflow
     self.rill    = rill
     self.stream  = stream
+    self.extraout = extraout
+    if writer is None:
+      writer = OutputWriterPass()
+    self.writer = writer
     self.pixel_area = G.pixel_area
     #print self.point_int
     #raw_input()
@@ -126,11 +144,12 @@ class Hydrographs:
 
 
     
+    self.lines = [[] for i in range(self.n)]
     self.files = []
     for i in range(self.n):
       name_ = outdirr+os.sep+'point'+str(self.point_int[i][0]).zfill(3)+'.dat'
       file_ = open(name_,'w')
-      file_.writelines(self.header[i])
+      file_.writelines(self.header_lines(i,self.header[i]))
       self.files.append(file_)
     
     
@@ -149,6 +168,15 @@ class Hydrographs:
 
     
     
+  ## Rainfall of the cell l, m
+  #
+  #  currRain is an array of all cells if the rainfall is distributed
+  def cell_rain(self,currRain,l,m):
+    if np.ndim(currRain) > 0:
+      return currRain[l][m]
+    return currRain
+
+
   def write_hydrographs_record(self,i,j,ratio,courant,courantRill,iter_,dt,total_time,surface,subsurface,currRain,inStream=False,sep=';'):
 
     if inStream :
@@ -157,34 +185,40 @@ class Hydrographs:
         m = self.point_int[ip][2]
         line = str(total_time) + sep
         line += str(dt) + sep
-        line += str(currRain) + sep
+        line += str(self.cell_rain(currRain,l,m)) + sep
         line += surface.return_stream_str_vals(l,m,sep,dt)
         line += '\n'
-        self.files[ip].writelines(line)
+        self.write_line(ip,total_time,dt,line,sep)
+      # the stream records are the last ones of the time step
+      self.flush()
     else:
       for ip in self.inSurface:
         l = self.point_int[ip][1]
         m = self.point_int[ip][2]
         if i == l and j == m:
+          rain = self.cell_rain(currRain,l,m)
           line = str(total_time) + sep
           line += str(dt) + sep
-          line += str(currRain) + sep
+          line += str(rain) + sep
           linebil = surface.return_str_vals(l,m,sep,dt)
           line += linebil[0] + sep
           #print currRain*self.pixel_area
           #raw_input()
           
-          line += str(currRain*self.pixel_area+linebil[1]) # + sep
-          line += subsurface.return_str_vals(l,m,sep,dt) + sep
-          if extraout :
+          line += str(rain*self.pixel_area+linebil[1]) # + sep
+          linesub = subsurface.return_str_vals(l,m,sep,dt)
+          if linesub:
+            line += sep + linesub
+          line += sep
+          if self.extraout :
             line += str(surface.arr[l][m].V_to_rill) + sep
-            line += str(ratio) + sep
+            line += str(ratio[l][m]) + sep
             line += str(courant) + sep
             line += str(courantRill) + sep
             line += str(iter_)
             
           line += '\n'
-          self.files[ip].writelines(line) 
+          self.write_line(ip,total_time,dt,line,sep)
   
   #def write_hydrographs_usek(self,dt,total_time,surface,currRain,sep=';'):
     #line = str(total_time) + sep
@@ -195,14 +229,156 @@ class Hydrographs:
     #self.tokusek.writelines(line)
 
 
+  ## Returns the header of the file of the point i
+  def header_lines(self,i,header):
+    return header
+
+
+  ## Adds the record of the point ip to the records of the time step
+  def write_line(self,ip,total_time,dt,line,sep=';'):
+    self.lines[ip].append(line)
+
+
+  ## Passes the records of the time step to the writer as one job
+  def flush(self):
+    lines = [(self.files[ip], lines_) for ip, lines_ in enumerate(self.lines) if lines_]
+    if lines:
+      self.lines = [[] for i in range(self.n)]
+      self.writer.put(write_lines,lines)
+
+
+  ## Writes the records not passed to the writer and closes the files
+  #
+  #  called by the writer after the records of all time steps
   def closeHydrographs(self):
+    write_lines([(self.files[ip], lines_) for ip, lines_ in enumerate(self.lines)])
+    self.lines = [[] for i in range(self.n)]
     for i in range(self.n):
       self.files[i].close()
-      
+
+
+
+## Writes the lines into the files
+#
+#  @param lines list of (file, lines of the file)
+def write_lines(lines):
+  for file_, lines_ in lines:
+    file_.writelines(lines_)
+
+
+
+## columns summed over the interval, parts of the column names
+summed = ['deltaTime', 'Rainfall', 'V_runoff', 'V_inflow', 'Infiltration', 'SurfaceBil',
+          'V_from_field', 'Percolation', 'exfiltration', 'V_to_rill']
+
+
+## Returns the aggregation of the hydrograph column
+#
+#  @return 'flow' for the flows [m3/s], 'sum' for the volumes and the depths of the time step,
+#          'last' for the states and the other values
+def column_kind(name_):
+  if '[m3/s]' in name_:
+    return 'flow'
+  for part in summed:
+    if part in name_:
+      return 'sum'
+  return 'last'
+
+
+
+## Hydrographs aggregated to the fixed interval
+#
+#  the records of the time steps are aggregated until the end of the time step
+#  reaches the end of the interval (multiple of the interval), then one record is written:
+#    - \b Time          end of the last time step of the interval
+#    - \b deltaTime     length of the interval
+#    - \b volumes       (the runoff, the rainfall, the infiltration, ...) summed over the interval
+#    - \b flows         mean over the interval, the maximum of the time steps is added in the column <name>_max
+#    - \b states        (the water levels, the rests, the state, ...) at the end of the interval
+#
+#  the size of the files is thus given by the duration of the computation, not by the number of the time steps
+#
+class AggregatedHydrographs(Hydrographs):
+
+  ## the constructor
+  #
+  #  @param interval aggregation interval [s]
+  def __init__(self,array_points,outdirr,mat_tok_usek,G,writer=None,interval=60.0):
+    self.interval = float(interval)
+    self.kinds    = []
+    Hydrographs.__init__(self,array_points,outdirr,mat_tok_usek,G,writer)
+    self.pending  = [None]*self.n
+    self.next     = [0.0]*self.n
+    prt.message("\tthe records are aggregated to", self.interval, "[s]")
+
+
+  def header_lines(self,i,header):
+    lines = header.split('\n')
+    names = lines[-2].lstrip('# ').split(';')
+    kinds = [column_kind(name_) for name_ in names]
+    self.kinds.append(kinds)
+    lines[-2] = lines[-2] + ''.join([';' + name_ + '_max' for name_, kind in zip(names,kinds) if kind == 'flow'])
+    lines.insert(-2, '# records aggregated to ' + str(self.interval) + ' [s]: volumes summed, flows mean and max, states at the end')
+    return '\n'.join(lines)
+
+
+  def write_line(self,ip,total_time,dt,line,sep=';'):
+    fields = line.rstrip('\n').split(sep)
+    while fields and fields[-1] == '':
+      fields.pop()
+    kinds = self.kinds[ip] + ['last']*(len(fields) - len(self.kinds[ip]))
+
+    acc = self.pending[ip]
+    if acc is None:
+      acc = {'dt' : 0.0, 'sum' : [0.0]*len(fields), 'max' : [None]*len(fields)}
+      self.pending[ip] = acc
+
+    for k, (kind, value) in enumerate(zip(kinds,fields)):
+      if kind == 'sum':
+        acc['sum'][k] += float(value)
+      elif kind == 'flow':
+        value = float(value)
+        acc['sum'][k] += value*dt
+        acc['max'][k] = value if acc['max'][k] is None else max(acc['max'][k],value)
+    acc['dt']   += dt
+    acc['last'] = fields
+
+    if total_time >= self.next[ip] - 1e-9*self.interval:
+      self.lines[ip].append(self.__record(ip,sep))
+      self.next[ip] = self.interval*(math.floor(total_time/self.interval + 1e-9) + 1)
+
+
+  ## Returns the record of the interval and starts the next one
+  def __record(self,ip,sep):
+    acc = self.pending[ip]
+    kinds = self.kinds[ip] + ['last']*(len(acc['last']) - len(self.kinds[ip]))
+    out = []
+    flow_max = []
+    for k, (kind, value) in enumerate(zip(kinds,acc['last'])):
+      if kind == 'sum':
+        out.append(str(acc['sum'][k]))
+      elif kind == 'flow':
+        out.append(str(acc['sum'][k]/acc['dt']) if acc['dt'] > 0.0 else value)
+        flow_max.append(str(acc['max'][k]))
+      else:
+        out.append(value)
+    self.pending[ip] = None
+    return sep.join(out + flow_max) + '\n'
+
+
+  ## Writes the last interval and closes the files
+  #
+  #  called by the writer after the records of all time steps
+  def closeHydrographs(self):
+    for ip in range(self.n):
+      if self.pending[ip] is not None:
+        self.lines[ip].append(self.__record(ip,';'))
+    Hydrographs.closeHydrographs(self)
+
 
 
 class HydrographsPass:
-  def write_hydrographs_record(self,i,j,dt,total_time,surface,subsurface):
+  def write_hydrographs_record(self,i,j,ratio,courant,courantRill,iter_,dt,total_time,surface,subsurface,currRain,inStream=False,sep=';'):
     pass
   def closeHydrographs(self):
     pass
@@ -0,0 +1,183 @@
+## @package main_src.io_functions.mass_balance catchment-wide mass balance
+#
+#  After each time step the water volumes of the whole catchment are summed from
+#  the arrays of main_src.main_classes.CumulativeMax.Cumulative and from the stream
+#  reach arrays. The volumes [m3] of the time step are written into the file
+#  mass_balance.dat in the output directory:
+#
+#    - \b rain           gross rainfall on the catchment
+#    - \b interception   rainfall intercepted by vegetation
+#    - \b infiltration   infiltrated volume
+#    - \b exfiltration   volume exfiltrated from the subsurface
+#    - \b base_flow      volume added to the stream reaches by the base flow (Q365), the outflow
+#                        of the reaches includes it
+#    - \b retention      volume stored in the surface retention
+#    - \b storage        surface and rill water volume at the end of the time step (including the runoff in transit to the next cell)
+#    - \b stream_storage water volume in the stream reaches at the end of the time step
+#    - \b outflow        outflow from the catchment over the boundary and the stream outlets
+#    - \b residual       rain - interception - infiltration + exfiltration + base_flow - retention - outflow
+#                        - change of the storages
+#    - \b rel_error      residual related to the water volume in the catchment
+#
+#  The time steps with the relative error greater than the threshold
+#  (main_src.config.Config.mass_balance, optional parameter constants.PARAMETER_MASS_BALANCE) are flagged in the last
+#  column and counted.
+#
+#  The balance does not contain the storage of the subsurface,
+#  the subsurface water drained by the streams appears in the residual.
+#
+
+import os
+import numpy as np
+
+import main_src.io_functions.prt  as prt
+
+
+
+## Catchment mass balance monitor
+#
+class MassBalance():
+
+  ## the constructor
+  #
+  #  @param output output directory
+  #  @param G main_src.main_classes.General.Globals
+  #  @param surface main_src.main_classes.Surface.Surface
+  #  @param cumulative main_src.main_classes.CumulativeMax.Cumulative
+  #  @param threshold threshold of the relative error
+  def __init__(self,output,G,surface,cumulative,threshold=0.01):
+
+    self.threshold = float(threshold)
+    self.cumulative = cumulative
+    self.reach = getattr(surface,'reach',None)
+    self.pixel_area = G.pixel_area
+    self.n_cells = sum([len(G.rc[i]) for i in G.rr])
+
+    ## surface and rill water volume in each cell at the end of the time step [m3]
+    self.storage = np.zeros([G.r,G.c],float)
+
+    self.sep = ';'
+    self.n_flagged = 0
+    self.max_error = 0.0
+    self.cum_residual = 0.0
+
+    # previous sums of the cumulative arrays and the storages
+    self.pre = {'precipitation' : 0.0,
+                'infiltration'  : 0.0,
+                'exfiltration'  : 0.0,
+                'sur_ret'       : 0.0,
+                'runoff'        : 0.0,
+                'inflow'        : 0.0,
+                'transit'       : 0.0,
+                'storage'       : 0.0,
+                'stream_storage': 0.0}
+
+    prt.message('Mass balance:')
+    prt.message('\tthreshold of the relative error', self.threshold)
+
+    self.file_ = open(output+os.sep+'mass_balance.dat','w')
+    self.file_.write('# catchment mass balance [m3], flag = 1 if rel_error > ' + str(self.threshold) + '\n')
+    self.file_.write('# time;dt;rain;interception;infiltration;exfiltration;base_flow;retention;storage;stream_storage;outflow;residual;rel_error;flag\n')
+
+
+  ## Stores the surface and rill water volume of the cell
+  #
+  #  method is called in main_src.runoff in the loop over the cells
+  #  which saves the cumulative values
+  def cell_storage(self,i,j,sur):
+    self.storage[i][j] = sur.V_rest + sur.V_rill_rest
+
+
+  ## Computes and writes the mass balance of the time step
+  #
+  #  the runoff of the cells in the time step is the inflow of the
+  #  neighbouring cells in the next time step, the runoff which does not come
+  #  into any cell in the next time step has left the catchment.
+  #
+  #  @param time time at the end of the time step
+  #  @param dt time step
+  #  @param rainfall gross rainfall in the time step [m], array of the cells if the rainfall is distributed
+  def update(self,time,dt,rainfall):
+
+    cum = self.cumulative
+    pre = self.pre
+    cur = {}
+
+    cur['precipitation'] = cum.precipitation.sum()
+    cur['infiltration']  = cum.infiltration.sum()
+    cur['exfiltration']  = cum.exfiltration.sum() if hasattr(cum,'exfiltration') else 0.0
+    cur['sur_ret']       = cum.sur_ret.sum()
+    cur['runoff']        = cum.V_sur.sum() + cum.V_rill.sum()
+    cur['inflow']        = cum.inflow_sur.sum()
+
+    # the runoff of the time step is in transit to the next cell
+    cur['transit'] = cur['runoff'] - pre['runoff']
+    cur['storage'] = self.storage.sum() + cur['transit']
+
+    if self.reach is not None:
+      cur['stream_storage'] = self.reach.V_rest.sum()
+      stream_outflow = self.reach.V_out_domain.sum()
+      base_flow      = self.reach.V_base.sum()
+    else:
+      cur['stream_storage'] = 0.0
+      stream_outflow = 0.0
+      base_flow      = 0.0
+
+    if np.ndim(rainfall) > 0:
+      rain       = rainfall.sum()*self.pixel_area
+    else:
+      rain       = rainfall*self.pixel_area*self.n_cells
+    interception = rain - (cur['precipitation'] - pre['precipitation'])
+    infiltration = cur['infiltration'] - pre['infiltration']
+    exfiltration = cur['exfiltration'] - pre['exfiltration']
+    retention    = cur['sur_ret'] - pre['sur_ret']
+    outflow      = pre['transit'] - (cur['inflow'] - pre['inflow']) + stream_outflow
+
+    residual = rain - interception - infiltration + exfiltration + base_flow - retention - outflow \
+               - (cur['storage'] - pre['storage']) - (cur['stream_storage'] - pre['stream_storage'])
+
+    volume = pre['storage'] + pre['stream_storage'] + rain + base_flow
+    if volume > 0.0:
+      rel_error = abs(residual)/volume
+    else:
+      rel_error = 0.0
+
+    flag = 0
+    if rel_error > self.threshold:
+      flag = 1
+      if self.n_flagged == 0:
+        prt.message('Mass balance: relative error', rel_error, 'exceeds the threshold at time', time, '[s]')
+      self.n_flagged += 1
+
+    self.max_error     = max(self.max_error,rel_error)
+    self.cum_residual += residual
+
+    sep = self.sep
+    self.file_.write(str(time) + sep + str(dt) + sep + str(rain) + sep + str(interception) + sep + \
+      str(infiltration) + sep + str(exfiltration) + sep + str(base_flow) + sep + str(retention) + sep + \
+      str(cur['storage']) + sep + str(cur['stream_storage']) + sep + str(outflow) + sep + \
+      str(residual) + sep + str(rel_error) + sep + str(flag) + '\n')
+
+    self.pre = cur
+
+
+  def close(self):
+    self.file_.close()
+    prt.message('Mass balance:')
+    prt.message('\tcumulative residual', self.cum_residual, '[m3]')
+    prt.message('\tmaximum relative error', self.max_error)
+    prt.message('\tsteps over the threshold', self.n_flagged)
+
+
+
+## Empty class if the mass balance is not computed
+#
+#  the mass balance is computed from the cumulative arrays,
+#  which are not stored in the outlet-only mode
+class MassBalancePass():
+  def cell_storage(self,i,j,sur):
+    pass
+  def update(self,time,dt,rainfall):
+    pass
+  def close(self):
+    pass
@@ -0,0 +1,144 @@
+## @package main_src.io_functions.outlets hydrographs of the catchment outlets
+#
+#  The outflow over the domain boundary is recorded in each time step
+#  and aggregated per outlet. The cells whose runoff is not taken by any cell
+#  of the domain (see main_src.main_classes.Flow.D8.exit_fractions) are assigned
+#  to the nearest outlet cell of main_src.tools.domain.find_outlets (outletCells),
+#  the outflow of the stream reaches leaving the domain is recorded
+#  for each reach separately.
+#
+#  The discharges [m3/s] are written into the file outlets.dat in the output directory:
+#    - \b time    time at the end of the time step
+#    - \b dt      time step
+#    - \b outlet_k outflow of the cells assigned to the outlet k
+#    - \b reach_k outflow of the stream reach with FID k
+#    - \b total   total outflow of the catchment
+#
+#  The outlets are recorded in the outlet-only mode (main_src.config.Config.outlet_only,
+#  optional parameter constants.PARAMETER_OUTLET_ONLY), in which the cumulative rasters,
+#  the hydrographs of the points and the mass balance are not computed.
+#
+
+import os
+import numpy as np
+
+import main_src.io_functions.prt  as prt
+
+
+
+## Records the outflow of the catchment outlets
+#
+class Outlets():
+
+  ## the constructor
+  #
+  #  @param outletCells outlet cells [[row,col], ...]
+  #  @param output output directory
+  #  @param surface main_src.main_classes.Surface.Surface
+  #  @param writer main_src.io_functions.writer.OutputWriter
+  def __init__(self,outletCells,output,surface,writer):
+
+    self.writer = writer
+    self.surface = surface
+    self.outletCells = [[int(cell[0]),int(cell[1])] for cell in outletCells]
+    self.n_outlets = max(len(self.outletCells),1)
+
+    self.reach = getattr(surface,'reach',None)
+    if self.reach is not None:
+      self.reaches = np.where(~self.reach.inDomain)[0]
+    else:
+      self.reaches = np.zeros([0],int)
+
+    self.__exit_cells()
+
+    self.volume = np.zeros([self.n_outlets+len(self.reaches)],float)
+    self.sep = ';'
+
+    names = ['outlet_' + str(k) for k in range(self.n_outlets)]
+    if self.reach is not None:
+      names += ['reach_' + str(self.reach.id_[k]) for k in self.reaches]
+
+    self.file_ = open(output+os.sep+'outlets.dat','w')
+    self.file_.write('# outflow of the catchment outlets [m3/s]\n')
+    for k in range(len(self.outletCells)):
+      self.file_.write('# outlet_' + str(k) + ' cell ' + str(self.outletCells[k][0]) + ' ' + \
+        str(self.outletCells[k][1]) + ', boundary cells ' + str(int((self.outlet == k).sum())) + '\n')
+    self.file_.write('# time' + self.sep + 'dt' + self.sep + self.sep.join(names) + self.sep + 'total\n')
+
+    prt.message('Outlets:')
+    prt.message('\t', self.n_outlets, 'outlets,', len(self.cells_i), 'boundary cells,', len(self.reaches), 'stream outlets')
+
+
+  ## Finds the cells whose runoff leaves the domain and assigns them to the nearest outlet
+  def __exit_cells(self):
+    self.inflows = self.surface.inflows
+    exit_sheet, exit_rill = self.surface.exit_fractions()
+    self.cells_i, self.cells_j = np.where((exit_sheet > 0.0) | (exit_rill > 0.0))
+    self.exit_sheet = exit_sheet[self.cells_i,self.cells_j]
+    self.exit_rill  = exit_rill[self.cells_i,self.cells_j]
+
+    if len(self.outletCells) == 0:
+      self.outlet = np.zeros(len(self.cells_i),int)
+    else:
+      outlets = np.array(self.outletCells,float)
+      dist = (self.cells_i[:,np.newaxis] - outlets[:,0])**2 + (self.cells_j[:,np.newaxis] - outlets[:,1])**2
+      self.outlet = np.argmin(dist,axis=1)
+
+
+  ## Records the outflow of the time step
+  #
+  #  called in main_src.runoff after the outflow of the stream reaches is computed
+  #
+  #  @param time time at the end of the time step
+  #  @param dt time step
+  def update(self,time,dt):
+
+    # the flow directions are changed in the diffuse approach
+    if self.surface.inflows is not self.inflows:
+      self.__exit_cells()
+
+    arr = self.surface.arr
+    outflow = np.zeros([len(self.volume)],float)
+    for k in range(len(self.cells_i)):
+      sur = arr[self.cells_i[k]][self.cells_j[k]]
+      outflow[self.outlet[k]] += self.exit_sheet[k]*sur.V_runoff + self.exit_rill[k]*sur.V_runoff_rill
+
+    if len(self.reaches) > 0:
+      outflow[self.n_outlets:] = self.reach.V_out_domain[self.reaches]
+
+    self.volume += outflow
+    self.writer.put(self.write,time,dt,outflow)
+
+
+  def write(self,time,dt,outflow):
+    sep = self.sep
+    self.file_.write(str(time) + sep + str(dt) + sep + sep.join([str(v/dt) for v in outflow]) + \
+      sep + str(outflow.sum()/dt) + '\n')
+
+
+  def close(self):
+    self.writer.put(self.__close,self.volume.copy())
+
+  def __close(self,volume):
+    self.file_.close()
+    prt.message('Outlets:')
+    prt.message('\ttotal outflow', volume.sum(), '[m3]')
+
+
+
+## Empty class if the outlets are not recorded
+class OutletsPass():
+  def update(self,time,dt):
+    pass
+  def close(self):
+    pass
+
+
+
+## Returns the outlet hydrographs of the computation
+#
+#  @param config main_src.config.Config
+def outlets(config,outletCells,output,surface,writer):
+  if not config.outlet_only:
+    return OutletsPass()
+  return Outlets(outletCells,output,surface,writer)
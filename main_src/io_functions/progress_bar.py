@@ -1,53 +1,185 @@
-import main_src.constants        as     constants
-from   main_src.tools.tools      import get_argv
+## @package main_src.io_functions.progress_bar progress of the computation
+#
+#  The progress is reported at most once in the wall clock interval
+#  (main_src.config.Config.progress_interval, optional parameter
+#  constants.PARAMETER_PROGRESS_INTERVAL, 0 means each time step):
+#    - \b total time         simulated time [s]
+#    - \b time step          last time step [s]
+#    - \b time iterations    iterations of the last time step
+#    - \b speed              simulated seconds per wall clock second
+#    - \b cell steps         cells x time steps per wall clock second
+#    - \b Courant retries    share of the time step iterations rejected by the Courant condition
+#    - \b time to end        wall clock time to the end, from the smoothed speed
+#
+#  The speed and the retries are evaluated since the previous report.
+#  The reports can be written as JSON lines into the file
+#  (Config.progress_json, constants.PARAMETER_PROGRESS_JSON) for the job schedulers.
+#
+
 import main_src.io_functions.prt as     prt
 import time
-arcgis = get_argv(constants.PARAMETER_ARCGIS)
-
-
-if arcgis:
-  import arcpy
-  class ArcPROG:
-    def update(self,timeperc,dt,iter_,total_time):
-      timeperc = int(round(timeperc))
-      arcpy.SetProgressor("step", "Progress...",0,100,timeperc)
-      arcpy.SetProgressorPosition(timeperc)
-  
-  pb = ArcPROG()
-  
-  
-else:
-  
-  class CPROG:
-    def __init__(self):
-      self.pre = 0
-      self.startTime  = time.time()
-    
-    def update(self,i,dt,iter_,total_time):
-      ##print i
-      ##i = round(i)
-      if i == 0.0:
-        #prt.message("-----------------------------------------------------------")
-        #prt.message("Total time = ", 0.0, "| time step  = ", "%.2f" % round(dt, 3) , "    | time iterations = ", iter_ )
-        #prt.message("{:10.4f}".format(i) + " %", 'is done       | time to end = ??? s')
-        prt.message("Total time [s]:   0.0")
-        prt.message("Time step  [s]:  ", "%.2f" % dt)
-        prt.message("Time iterations: ", iter_ )
-        prt.message("Percentage done: ", "%.2f" % i + " %")
-        prt.message("Time to end [s]:  ???")
-        prt.message("-----------------------------------------------------------")
-      else:
-        self.pre = i
-        self.currTime = time.time()
-        diffTime = self.currTime-self.startTime
-        remaining = (100.0*diffTime)/i - diffTime
-        prt.message("Total time [s]:  ", "%.2f" % total_time)
-        prt.message("Time step  [s]:  ", "%.2f" % dt)
-        prt.message("Time iterations: ", iter_ )
-        prt.message("Percentage done: ", "%.2f" % i + " %")
-        prt.message("Time to end [s]: ", "%.2f" % remaining)
-        prt.message("-----------------------------------------------------------")
-        
-    
-  pb = CPROG()
+import json
+
+
+## arcpy module, imported in setup only if the arcgis progressor is used
+arcpy = None
+
+
+class ArcPROG:
+  def update(self,timeperc,dt,iter_,total_time):
+    timeperc = int(round(timeperc))
+    arcpy.SetProgressor("step", "Progress...",0,100,timeperc)
+    arcpy.SetProgressorPosition(timeperc)
+
+  def close(self):
+    pass
+
+
+
+## Console progress with the rate limited reports
+#
+class CPROG:
+
+  ## the constructor
+  #
+  #  @param interval minimum wall clock time between the reports [s]
+  #  @param n_cells number of the computed cells
+  #  @param end_time end time of the computation [s]
+  #  @param json_file file of the JSON lines, None if not written
+  #  @param smoothing weight of the last interval in the smoothed speed
+  def __init__(self,interval=0.0,n_cells=0,end_time=None,json_file=None,smoothing=0.3):
+    self.interval  = float(interval)
+    self.n_cells   = n_cells
+    self.end_time  = end_time
+    self.smoothing = smoothing
+
+    self.startTime = time.time()
+    self.reported  = None
+    self.speed     = None
+
+    # since the last report
+    self.steps      = 0
+    self.iterations = 0
+    self.sim_time   = 0.0
+    self.last       = None
+
+    self.n_steps   = 0
+    self.n_reports = 0
+
+    if json_file is None:
+      self.json = None
+    else:
+      self.json = open(json_file,'w')
+
+
+  ## Records the time step, the report is made if the interval passed
+  #
+  #  @param timeperc percentage of the computation done
+  #  @param dt time step
+  #  @param iter_ iterations of the time step
+  #  @param total_time simulated time at the end of the time step
+  def update(self,timeperc,dt,iter_,total_time):
+    self.steps      += 1
+    self.n_steps    += 1
+    self.iterations += iter_
+    self.last = (timeperc,dt,iter_,total_time)
+
+    now = time.time()
+    if self.reported is not None and now - self.reported[0] < self.interval:
+      return
+    self.__report(now)
+
+
+  def __report(self,now):
+    timeperc, dt, iter_, total_time = self.last
+
+    if self.reported is None:
+      wall, sim = self.startTime, 0.0
+    else:
+      wall, sim = self.reported
+    elapsed = max(now - wall,1e-9)
+
+    speed = (total_time - sim)/elapsed
+    if self.speed is None:
+      self.speed = speed
+    else:
+      self.speed = self.smoothing*speed + (1.0-self.smoothing)*self.speed
+
+    cell_steps = self.n_cells*self.steps/elapsed
+    retries = float(self.iterations - self.steps)/max(self.iterations,1)
+
+    if self.end_time is not None:
+      end_time = self.end_time
+    elif timeperc > 0.0:
+      end_time = 100.0*total_time/timeperc
+    else:
+      end_time = total_time
+    if self.speed > 0.0:
+      remaining = max(end_time - total_time,0.0)/self.speed
+    else:
+      remaining = None
+
+    prt.message("Total time [s]:  ", "%.2f" % total_time)
+    prt.message("Time step  [s]:  ", "%.2f" % dt)
+    prt.message("Time iterations: ", iter_ )
+    prt.message("Percentage done: ", "%.2f" % timeperc + " %")
+    prt.message("Speed [s/s]:     ", "%.2f" % speed)
+    prt.message("Cell steps [1/s]:", "%.0f" % cell_steps)
+    prt.message("Courant retries: ", "%.2f" % (100.0*retries) + " %")
+    if remaining is None:
+      prt.message("Time to end [s]:  ???")
+    else:
+      prt.message("Time to end [s]: ", "%.2f" % remaining)
+    prt.message("-----------------------------------------------------------")
+
+    if self.json is not None:
+      record = {'wall_time'      : now - self.startTime,
+                'total_time'     : total_time,
+                'end_time'       : end_time,
+                'percent'        : timeperc,
+                'dt'             : dt,
+                'steps'          : self.n_steps,
+                'speed'          : speed,
+                'cell_steps'     : cell_steps,
+                'courant_retries': retries,
+                'eta'            : remaining}
+      self.json.write(json.dumps(record, sort_keys=True) + '\n')
+      self.json.flush()
+
+    self.reported   = (now,total_time)
+    self.steps      = 0
+    self.iterations = 0
+    self.last       = None
+    self.n_reports += 1
+
+
+  ## Reports the last time steps and closes the JSON file
+  def close(self):
+    if self.last is not None:
+      self.__report(time.time())
+    if self.json is not None:
+      self.json.close()
+      self.json = None
+
+
+
+## Creates the progress bar of the computation
+#
+#  called at the start of each computation, the time to end
+#  is estimated from the start of the computation
+#
+#  @param arcgis progress is shown in the arcgis progressor
+#  @param interval minimum wall clock time between the reports [s]
+#  @param n_cells number of the computed cells
+#  @param end_time end time of the computation [s]
+#  @param json_file file of the JSON lines, None if not written
+def setup(arcgis=False,interval=0.0,n_cells=0,end_time=None,json_file=None):
+  global pb, arcpy
+  if arcgis:
+    import arcpy
+    pb = ArcPROG()
+  else:
+    pb = CPROG(interval,n_cells,end_time,json_file)
+
 
+pb = CPROG()
@@ -0,0 +1,112 @@
+## @package main_src.io_functions.writer output of the computation on a background thread
+#
+#  The main loop hands the output jobs (a function and its arguments) to
+#  the writer, the jobs are performed in the order they were given.
+#  The arguments of the jobs have to be snapshots which are not changed by
+#  the computation afterwards (strings, copies of the arrays).
+#
+#  The size of the queue (main_src.config.Config.output_queue, optional
+#  parameter constants.PARAMETER_OUTPUT_QUEUE) gives the backpressure:
+#    - \b 0 the jobs are performed immediately on the compute thread
+#    - \b n at most n jobs wait for the writer thread, the main loop
+#      waits if the queue is full
+#
+
+import sys
+import threading
+import Queue
+
+import main_src.io_functions.prt as prt
+
+
+
+## Performs the output jobs on the background thread
+#
+class OutputWriter():
+
+  ## the constructor
+  #
+  #  @param queue_size maximum number of the jobs waiting for the writer
+  def __init__(self,queue_size):
+    self.queue = Queue.Queue(maxsize=queue_size)
+    self.exc_info = None
+    self.n_jobs = 0
+    self.thread = threading.Thread(target=self.__work, name='smoderp-writer')
+    self.thread.daemon = True
+    self.thread.start()
+    prt.message('Output writer:')
+    prt.message('\tbackground thread, queue size', queue_size)
+
+
+  def __work(self):
+    while True:
+      job = self.queue.get()
+      if job is None:
+        self.queue.task_done()
+        return
+      fce, args = job
+      if self.exc_info is None:
+        try:
+          fce(*args)
+        except:
+          self.exc_info = sys.exc_info()
+      self.queue.task_done()
+
+
+  def __check(self):
+    if self.exc_info is not None:
+      exc_info = self.exc_info
+      self.exc_info = None
+      raise exc_info[0], exc_info[1], exc_info[2]
+
+
+  ## Adds the job fce(*args) to the queue
+  #
+  #  waits if the queue is full
+  def put(self,fce,*args):
+    self.__check()
+    self.n_jobs += 1
+    self.queue.put((fce,args))
+
+
+  ## Waits until all the jobs are done
+  def flush(self):
+    self.queue.join()
+    self.__check()
+
+
+  ## Performs the remaining jobs and stops the thread
+  def close(self):
+    self.queue.put(None)
+    self.thread.join()
+    self.__check()
+
+
+
+## Performs the output jobs immediately
+#
+class OutputWriterPass():
+
+  def __init__(self):
+    self.n_jobs = 0
+
+  def put(self,fce,*args):
+    self.n_jobs += 1
+    fce(*args)
+
+  def flush(self):
+    pass
+
+  def close(self):
+    pass
+
+
+
+## Returns the writer of the computation
+#
+#  @param queue_size maximum number of the jobs waiting for the writer, 0 for the synchronous output
+def output_writer(queue_size):
+  queue_size = int(queue_size)
+  if queue_size > 0:
+    return OutputWriter(queue_size)
+  return OutputWriterPass()
@@ -8,21 +8,18 @@
 
 
 # globals import 
+import sys
 import numpy as np
 
 
 
 # smoderp import 
-from   main_src.main_classes.General import *
-from   main_src.tools.tools          import comp_type
+from   main_src.main_classes.General import Globals, Size
+import main_src.tools.precision          as precision
 import main_src.io_functions.prt         as prt
 
 
 
-isRill, subflow, stream, diffuse = comp_type()
-
-
-
 
 
 
@@ -66,22 +63,24 @@ class CumulativeSubsurface(object):
 
     r = self.r
     c = self.c
+    float_     = precision.float_
+    float_cum  = precision.float_cum
 
     self.n += 5
     
     ## cumulative exfiltration volume [m3]
-    self.exfiltration      =  np.zeros([r,c],float)
+    self.exfiltration      =  np.zeros([r,c],float_cum)
     ## cumulative percolation volume [m3]
-    self.percolation      =  np.zeros([r,c],float)
+    self.percolation      =  np.zeros([r,c],float_cum)
     ## maximum water level in rills [m]
     # 
     #  the height is related to the total cell area not the rill ares 
     #
-    self.h_sub      =  np.zeros([r,c],float)
+    self.h_sub      =  np.zeros([r,c],float_)
     ## maximum discharge from rills [m3s-1]
-    self.q_sub      =  np.zeros([r,c],float)
+    self.q_sub      =  np.zeros([r,c],float_)
     ## cumulative outflow volume in rills [m3]
-    self.V_sub      =  np.zeros([r,c],float)
+    self.V_sub      =  np.zeros([r,c],float_cum)
 
   
   
@@ -89,18 +88,18 @@ class CumulativeSubsurface(object):
   #  
   #  Method is called in main_src.runoff
   #  
-  def update_cumulative_sur(self,i,j,sub,q_subsur):
+  def update_cumulative_sur(self,i,j,sub):
 
 
 
-    self.exfiltration[i][j] += sub.exfiltration*self.pixel_area
-    self.percolation[i][j] += sub.percolation*self.pixel_area
-    self.V_sub[i][j] += sub.V_runoff
+    self.exfiltration[i][j] += sub.exfiltration[i][j]*self.pixel_area
+    self.percolation[i][j] += sub.percolation[i][j]*self.pixel_area
+    self.V_sub[i][j] += sub.V_runoff[i][j]
 
-    if sub.h > self.h_sub[i][j]:
-      self.h_sub[i][j] = sub.h
-    if q_subsur > self.q_sub[i][j]:
-      self.q_sub[i][j] = q_subsur
+    if sub.h[i][j] > self.h_sub[i][j]:
+      self.h_sub[i][j] = sub.h[i][j]
+    if sub.q_subsurface[i][j] > self.q_sub[i][j]:
+      self.q_sub[i][j] = sub.q_subsurface[i][j]
  
 
 
@@ -114,7 +113,7 @@ class CumulativeSubsurfacePass(object):
   #  
   #  Method is called in main_src.runoff
   #  
-  def update_cumulative_sur(self,i,j,sub,q_subsur):
+  def update_cumulative_sur(self,i,j,sub):
     pass
 
 
@@ -133,7 +132,7 @@ class CumulativeSubsurfacePass(object):
 #  the surface and rill flow 
 #  
 #  
-class Cumulative(CumulativeSubsurface if subflow == True else CumulativeSubsurfacePass, Globals,Size):
+class CumulativeC(object):
 
 
 
@@ -196,41 +195,43 @@ class Cumulative(CumulativeSubsurface if subflow == True else CumulativeSubsurfa
 
     r = self.r
     c = self.c
+    float_     = precision.float_
+    float_cum  = precision.float_cum
     
     
     ## array count stored in the class
     self.n = 13
     ## cumulative infiltrated volume [m3]
-    self.infiltration  =  np.zeros([r,c],float)
+    self.infiltration  =  np.zeros([r,c],float_cum)
     ## cumulative precipitation volume [m3]
-    self.precipitation =  np.zeros([r,c],float)
+    self.precipitation =  np.zeros([r,c],float_cum)
     ## maximum surface water level [m]
-    self.h_sur  =  np.zeros([r,c],float)
+    self.h_sur  =  np.zeros([r,c],float_)
     ## maximum surface discharge [m3s-1]
-    self.q_sur  =  np.zeros([r,c],float)
+    self.q_sur  =  np.zeros([r,c],float_)
     ## cumulative surface runoff volume [m3]
-    self.V_sur  =  np.zeros([r,c],float)
+    self.V_sur  =  np.zeros([r,c],float_cum)
     ## maximum surface velocity [ms-1]
-    self.v_sur  =  np.zeros([r,c],float)
+    self.v_sur  =  np.zeros([r,c],float_)
     ## maximum surface shear stress [Pa]
-    self.shear_sur  =  np.zeros([r,c],float)
+    self.shear_sur  =  np.zeros([r,c],float_)
     ## cumulative surface inflow volume [m3]
-    self.inflow_sur  =  np.zeros([r,c],float)
+    self.inflow_sur  =  np.zeros([r,c],float_cum)
     ## maximum water level in rills [m]
-    self.h_rill =  np.zeros([r,c],float)
+    self.h_rill =  np.zeros([r,c],float_)
     ## maximum discharge in rills [m3s-1]
-    self.q_rill =  np.zeros([r,c],float)
+    self.q_rill =  np.zeros([r,c],float_)
     ## cumulative runoff volume in rills [m3]
-    self.V_rill =  np.zeros([r,c],float)
+    self.V_rill =  np.zeros([r,c],float_cum)
     ## maximum rill width [m]
-    self.b_rill =  np.zeros([r,c],float)
+    self.b_rill =  np.zeros([r,c],float_)
     ## maximum velocity in rills [ms-1]
-    self.v_rill =  np.zeros([r,c],float)
+    self.v_rill =  np.zeros([r,c],float_)
     ## maximum surface retention [m]
-    self.sur_ret=  np.zeros([r,c],float)
+    self.sur_ret=  np.zeros([r,c],float_cum)
 
     
-    super(Cumulative, self).__init__()
+    super(CumulativeC, self).__init__()
 
 
   
@@ -269,12 +270,34 @@ class Cumulative(CumulativeSubsurface if subflow == True else CumulativeSubsurfa
         self.q_rill[i][j]  = q_rill
 
 
-    self.update_cumulative_sur(i,j,subsurface.arr[i][j],subsurface.q_subsurface)
+    self.update_cumulative_sur(i,j,subsurface)
 
 
 
+## Empty (pass) Class
+#
+# Used instead of the class Cumulative in the outlet-only mode,
+# the cumulative arrays are not allocated.
+#
+class CumulativePass(object):
 
+  def __init__(self):
+    prt.message('\tCumulative values are not stored')
 
+  def update_cumulative(self,i,j,surface,subsurface,rain,delta_t):
+    pass
 
 
 
+## Returns the class Cumulative of the computation
+#
+#  the cumulative values of the subsurface flow are stored only if
+#  the subsurface flow is computed
+#
+#  @param G main_src.main_classes.General.Globals
+def cumulative_class(G):
+  if G.subflow == True:
+    subsurface = CumulativeSubsurface
+  else:
+    subsurface = CumulativeSubsurfacePass
+  return type('Cumulative',(CumulativeC,subsurface,Globals,Size),{})
@@ -11,6 +11,9 @@
 #  make D8 or mfda compatible within the SMODERP 
 #  framework.
 #  
+#  The prepared arrays are taken from main_src.main_classes.General.Globals,
+#  which is inherited together with the flow algorithm.
+#  
 #  Both classes can inherited by the 
 #  classes Kinematic or Diffuse in the 
 #  package main_src.main_classes.KinematicDiffuse
@@ -21,14 +24,53 @@
 
 
 
-from   main_src.tools.resolve_partial_computing import *
-from   main_src.tools.tools                     import comp_type
+import numpy as np
+
 import main_src.flow_algorithm.mfd                  as mfd
 import main_src.flow_algorithm.D8                   as D8_
 import main_src.io_functions.prt                    as prt
+import main_src.tools.prep_cache                    as prep_cache
+import main_src.tools.precision                     as precision
+
+
+
+## flow directions of the last computation of each algorithm
+#
+#  the flow directions are not changed in the kinematic approach and they are
+#  shared by the computations with the same prepared arrays
+#  (the surface and the subsurface, the members of main_src.ensemble)
+shared = {}
+
+
+
+## Returns fce(*args), the result is reused if the args are the same as in the last call
+#
+#  the arrays and lists are compared by the identity, the other arguments by the value,
+#  a new result is taken from the preparation cache (main_src.tools.prep_cache) if it is set
+#
+#  @param name name of the algorithm
+#  @param key function returning the key of the preparation cache, the arrays the args are
+#         computed from, it is called only if the result is not shared
+def shared_routing(name,key,fce,*args):
+  if name in shared:
+    args_pre, result = shared[name]
+    same = len(args) == len(args_pre)
+    for a, b in zip(args,args_pre):
+      if isinstance(a,(np.ndarray,list)) or isinstance(b,(np.ndarray,list)):
+        same = same and a is b
+      else:
+        same = same and a == b
+    if same:
+      return result
+  result = prep_cache.cache.cached_key(name,key(),fce,*args)
+  shared[name] = (args, result)
+  return result
 
 
-isRill, subflow, stream, diffuse = comp_type()
+
+## Returns the flat indexes of the domain cells, the key of the domain in the preparation cache
+def domain_index(rr,rc,c):
+  return np.array([i*c+j for i in rr for j in rc[i]],int)
 
 
 
@@ -61,7 +103,7 @@ class D8(object):
   #  
   def __init__(self):
     prt.message("\tD8 flow algorithm")
-    self.inflows = D8_.new_inflows(mat_fd)
+    self.inflows = shared_routing('D8',lambda: (self.mat_fd,),D8_.new_inflows,self.mat_fd)
 
 
 
@@ -105,6 +147,68 @@ class D8(object):
 
 
 
+  ## returns the routing operator of the #inflows list
+  #
+  #  the inflows of all cells of the domain in the order of cell_runoff,
+  #  the operator is shared by the computations with the same #inflows list
+  #
+  #  @return target cells, source cells (flat indexes) and weights of the inflows
+  #
+  def routing_operator(self):
+    return shared_routing('D8 operator',lambda: (self.mat_fd,domain_index(self.rr,self.rc,self.c)),
+                          self.__routing_operator,self.inflows,self.rr,self.rc,self.c)
+
+  def __routing_operator(self,inflows,rr,rc,c):
+    target = []
+    source = []
+    for i in rr:
+      for j in rc[i]:
+        for ax, bx in inflows[i][j]:
+          target.append(i*c+j)
+          source.append((i+ax)*c+j+bx)
+    return np.array(target,int), np.array(source,int), np.ones(len(target),float)
+
+
+
+  ## returns the water volume which flows into each cell of the domain
+  #  from the volumes V of the previous time step
+  #
+  #  vectorized cell_runoff without the rills, the volumes are summed in the same order,
+  #  the leading axes (the members of main_src.ensemble) share the routing operator
+  #
+  #  @param V array [...,r,c] of the runoff volumes in the previous time step
+  #  @return inflow array [...,r,c]
+  #
+  def route(self,V):
+    target, source, weight = self.routing_operator()
+    lead = V.shape[:-2]
+    inflow = np.zeros(lead+(self.r*self.c,),precision.float_)
+    np.add.at(inflow,(Ellipsis,target),weight*V.reshape(lead+(self.r*self.c,))[...,source])
+    return inflow.reshape(V.shape)
+
+
+
+  ## returns the fraction of the sheet and rill runoff of each cell which is not
+  #  taken by any cell of the domain in cell_runoff, i.e. leaves the domain
+  #
+  #  @return exit_sheet, exit_rill arrays [r,c], zero outside the domain
+  #
+  def exit_fractions(self):
+    received = np.zeros([self.r,self.c],float)
+    for i in self.rr:
+      for j in self.rc[i]:
+        for ax, bx in self.inflows[i][j]:
+          received[i+ax][j+bx] += 1.0
+
+    exit_ = np.zeros([self.r,self.c],float)
+    for i in self.rr:
+      for j in self.rc[i]:
+        exit_[i][j] = max(1.0 - received[i][j],0.0)
+
+    return exit_, exit_
+
+
+
 
 
 
@@ -139,14 +243,23 @@ class Mfda(object):
     
   def __init__(self):
     prt.message("\tMultiflow direction algorithm")
-    self.inflows, fd_rill  = mfd.new_mfda(mat_dmt, mat_nan, mat_fd, vpix, spix, rows, cols)
-    self.inflowsRill       = D8_.new_inflows(fd_rill)
+    self.inflows, self.inflowsRill = shared_routing('Mfda',self.__key,self.__new_mfda,self.mat_dmt, self.mat_nan, self.mat_fd, self.vpix, self.spix, self.r, self.c)
+
+
+  ## key of the flow directions in the preparation cache
+  def __key(self):
+    return self.mat_dmt, self.mat_nan, self.mat_fd, self.vpix, self.spix
+
+
+  def __new_mfda(self,mat_dmt,mat_nan,mat_fd,vpix,spix,r,c):
+    inflows, fd_rill = mfd.new_mfda(mat_dmt, mat_nan, mat_fd, vpix, spix, r, c)
+    return inflows, D8_.new_inflows(fd_rill)
   
  
 
 
   def update_inflows(self,fd):
-    self.inflows, fd_rill   = mfd.new_mfda(self.H, mat_nan, fd, vpix, spix, rows, cols)
+    self.inflows, fd_rill   = mfd.new_mfda(self.H, self.mat_nan, fd, self.vpix, self.spix, self.r, self.c)
     self.inflowsRill        = D8_.new_inflows(fd_rill)
 
 
@@ -165,7 +278,7 @@ class Mfda(object):
                     self.inflows[i+1][j+1][5]*self.arr[i+1][j+1].V_runoff_pre
 
 
-    if isRill and sur:
+    if self.isRill and sur:
       for z in range(len(self.inflowsRill[i][j])):
         ax = self.inflowsRill[i][j][z][0]
         bx = self.inflowsRill[i][j][z][1]
@@ -178,4 +291,80 @@ class Mfda(object):
             inflow_from_cells += 0.0
 
 
-    return inflow_from_cells
\ No newline at end of file
+    return inflow_from_cells
+
+
+
+  ## returns the routing operator of the sheet flow
+  #
+  #  the inflows of all cells of the domain in the order of cell_runoff,
+  #  the operator is shared by the computations with the same #inflows array
+  #
+  #  @return target cells, source cells (flat indexes) and weights of the inflows
+  #
+  def routing_operator(self):
+    return shared_routing('Mfda operator',lambda: self.__key() + (domain_index(self.rr,self.rc,self.c),),
+                          self.__routing_operator,self.inflows,self.rr,self.rc,self.c)
+
+  def __routing_operator(self,inflows,rr,rc,c):
+    # position of the neighbour and the direction of its inflows taken in cell_runoff
+    neighbours = [(-1,-1,1), (-1,0,2), (-1,1,3), (0,-1,0), (0,1,4), (1,-1,7), (1,0,6), (1,1,5)]
+    target = []
+    source = []
+    weight = []
+    for i in rr:
+      for j in rc[i]:
+        for ax, bx, k in neighbours:
+          w = inflows[i+ax][j+bx][k]
+          if w != 0.0:
+            target.append(i*c+j)
+            source.append((i+ax)*c+j+bx)
+            weight.append(w)
+    return np.array(target,int), np.array(source,int), np.array(weight,float)
+
+
+
+  ## returns the water volume which flows into each cell of the domain
+  #  from the volumes V of the previous time step
+  #
+  #  vectorized cell_runoff without the rills, the volumes are summed in the same order,
+  #  the leading axes (the members of main_src.ensemble) share the routing operator
+  #
+  #  @param V array [...,r,c] of the runoff volumes in the previous time step
+  #  @return inflow array [...,r,c]
+  #
+  def route(self,V):
+    target, source, weight = self.routing_operator()
+    lead = V.shape[:-2]
+    inflow = np.zeros(lead+(self.r*self.c,),precision.float_)
+    np.add.at(inflow,(Ellipsis,target),weight*V.reshape(lead+(self.r*self.c,))[...,source])
+    return inflow.reshape(V.shape)
+
+
+
+  ## returns the fraction of the sheet and rill runoff of each cell which is not
+  #  taken by any cell of the domain in cell_runoff, i.e. leaves the domain
+  #
+  #  the rill runoff is not taken by the neighbours in cell_runoff (it is read
+  #  from the missing array V_runoff_rill_pre), the whole rill runoff therefore leaves the domain
+  #
+  #  @return exit_sheet, exit_rill arrays [r,c], zero outside the domain
+  #
+  def exit_fractions(self):
+    # position of the neighbour and the direction of its inflows taken in cell_runoff
+    neighbours = [(-1,-1,1), (-1,0,2), (-1,1,3), (0,-1,0), (0,1,4), (1,-1,7), (1,0,6), (1,1,5)]
+
+    received = np.zeros([self.r,self.c],float)
+    for i in self.rr:
+      for j in self.rc[i]:
+        for ax, bx, k in neighbours:
+          received[i+ax][j+bx] += self.inflows[i+ax][j+bx][k]
+
+    exit_sheet = np.zeros([self.r,self.c],float)
+    exit_rill  = np.zeros([self.r,self.c],float)
+    for i in self.rr:
+      for j in self.rc[i]:
+        exit_sheet[i][j] = max(1.0 - received[i][j],0.0)
+        exit_rill[i][j]  = 1.0
+
+    return exit_sheet, exit_rill
@@ -1,6 +1,5 @@
 import math
 
-from   main_src.tools.resolve_partial_computing import *
 
 
 ## Documentation for a class.
@@ -18,19 +17,85 @@ class Size:
   
   
   
+## Global variables of the computation
+#
+#  the variables are assigned in set_globals at the start of each computation
 class Globals:
-  pixel_area = pixel_area
-  r        = rows
-  c        = cols
-  rr    = rrows
-  rc    = rcols
-  br    = boundaryRows
-  bc    = boundaryCols
-  xllcorner = x_coordinate
-  yllcorner = y_coordinate
-  NoDataValue = NoDataValue
+  pixel_area = None
+  r        = None
+  c        = None
+  rr    = None
+  rc    = None
+  br    = None
+  bc    = None
+  xllcorner = None
+  yllcorner = None
+  NoDataValue = None
   NoDataInt   = int(-9999)
-  dx = math.sqrt(pixel_area)
-  dy = dx
-  type_of_computing = type_of_computing
-  outdir = output
\ No newline at end of file
+  dx = None
+  dy = None
+  type_of_computing = None
+  outdir = None
+
+  # components of the computation, see main_src.tools.tools.comp_type
+  isRill  = None
+  subflow = None
+  stream  = None
+  diffuse = None
+  only_surface = None
+  mfda    = None
+  extra_output = None
+
+  # prepared arrays used by the flow algorithms, the rills and the stream
+  mat_fd       = None
+  mat_dmt      = None
+  mat_nan      = None
+  mat_n        = None
+  mat_slope    = None
+  mat_tok_usek = None
+  vpix         = None
+  spix         = None
+  toky         = None
+  cell_stream  = None
+  tokyLoc      = None
+  STREAM_RATIO = None
+
+
+
+## Assigns the global variables of the computation
+#
+#  @param data main_src.tools.resolve_partial_computing.PreparedData
+#  @param config main_src.config.Config
+def set_globals(data,config):
+  Globals.pixel_area = data.pixel_area
+  Globals.r        = data.rows
+  Globals.c        = data.cols
+  Globals.rr    = data.rrows
+  Globals.rc    = data.rcols
+  Globals.br    = data.boundaryRows
+  Globals.bc    = data.boundaryCols
+  Globals.xllcorner = data.x_coordinate
+  Globals.yllcorner = data.y_coordinate
+  Globals.NoDataValue = data.NoDataValue
+  Globals.dx = math.sqrt(data.pixel_area)
+  Globals.dy = Globals.dx
+  Globals.type_of_computing = data.type_of_computing
+  Globals.outdir = data.output
+
+  Globals.isRill, Globals.subflow, Globals.stream, Globals.diffuse = config.comp_type()
+  Globals.only_surface = config.comp_type('surface')
+  Globals.mfda         = config.mfda
+  Globals.extra_output = config.extra_output
+
+  Globals.mat_fd       = data.mat_fd
+  Globals.mat_dmt      = data.mat_dmt
+  Globals.mat_nan      = data.mat_nan
+  Globals.mat_n        = data.mat_n
+  Globals.mat_slope    = data.mat_slope
+  Globals.mat_tok_usek = data.mat_tok_usek
+  Globals.vpix         = data.vpix
+  Globals.spix         = data.spix
+  Globals.toky         = data.toky
+  Globals.cell_stream  = data.cell_stream
+  Globals.tokyLoc      = data.tokyLoc
+  Globals.STREAM_RATIO = data.STREAM_RATIO
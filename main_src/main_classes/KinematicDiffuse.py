@@ -2,8 +2,11 @@
 
 
 
-from main_src.main_classes.General import *
-from main_src.main_classes.Flow import *
+import math
+import numpy as np
+
+from main_src.main_classes.General import Globals
+from main_src.main_classes.Flow    import Mfda, D8
 
 
 import main_src.io_functions.prt          as prt
@@ -14,7 +17,20 @@ import main_src.flow_algorithm.flow_direction       as flow_direction
 
 
 
-class Kinematic(Mfda if mfda==True else D8):
+## Returns the flow algorithm class, Mfda or D8
+#
+#  the flow algorithm is inherited after the class Kinematic or Diffuse
+#
+#  @param G main_src.main_classes.General.Globals
+def flow_class(G):
+  if G.mfda == True:
+    return Mfda
+  return D8
+
+
+
+
+class Kinematic(object):
 
   def __init__(self):
     prt.message("\tKinematic approach")
@@ -40,33 +56,75 @@ class Kinematic(Mfda if mfda==True else D8):
 
 
 
-class Diffuse(Mfda if mfda==True else D8, Globals):
+## Slope of the water level H in the cells rows, cols
+#
+#  Sobel (Horn) gradient of the 3x3 neighbourhood of each cell
+#
+#  @param H array [r,c] of the water level
+#  @param rows, cols arrays of the cells, the cells are not at the edge of H
+def horn_slope(H,rows,cols,pixel_area):
+  a = H[rows-1,cols-1]
+  b = H[rows-1,cols]
+  c = H[rows-1,cols+1]
+  d = H[rows,cols-1]
+  f = H[rows,cols+1]
+  g = H[rows+1,cols-1]
+  h = H[rows+1,cols]
+  k = H[rows+1,cols+1]
+  dzdx = ((c + 2.0*f + k) - (a + 2.0*d + g))/(8.0 * pixel_area)
+  dzdy = ((g + 2.0*h + k) - (a + 2.0*b + c))/(8.0 * pixel_area)
+  return np.arctan(np.sqrt(dzdx**2 + dzdy**2)) * math.pi/180
+
+
+
+## Diffuse approach, the flow directions follow the water level
+#
+#  update_H requires the arrays h, z, slope and the cells of the domain
+#  rows, cols of the inheriting class (main_src.main_classes.Subsurface.SubsurfaceC)
+#
+class Diffuse(object):
 
   def __init__(self):
     prt.message("\tDiffuse approach")
     if (Globals.r == None or Globals.r == None):
       exit("Global variables are not assigned")
+    super(Diffuse, self).__init__()
     r = self.r
     c = self.c
 
     self.H = np.zeros([r,c],float)
+    # water level at the last update of the slope
+    self.H_slope = None
 
   def new_inflows(self):
     fd = flow_direction.flow_direction(self.H,self.rr,self.rc,self.br,self.bc,self.pixel_area)
     self.update_inflows(fd)
 
 
+  ## Updates the water level and the slope, called once in each time step
+  #
+  #  the slope is computed only in the cells with a changed water level
+  #  in their neighbourhood
   def update_H(self):
 
-    arr = self.arr
-
-    for i in self.rr:
-      for j in self.rc[i]:
-        arr.H[i][j] = arr.h[i][j] + arr.z[i][j]
-
-        
-    for i in self.rr:
-      for j in self.rc[i]:
-        arr.slope = self.slope_(i,j)
+    rows = self.rows
+    cols = self.cols
+    self.H[rows,cols] = self.h[rows,cols] + self.z[rows,cols]
+
+    if self.H_slope is None:
+      changed = np.ones([self.r,self.c],bool)
+    else:
+      changed = self.H != self.H_slope
+
+    pad = np.zeros([self.r+2,self.c+2],bool)
+    pad[1:-1,1:-1] = changed
+    near = np.zeros([self.r,self.c],bool)
+    for di in [0,1,2]:
+      for dj in [0,1,2]:
+        near |= pad[di:di+self.r,dj:dj+self.c]
+
+    refresh = near[rows,cols]
+    self.slope[rows[refresh],cols[refresh]] = horn_slope(self.H,rows[refresh],cols[refresh],self.pixel_area)
+    self.H_slope = self.H.copy()
 
 
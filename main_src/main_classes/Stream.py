@@ -1,64 +1,110 @@
+import numpy as np
 
+from   main_src.main_classes.General import Globals
 
-
-from   main_src.tools.resolve_partial_computing import *
-from   main_src.main_classes.General import *
-
-import main_src.stream_functions.stream_f as stream_f
+import main_src.stream_functions.stream_f   as stream_f
+import main_src.stream_functions.hydraulics as hydraulics
 import main_src.io_functions.prt          as prt
 
-class Reach():
 
-  def __init__(self,id_,POINT_X,POINT_Y,POINT_X_1,POINT_Y_1,to_node,length,sklon,smoderp,CISLO,TVAR,B,M,DRSNOST,Q365):
+## Reach attributes stored as numpy arrays
+#
+#  one item of each array belongs to one reach of the stream network,
+#  the reach index is the same as the id stored in mat_tok_usek minus 1000
+#
+#  The reaches are sorted into levels of the network. Reaches in one level
+#  do not depend on each other and are computed together,
+#  a level is computed only if all its upstream levels are done.
+class ReachArrs():
+
+  def __init__(self,toky):
 
     #TVAR = 1
     #print '\n!\n!\n!\ntvar je na tvrdo 1'
     #raw_input('classes_main_arrays 299\n!\n!\n!')
 
-    self.id_ = id_
-    ##self.imat = i  #jj melo byt pozice v matici, ale to mozna nani treba kdyz zanech mat_tok_usek a tam id useku
-    ##self.jmat = j
-    self.pointsFrom = [POINT_X,POINT_Y]
-    self.pointsTo   = [POINT_X_1,POINT_Y_1]
-    self.to_node = to_node
-    self.length = length
-    if sklon < 0:
-        prt.message("Slope in reach part"+str(id)+"indicated minus slope in stream")
-    self.slope = abs(sklon)
-    self.smoderp = smoderp
-    self.no = CISLO
-    self.shape = TVAR
-
-    self.b = B
-    self.m = M
-    self.roughness = DRSNOST
-    self.Q365 = Q365
-    self.V_in_from_field = 0.0
-    self.V_in_from_field_cum = 0.0
-    self.V_in_from_reach = 0.0
-    self.V_out_cum = 0.0   # L^3
-    self.V_rest = 0.0
-    self.h    = 0.0     #jj mozna pocatecni podminka? ikdyz to je asi Q365 co...
-    self.h_max    = 0.0
-    self.timeh_max    = 0.0
-    self.V_out    = 0.0
-    self.vs      = 0.0
-    self.Q_out   = 0.0
-    self.Q_max   = 0.0
-    self.timeQ_max   = 0.0
-    self.V_out_domain = 0.0
-
-    if TVAR == 1 :    #obdelnik
-      self.outflow_method = stream_f.rectangle
-    elif TVAR == 0 :  #trapezoid
-      self.outflow_method = stream_f.trapezoid
-    elif TVAR == 2 :  #triangle
-      self.outflow_method = stream_f.triangle
-    elif TVAR == 3 :  #parabola
-      self.outflow_method = stream_f.parabola
-
-    #print TVAR, B, M
-    ##raw_input()
+    # listy v poradi 'FID' 'POINT_X' 'POINT_Y' 'POINT_X_1' 'POINT_Y_1' 'to_node' 'length' 'sklon' 'smoderp' 'CISLO' 'TVAR' 'B' 'M' 'DRSNOST' 'Q365'
+    self.n = len(toky[0])
+    n = self.n
+
+    self.id_       = np.array(toky[0],int)
+    self.to_node   = np.array(toky[5],float).astype(int)
+    self.length    = np.array(toky[6],float)
+    sklon          = np.array(toky[7],float)
+    for id_ in np.where(sklon < 0)[0]:
+      prt.message("Slope in reach part"+str(id_)+"indicated minus slope in stream")
+    self.slope     = np.abs(sklon)
+    self.shape     = np.array(toky[10],int)
+    self.b         = np.array(toky[11],float)
+    self.m         = np.array(toky[12],float)
+    self.roughness = np.array(toky[13],float)
+    self.Q365      = np.array(toky[14],float)
+
+    self.V_in_from_field     = np.zeros(n,float)
+    self.V_in_from_field_cum = np.zeros(n,float)
+    self.V_in_from_reach     = np.zeros(n,float)
+    self.V_out_cum    = np.zeros(n,float)   # L^3
+    self.V_rest       = np.zeros(n,float)
+    self.h            = np.zeros(n,float)   #jj mozna pocatecni podminka? ikdyz to je asi Q365 co...
+    self.h_max        = np.zeros(n,float)
+    self.timeh_max    = np.zeros(n,float)
+    self.V_out        = np.zeros(n,float)
+    self.vs           = np.zeros(n,float)
+    self.Q_out        = np.zeros(n,float)
+    self.Q_max        = np.zeros(n,float)
+    self.timeQ_max    = np.zeros(n,float)
+    self.V_out_domain = np.zeros(n,float)
+    ## volume added to the reach by the base flow geometry in the time step (Q365)
+    self.V_base       = np.zeros(n,float)
+
+    self.inDomain  = self.to_node != -9999
+    self.levels    = self.network_levels()
+
+    self.table     = hydraulics.StageTable(self)
+    self.base      = hydraulics.BaseFlow(self,self.table)
+
+
+  ## Sorts the reaches into the levels of the network
+  #
+  #  the first level contains the springs, each next level the
+  #  reaches which have all the upstream reaches in the previous levels
+  #
+  #  @return levels list of [(outflow method, reach indexes), ...] for each level
+  def network_levels(self):
+
+    methods = {0 : stream_f.trapezoid,  #trapezoid
+               1 : stream_f.rectangle,  #obdelnik
+               2 : stream_f.triangle,   #triangle
+               3 : stream_f.parabola}   #parabola
+
+    upstream = np.zeros(self.n,int)
+    for id_to_node in self.to_node[self.inDomain]:
+      upstream[id_to_node] += 1
+
+    levels = []
+    done = 0
+    current = np.where(upstream == 0)[0]
+    while len(current) > 0:
+      level = []
+      for tvar in methods:
+        idx = current[self.shape[current] == tvar]
+        if len(idx) > 0:
+          level.append((methods[tvar],idx))
+      levels.append(level)
+      done += len(current)
+
+      down = self.to_node[current]
+      down = down[down != -9999]
+      for id_to_node in down:
+        upstream[id_to_node] -= 1
+      current = np.unique(down[upstream[down] == 0])
+
+    if done != self.n:
+      prt.error("Stream network contains a loop, check the to_node attribute of the reaches")
+
+    return levels
+
+
 
 
 ## Documentation for a class.
@@ -79,75 +125,95 @@ class Stream(object,Globals):
     #self.temp_dp = sp.temp_dp
 
     # listy v poradi 'FID' 'POINT_X' 'POINT_Y' 'POINT_X_1' 'POINT_Y_1' 'to_node' 'length' 'sklon' 'smoderp' 'CISLO' 'TVAR' 'B' 'M' 'DRSNOST' 'Q365'
-    self.toky = toky # tu jsou nactena data z data preparation cca lajna 970
+    # self.toky, self.cell_stream, self.tokyLoc, self.mat_tok_usek a self.STREAM_RATIO
+    # jsou v Globals, tu jsou nactena data z data preparation cca lajna 970
 
-    self.nReaches = len(toky[0])
-    
-    
-    self.cell_stream = cell_stream
+    self.nReaches = len(self.toky[0])
 
-    self.reach = []
-    
-    for i in range(self.nReaches):
-      self.reach.append(Reach(toky[0][i],toky[1][i],toky[2][i],toky[3][i],toky[4][i],toky[5][i],toky[6][i],toky[7][i],toky[8][i],toky[9][i],toky[10][i],toky[11][i],toky[12][i],toky[13][i],toky[14][i]))
+    self.reach = ReachArrs(self.toky)
+    prt.message('\t', self.nReaches, 'reaches in', len(self.reach.levels), 'network levels')
 
-    self.tokyLoc      = tokyLoc
-    self.mat_tok_usek = mat_tok_usek
-    
     for i in self.rr :
       for j in self.rc[i]:
-        self.arr[i][j].state += mat_tok_usek[i][j]
+        self.arr[i][j].state += int(self.mat_tok_usek[i][j])
 
-    self.STREAM_RATIO = STREAM_RATIO
+    ## stream cells of the domain and the index of their reach
+    state = np.array([arr.state for arr in self.cells],int)
+    in_stream = state >= 1000
+    self.stream_rows  = self.rows[in_stream]
+    self.stream_cols  = self.cols[in_stream]
+    self.stream_reach = state[in_stream] - 1000
+    self.stream_cells = [self.arr[i][j] for i, j in zip(self.stream_rows,self.stream_cols)]
 
 
   def reset_inflows(self):
-    for id_ in range(self.nReaches):
-      self.reach[id_].V_in_from_field = 0
-      
+    self.reach.V_in_from_field.fill(0.0)
+
 
-  ## Documentation for a reach inflows.
-  #  @param id_ starts in 0 not 1000
+  ## Adds the inflows into the reaches
+  #
+  #  the inflows of the same reach are summed in the order of the cells
+  #
+  #  @param id_ reach indexes of the inflows, starts in 0 not 1000
+  #  @param inflows volumes of the inflows
   def reach_inflows(self,id_, inflows):
-    self.reach[id_].V_in_from_field += inflows
+    self.reach.V_in_from_field += np.bincount(id_, weights=inflows, minlength=self.nReaches)
 
+
+  ## Adds the water of all stream cells into their reaches
+  #
+  #  @param pixel_area area of the cell
+  def stream_cells_inflows(self,pixel_area):
+    h = np.array([arr.h for arr in self.stream_cells],float)
+    self.reach_inflows(self.stream_reach, h*pixel_area)
+
+
+  ## Computes the outflow of all reaches
+  #
+  #  the reaches are computed level by level from the springs to the
+  #  outlets, the outflow of a level is the inflow of the downstream
+  #  reaches in the same time step
   def stream_reach_outflow(self,dt):
-    for id_ in range(self.nReaches):
-      self.reach[id_].outflow_method(self.reach[id_],dt)
+    reach = self.reach
+    reach.base.update(dt)
+    reach.V_in_from_reach.fill(0.0)
+    reach.V_out_domain.fill(0.0)
 
+    for level in reach.levels:
+      for outflow_method, idx in level:
+        V_in = reach.V_in_from_field[idx] + reach.V_rest[idx] + reach.V_in_from_reach[idx]
+        outflow_method(reach,idx,dt)
+        # the water volume of the trapezoid reach is taken above the base flow
+        # area, part of the base flow is added to the water of the reach
+        reach.V_base[idx] = reach.V_out[idx] + reach.V_rest[idx] - V_in
 
-  def stream_reach_inflow(self):
-    for id_ in range(self.nReaches):
-      self.reach[id_].V_in_from_reach = 0
-      self.reach[id_].V_out_domain    = 0
-      
-    for id_ in range(self.nReaches):
-      id_to_node = int(self.reach[id_].to_node)
-      if id_to_node == -9999:
-        self.reach[id_].V_out_domain += self.reach[id_].V_out
-      else:
-        self.reach[id_to_node].V_in_from_reach += self.reach[id_].V_out
+        inDomain = reach.inDomain[idx]
+        np.add.at(reach.V_in_from_reach, reach.to_node[idx[inDomain]], reach.V_out[idx[inDomain]])
+        reach.V_out_domain[idx[~inDomain]] += reach.V_out[idx[~inDomain]]
 
 
   #jj jeste dodelat ty maxima a kumulativni zbyle
   def stream_cumulative(self,time):
-    for id_ in range(self.nReaches):
-      self.reach[id_].V_out_cum += self.reach[id_].V_out
-      self.reach[id_].V_in_from_field_cum += self.reach[id_].V_in_from_field
-      if self.reach[id_].Q_out > self.reach[id_].Q_max:
-        self.reach[id_].Q_max = self.reach[id_].Q_out
-        self.reach[id_].timeQ_max        = time
-      if self.reach[id_].h > self.reach[id_].h_max:
-        self.reach[id_].h_max = self.reach[id_].h
-        self.reach[id_].timeh_max        = time
-        
-        
+    reach = self.reach
+    reach.V_out_cum += reach.V_out
+    reach.V_in_from_field_cum += reach.V_in_from_field
+
+    new_max = reach.Q_out > reach.Q_max
+    reach.Q_max[new_max]     = reach.Q_out[new_max]
+    reach.timeQ_max[new_max] = time
+
+    new_max = reach.h > reach.h_max
+    reach.h_max[new_max]     = reach.h[new_max]
+    reach.timeh_max[new_max] = time
+
+
   def return_stream_str_vals(self,i,j,sep,dt):
     id_ = int(self.arr[i][j].state-1000)
+    reach = self.reach
     # Time;   V_runoff  ;   Q   ;    V_from_field  ;  V_rests_in_stream
     # print id_
-    line = str(self.reach[id_].h) +sep+str(self.reach[id_].V_out) +sep+ str(self.reach[id_].Q_out) + sep + \
-      str(self.reach[id_].V_in_from_field) + sep + str(self.reach[id_].V_rest)
+    line = str(reach.h[id_]) +sep+str(reach.V_out[id_]) +sep+ str(reach.Q_out[id_]) + sep + \
+      str(reach.V_in_from_field[id_]) + sep + str(reach.V_rest[id_])
     return line
 
 
@@ -165,8 +231,7 @@ class StreamPass(object):
     pass
   def reach_inflows(self,id_, inflows):
     pass
-
-  def stream_reach_inflow(self):
+  def stream_cells_inflows(self,pixel_area):
     pass
 
   def stream_reach_outflow(self,dt):
@@ -4,38 +4,25 @@ import sys
 import os
 
 
-from   main_src.tools.resolve_partial_computing import *
-from main_src.main_classes.General              import *
-from main_src.main_classes.KinematicDiffuse     import *
+from main_src.main_classes.General              import Globals, Size
+from main_src.main_classes.KinematicDiffuse     import Kinematic, Diffuse, flow_class
 
 
 import main_src.processes.subsurface           as darcy
 import main_src.io_functions.prt               as prt
-
-class SubArrs:
-
-  def __init__(self, L_sub, Ks, vg_n, vg_l, z, ele):
-    self.L_sub =     L_sub
-    self.h =         float(0)
-    self.H =         ele
-    self.z =         z
-    self.slope =      float(0)
-    self.exfiltration = float(0)
-    self.V_runoff =     float(0)
-    self.V_runoff_pre = float(0)
-    self.V_rest =       float(0)
-    self.Ks =           Ks
-    self.cum_percolation =   float(0)
-    self.percolation  =   float(0)
-    self.vg_n =   vg_n
-    self.vg_m =   1.0-1.0/vg_n
-    self.vg_l =   vg_l
-
+import main_src.tools.precision                as precision
 
 ## Documentation for a class.
-#  More details.
 #
-class SubsurfaceC(Diffuse if diffuse == True else Kinematic, Size,Globals):
+#  The subsurface layer is held in the arrays [r,c], the percolation,
+#  exfiltration and Darcy outflow are computed for the whole domain
+#  at once after the surface loop of the time step
+#  (see main_src.time_step.TimeStep.do).
+#
+#  The inflows from the neighbouring cells are routed by the routing operator
+#  of the flow algorithm (main_src.main_classes.Flow.D8.route).
+#
+class SubsurfaceC(object):
   def __init__(self,L_sub, Ks, vg_n, vg_l):
 
     if (Globals.r == None or Globals.r == None):
@@ -45,114 +32,130 @@ class SubsurfaceC(Diffuse if diffuse == True else Kinematic, Size,Globals):
     r = self.r
     c = self.c
 
-    self.arr = np.empty((self.r,self.c), dtype=object)
-
-    for i in range(self.r):
-      for j in range(self.c):
-        self.arr[i][j] = SubArrs(L_sub, Ks, vg_n, vg_l,mat_dmt[i][j]-L_sub, mat_dmt[i][j])
-    #raw_input()
-
+    ## thickness of the subsurface layer [m]
+    self.L_sub = L_sub
+    ## saturated hydraulic conductivity [m/s]
+    self.Ks    = Ks
+    ## van Genuchten parameters
+    self.vg_n  = vg_n
+    self.vg_m  = 1.0-1.0/vg_n
+    self.vg_l  = vg_l
+
+    float_     = precision.float_
+    float_cum  = precision.float_cum
+
+    self.h            = np.zeros([r,c],float_)
+    # the elevations stay in double precision as the elevation raster,
+    # the water level would lose the depth of the layer in single precision
+    self.H            = np.array(self.mat_dmt,float)
+    self.z            = np.array(self.mat_dmt,float) - L_sub
+    self.slope        = np.zeros([r,c],float_)
+    self.exfiltration = np.zeros([r,c],float_)
+    self.V_runoff     = np.zeros([r,c],float_)
+    self.V_runoff_pre = np.zeros([r,c],float_)
+    self.V_rest       = np.zeros([r,c],float_)
+    self.cum_percolation = np.zeros([r,c],float_cum)
+    self.percolation  = np.zeros([r,c],float_)
+    self.q_subsurface = np.zeros([r,c],float_)
+
+    # cells of the domain
+    rows = []
+    cols = []
     for i in self.rr:
       for j in self.rc[i]:
-        self.arr[i][j].slope = mat_slope[i][j]
-        #self.slope_(i,j)
-        
-        #print mat_slope[i][j], self.arr[i][j].slope
-        #raw_input()
+        rows.append(i)
+        cols.append(j)
+    self.rows = np.array(rows,int)
+    self.cols = np.array(cols,int)
+
+    self.slope[self.rows,self.cols] = self.mat_slope[self.rows,self.cols]
+
+    # the subsurface water of the stream cells flows into the reach
+    if self.stream == True:
+      in_stream = self.mat_tok_usek[self.rows,self.cols] >= 1000
+    else:
+      in_stream = np.zeros(len(self.rows),bool)
+    self.stream_rows = self.rows[in_stream]
+    self.stream_cols = self.cols[in_stream]
+    self.field_rows  = self.rows[~in_stream]
+    self.field_cols  = self.cols[~in_stream]
+
     self.Kr    = darcy.relative_unsat_conductivity
     self.darcy = darcy.darcy
 
-  def slope_(self,i,j):
-    a = self.arr[i-1][j-1].H
-    b = self.arr[i-1][j].H
-    c = self.arr[i-1][j+1].H
-    d = self.arr[i][j-1].H
-    f = self.arr[i][j+1].H
-    g = self.arr[i+1][j-1].H
-    h = self.arr[i+1][j].H
-    k = self.arr[i+1][j+1].H
-    dzdx = ((c + 2.0*f + k) - (a + 2.0*d + g))/(8.0 * self.pixel_area)
-    dzdy = ((g + 2.0*h + k) - (a + 2.0*b + c))/(8.0 * self.pixel_area)
-    nasobek = math.sqrt(pow(dzdx,2) + pow(dzdy,2))
-    diffslope = math.atan(nasobek) * math.pi/180
-    
-    return diffslope
-
   def fill_slope(self):
     self.update_H()
 
   def get_exfiltration(self,i,j):
 
-    return self.arr[i][j].exfiltration
-  def bilance(self,i,j,infilt,inflow,dt):
+    return self.exfiltration[i][j]
 
-    arr = self.arr[i][j]
-    bil = infilt + arr.V_rest/self.pixel_area + inflow
-    
-    #print bil, infilt , arr.V_rest/self.pixel_area , inflow
-    percolation  = self.calc_percolation(i,j,bil,dt)
-    arr.cum_percolation += percolation
+  ## Water balance of the subsurface layer in all cells of the domain
+  #
+  #  @param infilt array of the infiltration of the time step [m]
+  #  @param dt time step
+  def bilance(self,infilt,dt):
+
+    rows = self.rows
+    cols = self.cols
+    inflow = self.route(self.V_runoff_pre)[rows,cols]/self.pixel_area
+    bil = infilt[rows,cols] + self.V_rest[rows,cols]/self.pixel_area + inflow
+
+    percolation = self.calc_percolation(bil,dt)
+    self.cum_percolation[rows,cols] += percolation
     bil -= percolation
-    #print bil,
-    arr.percolation = percolation
-    arr.h, arr.exfiltration = self.calc_exfiltration(i,j,bil)
-    #print arr.h
-    #print arr.h, infilt, arr.V_rest/self.pixel_area, inflow
-     
+    self.percolation[rows,cols] = percolation
+    self.h[rows,cols], self.exfiltration[rows,cols] = self.calc_exfiltration(bil)
 
-  def calc_percolation(self,i,j,bil,dt):
 
-    arr = self.arr[i][j]
+  def calc_percolation(self,bil,dt):
 
-    
-    if (bil > arr.L_sub):
-      S = 1.0
-    else:
-      S = bil/arr.L_sub
+    S = np.where(bil > self.L_sub, 1.0, bil/self.L_sub)
 
-    perc = arr.Ks*self.Kr(S,arr.vg_l,arr.vg_m)*dt
+    perc = self.Ks*self.Kr(S,self.vg_l,self.vg_m)*dt
     #jj bacha
     #perc = 0
-    if (perc > bil):
-      perc = bil
-    return perc
-
-  def calc_exfiltration(self,i,j,bil):
-
-    arr = self.arr[i][j]
-    if (bil > arr.L_sub):
-      #print bil
-      exfilt  = bil-arr.L_sub
-      bil = arr.L_sub
-      #print exfilt
-    else:
-      exfilt = 0
-      
-    return bil,exfilt
+    return np.where(perc > bil, bil, perc)
 
-  def runoff(self,i,j,delta_t,efect_vrst):
+  def calc_exfiltration(self,bil):
 
-    arr = self.arr[i][j]
-    #print arr .Ks
-    self.q_subsurface = self.darcy(arr,efect_vrst)
-    #print arr.h
-    arr.V_runoff = delta_t * self.q_subsurface
-    arr.V_rest = arr.h * self.pixel_area - delta_t * self.q_subsurface
+    over = bil > self.L_sub
+    exfilt = np.where(over, bil-self.L_sub, 0.0)
+    bil    = np.where(over, self.L_sub, bil)
+      
+    return bil,exfilt
 
-  def runoff_stream_cell(self,i,j):
-    self.arr[i][j].V_runoff = 0.0
-    self.arr[i][j].V_rest   = 0.0
-    return self.arr[i][j].h
+  ## Darcy outflow of the cells out of the stream
+  #
+  #  @param delta_t time step
+  #  @param efect_vrst array of the effective contour length
+  def runoff(self,delta_t,efect_vrst):
+
+    rows = self.field_rows
+    cols = self.field_cols
+    q = self.darcy(self.Ks,self.h[rows,cols],efect_vrst[rows,cols],self.slope[rows,cols])
+    self.q_subsurface[rows,cols] = q
+    self.V_runoff[rows,cols] = delta_t * q
+    self.V_rest[rows,cols]   = self.h[rows,cols] * self.pixel_area - delta_t * q
+
+  ## Returns the water of the stream cells, which flows into the reaches
+  #
+  #  @return rows, cols and water level of the stream cells
+  def runoff_stream_cells(self):
+    rows = self.stream_rows
+    cols = self.stream_cols
+    self.q_subsurface[rows,cols] = 0.0
+    self.V_runoff[rows,cols] = 0.0
+    self.V_rest[rows,cols]   = 0.0
+    return rows, cols, self.h[rows,cols]
 
   def curr_to_pre(self):
-    for i in self.rr:
-      for j in self.rc[i]:
-        self.arr[i][j].V_runoff_pre = self.arr[i][j].V_runoff
+    self.V_runoff_pre[:] = self.V_runoff
 
   def return_str_vals(self,i,j,sep,dt):
-    arr = self.arr[i][j]
      #';Sub_Water_level_[m];Sub_Flow_[m3/s];Sub_V_runoff[m3];Sub_V_rest[m3];Percolation[],exfiltration[];'
-    line = str(arr.h) + sep + str(arr.V_runoff/dt) + sep + str(arr.V_runoff) + sep + str(arr.V_rest) + sep + str(arr.percolation) + sep + str(arr.exfiltration)
+    line = str(self.h[i][j]) + sep + str(self.V_runoff[i][j]/dt) + sep + str(self.V_runoff[i][j]) + sep + \
+      str(self.V_rest[i][j]) + sep + str(self.percolation[i][j]) + sep + str(self.exfiltration[i][j])
     return line
 
 
@@ -164,24 +167,21 @@ class SubsurfacePass(object,Size,Globals):
   def __init__(self,L_sub, Ks, vg_n, vg_l):
     #jj
     self.n = 0
-    self.arr = np.empty((self.r,self.c), dtype=object)
     self.q_subsurface = None
     #self.arr = np.zeros([0],float)
     prt.message("\tOFF")
   def new_inflows(self):
     pass
-  def cell_runoff(self,i,j,sur):
-    return 0
   def fill_slope(self):
     pass
   def get_exfiltration(self,i,j):
     return 0.0
-  def bilance(self,i,j,infilt,inflow,dt):
+  def bilance(self,infilt,dt):
     pass
-  def runoff(self,i,j,delta_t,efect_vrst):
+  def runoff(self,delta_t,efect_vrst):
     pass
-  def runoff_stream_cell(self,i,j):
-    return 0.0
+  def runoff_stream_cells(self):
+    return [], [], []
   def return_str_vals(self,i,j,sep,dt):
     return ''
   def curr_to_pre(self):
@@ -189,8 +189,27 @@ class SubsurfacePass(object,Size,Globals):
 
 
 
-class Subsurface(SubsurfaceC if subflow == True else SubsurfacePass):
+class Subsurface(object):
   def __init__(self,L_sub = 0.010, Ks = 0.001, vg_n = 1.5, vg_l =  0.5):
     prt.message("Subsurface:")
     super(Subsurface, self).__init__(L_sub = L_sub, Ks = Ks, vg_n = vg_n, vg_l =  vg_l)
 
+
+
+## Returns the class Subsurface of the computation
+#
+#  SubsurfaceC with the kinematic or diffuse approach and the flow algorithm
+#  if the subsurface flow is computed, SubsurfacePass otherwise
+#
+#  @param G main_src.main_classes.General.Globals
+def subsurface_class(G):
+  if G.subflow == True:
+    if G.diffuse == True:
+      approach = Diffuse
+    else:
+      approach = Kinematic
+    bases = (Subsurface,SubsurfaceC,approach,flow_class(G),Size,Globals)
+  else:
+    bases = (Subsurface,SubsurfacePass)
+  return type('Subsurface',bases,{})
+
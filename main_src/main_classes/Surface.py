@@ -4,17 +4,16 @@ import sys
 import os
 #import psutil
 
-from   main_src.tools.resolve_partial_computing import *
-from main_src.main_classes.General              import *
-from main_src.main_classes.KinematicDiffuse     import *
-from main_src.main_classes.Stream               import *
+from main_src.main_classes.General              import Globals, Size
+from main_src.main_classes.KinematicDiffuse     import Kinematic, flow_class
+from main_src.main_classes.Stream               import Stream, StreamPass
 
 
+import main_src.constants                      as constants
 import main_src.processes.rill                 as rill
 import main_src.io_functions.prt               as prt
 import main_src.processes.surface              as surface
-from   main_src.tools.tools                     import comp_type
-isRill, subflow, stream, diffuse = comp_type()
+import main_src.tools.precision                as precision
 
 
 
@@ -59,7 +58,10 @@ class SurArrs :
 #  Class Surface contains data and methods
 #  to calculate the surface and rill runoff
 #
-class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
+#  the class of the computation is assembled in surface_class
+#  with the stream and the flow algorithm
+#
+class SurfaceC(object):
 
 
   ## The constructor
@@ -77,31 +79,44 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
         self.arr[i][j] = SurArrs(sur_ret,mat_inf_index[i][j],mat_hcrit[i][j],mat_aa[i][j],mat_b[i][j])
         #self.arr[i][j] = SurArrs(sur_ret,mat_inf_index[i][j],0.0025,mat_aa[i][j],mat_b[i][j])
 
+    ## indexes of the cells of the domain
+    self.rows = np.array([i for i in self.rr for j in self.rc[i]],int)
+    self.cols = np.array([j for i in self.rr for j in self.rc[i]],int)
+    ## cells of the domain in the order of self.rows, self.cols
+    self.cells = [self.arr[i][j] for i in self.rr for j in self.rc[i]]
+    ## numbers of the state transitions [from, to] in the last time step
+    self.transitions = np.zeros([3,3],int)
+
+    ## number of the rill sub-steps of each cell, adapted from the rill Courant number of the cell
+    self.ratio        = np.ones([self.r,self.c],int)
+    ## rill Courant number of each cell in the last time step
+    self.rill_courant = np.zeros([self.r,self.c],precision.float_)
+
     #raw_input()
-    self.rill_computing          = isRill
+    self.rill_computing          = self.isRill
     self.shallowSurfaceKinematic = surface.shallowSurfaceKinematic
     self.rillCalculations        = rill.rillCalculations
 
-    if (isRill) :
+    if (self.isRill) :
       prt.message("\tRill flow: \n\t\tON")
       self.runoff = self.__runoff
+      self.update_states = self.__update_states
     else:
       prt.message("\tRill flow: \n\t\tOFF")
       self.runoff = self.__runoff_zero_compType
+      self.update_states = self.__update_states_zero_compType
 
-    super(Surface, self).__init__()
+    super(SurfaceC, self).__init__()
 
 
 
   ## Calculates the sheet and rill flow.
   #
-  def __runoff(self,i,j,dt,efect_vrst,ratio) :
+  #  the state and the water levels of the cell are given by update_states
+  def __runoff(self,i,j,dt,efect_vrst) :
 
     arr = self.arr[i][j]
 
-    self.update_state(i,j)
-    self.compute_h_hrill(i,j)
-
     #if i == 8 : print "%.7f" % arr.h
     #if i == 8 : print "%.7f" % arr.h_rill 
     
@@ -115,16 +130,17 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
 
 
     if self.arr[i][j].state > 0 :
-      q_rill, v_rill, ratio, rill_courant = self.rill_runoff(i,j,dt,efect_vrst,ratio)
+      q_rill, v_rill, rill_courant = self.rill_runoff(i,j,dt,efect_vrst)
     else:
-      q_rill, v_rill, ratio, rill_courant = 0, 0, ratio, 0.0
+      q_rill, v_rill, rill_courant = 0, 0, 0.0
+    self.rill_courant[i][j] = rill_courant
 
     self.arr[i][j] = arr
 
-    return q_sheet, v_sheet, q_rill, v_rill, ratio, rill_courant
+    return q_sheet, v_sheet, q_rill, v_rill, rill_courant
 
 
-  def __runoff_zero_compType(self,i,j,dt,efect_vrst,ratio) :
+  def __runoff_zero_compType(self,i,j,dt,efect_vrst) :
 
     arr = self.arr[i][j]
 
@@ -139,119 +155,61 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
 
     self.arr[i][j] = arr
 
-    return q_sheet, v_sheet, q_rill, v_rill, ratio, 0.0
-
-
-  def update_state(self,i,j):
-
-    ht    = self.arr[i][j].h
-    ht_1  = self.arr[i][j].h_total_pre
-    hcrit = self.arr[i][j].h_crit
-    state = self.arr[i][j].state
-    test  = self.arr[i][j].state
-    
-    
-    
-    """
-    if state == 0:
-        if ht > hcrit:
-            state = 1
-    if state == 1:
-        if ht> ht_1:
-            pass
-        elif ht > 2*hcrit:
-            pass
-
-        else:
-            state = 2
-            #print "chocho", ht, hcrit, ht_1
-    if state == 2:
-        if (ht > 2*hcrit):
-            state = 1
-
-    """
-    #if i==1 and j==1 : print self.arr[i][j].h_total_pre,  self.arr[i][j].h, 
-    err = 0 #
-    #err = 0.00001
-    if ht>hcrit :
-
-      if state == 0:
-        #print i, j, ht, ht_1
-        state = 1
-        
-      elif state == 1 :
-        if ht>=(ht_1-err) :
-          pass
-####### test #########
-        else :
-          #if i==1 and j==1 : print '\t aa state 2'
-          state = 2
-####### test #########
-
-      elif state == 2:
-        if ht>=(ht_1-err)      :
-          pass
-          #state = 1
-        else :
-          pass
-####### test #########
-    else:
-      if state==1 :
-        state = 2
-
-    self.arr[i][j].state = state
-    #print state
-####### test #########
-   
-####### test #########
-    #with open('teststateprehoz.txt', 'a') as file:
-      #file.write(str(i) + ' ' + str(j) + ' ' + str(ht) + ' ' + str(ht_1) + ' ' + str(ht-ht_1) + ' ' + str(hcrit) + ' ' + str(test) + ' ' +str(state) + '\n')
-####### test #########
-
-  def compute_h_hrill(self,i,j):
-
-    arr = self.arr[i][j]
-
-    state = arr.state
-    #print state
-    #if i==6 and j==3 : print state, 'h', self.h
-    if state == 0 :
-      arr.h_rill = 0
-      arr.h_pre = arr.h
-    elif state == 1 :
+    return q_sheet, v_sheet, q_rill, v_rill, 0.0
 
-####### test #########
-      arr.h_rill = arr.h - arr.h_crit
-      arr.h      = arr.h_crit
-      arr.h_pre = arr.h_crit
-      #arr.h_rill = max(arr.h - arr.h_crit,0.0)
-      #arr.h      = min(arr.h,arr.h_crit)
-####### test #########
 
-      arr.h_rillPre = arr.h_rill
-      """
-    elif state == 2 :
-
-
-      arr.h_rill = arr.h/2
-      arr.h = arr.h_rill
-      arr.h_rillPre = arr.h_rill
-      arr.h_pre = arr.h
-
-
-    """
-    elif state == 2 :
-      #raw_input() 
+  ## Updates the states and splits the water level into the sheet and rill part
+  #
+  #  computed on the arrays of all cells of the domain except the stream cells (state >= 1000),
+  #  called after the water level h of all cells is known. The variables of the cells are
+  #  gathered into the arrays once per time step and the results are scattered back
+  #    - \b state 0 -> 1 the level exceeds the critical level
+  #    - \b state 1 -> 2 the level falls below the critical level or below the level of the previous time step
+  #    - \b state 0 the whole level is the sheet flow
+  #    - \b state 1 the level above the critical level is the rill flow
+  #    - \b state 2 the rill keeps the level of the last time step in the state 1
+  #
+  #  the numbers of the transitions are stored in self.transitions [from, to]
+  def __update_states(self):
+
+    cells = [arr for arr in self.cells if arr.state < 1000]
+    state = np.array([arr.state for arr in cells],int)
+    ht    = np.array([arr.h for arr in cells],float)
+    ht_1  = np.array([arr.h_total_pre for arr in cells],float)
+    hcrit = np.array([arr.h_crit for arr in cells],float)
+
+    above = ht > hcrit
+    new = np.select([above & (state == 0),
+                     above & (state == 1) & ~(ht >= ht_1),
+                     ~above & (state == 1)],
+                    [1, 2, 2], state)
+    self.transitions = np.bincount(state*3+new, minlength=9).reshape([3,3])
+
+    h_rill    = np.array([arr.h_rill for arr in cells],float)
+    h_rillPre = np.array([arr.h_rillPre for arr in cells],float)
+    h_pre     = np.array([arr.h_pre for arr in cells],float)
+
+    h_rill_2 = h_rillPre
+    lower = h_rill_2 < ht
+    h = np.select([new == 0, new == 1, (new == 2) & lower, new == 2],
+                  [ht, hcrit, ht - h_rill_2, 0.0], ht)
+    h_rill = np.select([new == 0, new == 1, (new == 2) & lower, new == 2],
+                       [0.0, ht - hcrit, h_rill_2, np.maximum(ht,0.0)], h_rill)
+    h_pre = np.select([new == 0, new == 1], [ht, hcrit], h_pre)
+    h_rillPre = np.where(new == 1, ht - hcrit, h_rillPre)
+
+    for arr, state, h, h_rill, h_pre, h_rillPre in zip(cells, new, h, h_rill, h_pre, h_rillPre):
+      arr.state     = state
+      arr.h         = h
+      arr.h_rill    = h_rill
+      arr.h_pre     = h_pre
+      arr.h_rillPre = h_rillPre
+
+
+  def __update_states_zero_compType(self):
+    pass
 
-      arr.h_rill = arr.h_rillPre
 
-      if (arr.h_rill < arr.h) :
-        arr.h      = arr.h - arr.h_rill
-      else:
-        arr.h_rill = max(arr.h,0)
-        arr.h      = 0.0
-
-    #if i==1 and j==1 :  print arr.h, arr.h_rill
   def sheet_runoff(self,i,j,dt):
     #jj h musi byt aktualni v self.h !!!!
 
@@ -265,7 +223,12 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
 
     return q_sheet
 
-  def rill_runoff(self,i,j,dt,efect_vrst,ratio):
+  ## Calculates the rill flow of the cell
+  #
+  #  the time step is divided into self.ratio[i][j] sub-steps, the number
+  #  is increased in main_src.processes.rill.rillCalculations until the rill
+  #  Courant condition of the cell is satisfied
+  def rill_runoff(self,i,j,dt,efect_vrst):
 
     arr = self.arr[i][j]
 
@@ -291,15 +254,15 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
     arr.V_rill_rest, \
     q_rill, \
     v_rill, \
-    ratio, \
+    self.ratio[i][j], \
     rill_courant = self.rillCalculations(arr,
                                          self.pixel_area,
                                          efect_vrst,
                                          constants.RILL_RATIO,
-                                         mat_n[i][j],
-                                         mat_slope[i][j],
+                                         self.mat_n[i][j],
+                                         self.mat_slope[i][j],
                                          dt,
-                                         ratio,ppp)
+                                         int(self.ratio[i][j]),ppp)
 
 
     #if i==8 : print  arr.h_rill * self.pixel_area, 
@@ -309,7 +272,7 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
     #arr.h_rill = arr.V_rill_rest/self.pixel_area
     arr.V_to_rill = V_to_rill
 
-    return q_rill, v_rill, ratio, rill_courant
+    return q_rill, v_rill, rill_courant
 
 
 
@@ -373,3 +336,18 @@ class Surface(Stream if stream == True else StreamPass,Kinematic,Globals,Size):
         #print arr.V_runoff_pre, arr.V_runoff,
         oscilaceT = True
     return oscilaceT
+
+
+
+## Returns the class Surface of the computation
+#
+#  Surface inherits the stream (or StreamPass), the kinematic approach
+#  and the flow algorithm according to the type of computing
+#
+#  @param G main_src.main_classes.General.Globals
+def surface_class(G):
+  if G.stream == True:
+    stream_ = Stream
+  else:
+    stream_ = StreamPass
+  return type('Surface',(SurfaceC,stream_,Kinematic,flow_class(G),Globals,Size),{})
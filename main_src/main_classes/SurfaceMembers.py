@@ -0,0 +1,193 @@
+## @package main_src.main_classes.SurfaceMembers sheet flow of all members of an ensemble
+#
+#  The surface of the members of main_src.ensemble is held in the arrays [members,cells],
+#  the leading axis is the member, the cells are the cells of the domain. The time step
+#  of all members is computed at once on these arrays: the interception, the Philip
+#  infiltration, the surface retention and the kinematic sheet flow, the inflows of all
+#  members are routed by one routing operator of the flow algorithm
+#  (main_src.main_classes.Flow.D8.route).
+#
+#  The operations are the ones of SurfaceC with the sheet flow only (onlyshallowsurface)
+#  in main_src.time_step.TimeStep.do in the same order, a single member gives the same
+#  results as main_src.runoff.run.
+#
+
+import numpy as np
+import math
+
+from main_src.main_classes.General              import Globals, Size
+from main_src.main_classes.KinematicDiffuse     import Kinematic, flow_class
+
+import main_src.io_functions.prt               as prt
+import main_src.tools.precision                as precision
+
+
+
+## Sheet flow of the members
+#
+#  the parameters changed by the members (main_src.ensemble.Member) have the axis of the members,
+#  the others are shared
+#
+class SurfaceMembersC(object):
+
+  ## The constructor
+  #
+  #  @param members list of main_src.ensemble.Member
+  #  @param data main_src.tools.resolve_partial_computing.PreparedData
+  #  @param rainfall_factor multiplier of the rainfall of the config, the rainfall of the member
+  #         is multiplied by rainfall_factor*member.rainfall
+  def __init__(self,members,data,rainfall_factor):
+
+    if (Globals.r == None or Globals.c == None):
+      exit("Global variables are not assigned")
+
+    prt.message("Surface of the members:")
+    prt.message("\t", len(members), "members")
+
+    self.n = 14
+    float_ = precision.float_
+
+    ## indexes of the cells of the domain
+    self.rows = np.array([i for i in self.rr for j in self.rc[i]],int)
+    self.cols = np.array([j for i in self.rr for j in self.rc[i]],int)
+    ## position of the cells of the domain in the arrays of the cells, -1 outside the domain
+    self.cell = -np.ones([self.r,self.c],int)
+    self.cell[self.rows,self.cols] = np.arange(len(self.rows))
+    rows = self.rows
+    cols = self.cols
+    shape = [len(members),len(rows)]
+
+    ## multiplier of the rainfall of each member
+    self.rainfall_factor = np.array([float(rainfall_factor)*member.rainfall for member in members],float)
+
+    # the parameter of the sheet flow is a/100/n, see main_src.data_preparation
+    self.a  = np.array([(data.mat_aa/member.n if member.n != 1.0 else data.mat_aa)[rows,cols] for member in members],float_)
+    self.b  = np.array(data.mat_b[rows,cols],float_)
+
+    # the combinations of the Philip parameters, k and s of each member
+    index = [iii[0] for iii in data.combinatIndex]
+    ## combination of the Philip parameters of each cell
+    self.combination = np.array([index.index(soil) for soil in data.mat_inf_index[rows,cols]],int)
+    self.k = np.array([[iii[1]*member.k for iii in data.combinatIndex] for member in members],float)
+    self.s = np.array([[iii[2]*member.s for iii in data.combinatIndex] for member in members],float)
+
+    ## ratio of the intercepted rainfall
+    self.ppl        = np.array(data.mat_ppl[rows,cols],float_)
+    ## potential interception [m]
+    self.pi         = np.array((data.mat_pi/1000.0)[rows,cols],float_)
+    self.efect_vrst = np.array(data.mat_efect_vrst[rows,cols],float_)
+
+    ## remaining surface retention of each member [m], negative
+    self.sur_ret = np.array([[-(data.surface_retention if member.surface_retention is None
+                                else float(member.surface_retention)/1000)]*len(rows) for member in members],float_)
+
+    ## intercepted water [m]
+    self.storage      = np.zeros(shape,float_)
+    ## the canopy storage is full and the rainfall is not intercepted
+    self.veg_full     = np.zeros(shape,bool)
+    self.interception = np.zeros(shape,float_)
+    self.h            = np.zeros(shape,float_)
+    self.infiltration = np.zeros(shape,float_)
+    self.cur_sur_ret  = np.zeros(shape,float_)
+    self.V_runoff     = np.zeros(shape,float_)
+    self.V_runoff_pre = np.zeros(shape,float_)
+    self.V_rest       = np.zeros(shape,float_)
+    self.V_rest_pre   = np.zeros(shape,float_)
+    self.sur_ret_tmp  = np.zeros(shape,float_)
+    self.V_rest_tmp   = np.zeros(shape,float_)
+    self.V_raster     = np.zeros([len(members),self.r,self.c],float_)
+
+    super(SurfaceMembersC, self).__init__()
+
+
+  ## Stores the arrays which are changed in the time step
+  def save(self):
+    self.V_rest_tmp[:]  = self.V_rest
+    self.sur_ret_tmp[:] = self.sur_ret
+
+
+  ## Restores the arrays if the time step is repeated
+  def undo(self):
+    self.V_rest[:]  = self.V_rest_tmp
+    self.sur_ret[:] = self.sur_ret_tmp
+
+
+  ## Computes the time step of all members
+  #
+  #  the Courant number of each member is stored in its main_src.courant.Courant
+  #
+  #  @param rainfall rainfall of the time step [m], a number or the array [r,c]
+  #  @param total_time time at the start of the time step
+  #  @param delta_t time step
+  #  @param delta_t_pre previous time step, the rainfall and the infiltration are computed with it
+  #  @param courants list of main_src.courant.Courant of the members
+  def do(self,rainfall,total_time,delta_t,delta_t_pre,courants):
+
+    rows = self.rows
+    cols = self.cols
+    pixel_area = self.pixel_area
+
+    # net rainfall
+    rainfall = self.rainfall_factor[:,np.newaxis]*np.broadcast_to(rainfall,(self.r,self.c))[rows,cols]
+    self.interception = np.where(self.veg_full, 0.0, self.ppl*rainfall)
+    NS = rainfall - self.interception
+
+    # inflows from the previous time step
+    self.V_raster[:,rows,cols] = self.V_runoff_pre
+    inflow = self.route(self.V_raster)[:,rows,cols]
+    bil = self.V_rest_pre/pixel_area + NS + inflow/pixel_area
+
+    # infiltration of the combinations
+    infiltration = (0.5*self.s/math.sqrt(total_time+delta_t_pre) + self.k)*delta_t_pre
+    infiltration = infiltration[:,self.combination]
+    over = infiltration > bil
+    self.infiltration = np.where(over, bil, infiltration)
+    bil = np.where(over, 0.0, bil - infiltration)
+
+    # surface retention
+    reten = self.sur_ret
+    temp  = bil + reten
+    fill  = (reten < 0) & (temp > 0)
+    keep  = (reten < 0) & ~(temp > 0)
+    bil   = np.select([fill, keep], [temp, 0.0], bil)
+    self.sur_ret = np.select([fill, keep], [0.0, temp], reten)
+    self.cur_sur_ret = self.sur_ret - reten
+
+    # sheet flow
+    self.h = bil
+    q_sheet = self.h**self.b*self.a
+    self.V_runoff = delta_t*q_sheet*self.dx
+    self.V_rest = self.h*pixel_area - self.V_runoff
+    v_sheet = np.where(self.h > 0.0, q_sheet/np.where(self.h > 0.0, self.h, 1.0), 0.0)
+
+    # the fastest cell of each member
+    cour = v_sheet/courants[0].cour_coef*delta_t/self.efect_vrst
+    most = np.argmax(cour,axis=1)
+    for courant, k, cour_, v, h in zip(courants,most,cour,v_sheet,self.h):
+      if cour_[k] > courant.cour_most:
+        courant.i = rows[k]
+        courant.j = cols[k]
+        courant.co = 'sheet'
+        courant.cour_most  = cour_[k]
+        courant.maxh       = h[k]
+        courant.cour_speed = v[k]
+
+
+  ## Updates the canopy storage and the variables of the previous time step
+  #
+  #  called after the time step is accepted
+  def update(self):
+    self.storage += self.interception
+    self.veg_full |= self.storage >= self.pi
+    self.V_runoff_pre[:] = self.V_runoff
+    self.V_rest_pre[:]   = self.V_rest
+
+
+
+## Returns the class SurfaceMembers of the computation
+#
+#  SurfaceMembersC with the kinematic approach and the flow algorithm
+#
+#  @param G main_src.main_classes.General.Globals
+def surface_members_class(G):
+  return type('SurfaceMembers',(SurfaceMembersC,Kinematic,flow_class(G),Globals,Size),{})
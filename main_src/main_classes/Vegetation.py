@@ -1,19 +1,19 @@
 import numpy as np
 
-from   main_src.tools.resolve_partial_computing import *
-from main_src.main_classes.General import *
+from main_src.main_classes.General import Globals, Size
+import main_src.tools.precision      as precision
 
 
 
-class VegArrs:
-  def __init__(self,veg_true,ppl,pi):
-    self.veg_true = veg_true
-    self.ppl      = ppl
-    self.pi       = pi
-
-
-## Documentation for a class.
-#  More details.
+## Interception of the rainfall by the vegetation
+#
+#  the vegetation of all cells is stored in arrays,
+#  each cell has its own canopy storage
+#
+#  the interception is computed for the whole grid in net_rainfall,
+#  the canopy storage is updated in update only after the time step
+#  is accepted, the time step can be therefore repeated without
+#  saving the vegetation state
 #
 class Vegetation(Globals,Size):
 
@@ -25,12 +25,31 @@ class Vegetation(Globals,Size):
       exit("Global variables are not assigned")
 
     self.n = 3
-    self.arr = np.empty((self.r,self.c), dtype=object)
-
-    for i in range(self.r):
-      for j in range(self.c):
-        self.arr[i][j] = VegArrs(0,mat_ppl[i][j],mat_pi[i][j])
-        
-        
-        
-        
\ No newline at end of file
+    float_ = precision.float_
+    ## ratio of the intercepted rainfall
+    self.ppl      = np.array(mat_ppl,float_)
+    ## potential interception [m]
+    self.pi       = np.array(mat_pi,float_)
+    ## intercepted water in each cell [m]
+    self.storage  = np.zeros([self.r,self.c],float_)
+    ## canopy state, 5 if the canopy storage is full and the rainfall is not intercepted
+    self.veg_true = np.zeros([self.r,self.c],int)
+    ## interception in the current time step [m]
+    self.interception = np.zeros([self.r,self.c],float_)
+
+
+  ## Returns the net rainfall of each cell
+  #
+  #  @param rainfall rainfall in the time step [m], a number or the array of the cells
+  def net_rainfall(self,rainfall):
+    self.interception = np.where(self.veg_true == 5, 0.0, self.ppl*rainfall) # interception is konstant
+    #jj nemelo by to byt interc = (1-rain_ppl) * rainfallm
+    return rainfall - self.interception
+
+
+  ## Adds the interception of the accepted time step to the canopy storage
+  #
+  #  if potentional interception is overthrown by intercepcion sum, then the rainfall is effetive
+  def update(self):
+    self.storage += self.interception
+    self.veg_true[self.storage >= self.pi] = 5
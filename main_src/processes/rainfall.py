@@ -3,8 +3,9 @@
 ## SMODERP 2D
 ## Created by Jan Zajicek, FCE, CTU Prague, 2012-2013
 
+import os
 import numpy as np
-import main_src.constants as constants
+import main_src.tools.tools as tools
 import sys
 import main_src.io_functions.prt as prt
 
@@ -84,76 +85,298 @@ def load_precipitation(fh):
     prt.message("Unexpected error:", sys.exc_info()[0])
     raise
 
-## Function returns a rainfall amount for current time step
-#  if two or more rainfall records belongs to one time step
-#  the function integrates the rainfall amount.
-def timestepRainfall(iterace,total_time,delta_t,tz,sr):
-  z = tz
-  # skontroluje jestli neni mimo srazkovy zaznam
-  if z > ( iterace - 1 ):
-    rainfall = 0
-  else:
-    # skontroluje jestli casovy krok, ktery prave resi, je stale vramci srazkoveho zaznamu z 
-    
-    if sr[z][0] >= ( total_time + delta_t ):
-      rainfall = sr[z][1] * delta_t
-    # kdyz je mimo tak  
-    else:
-      # dopocita zbytek ze zaznamu z, ktery je mezi total_time a total_time + delta_t
-      rainfall = sr[z][1] * (sr[z][0]-total_time)
-      # skoci do dalsiho zaznamu
-      z += 1
-      # koukne jestli ten uz neni mimo 
-      if z > ( iterace - 1 ):
-        rainfall += 0
+## Position of the time t in the records
+#
+#  the records are found by bisection (np.searchsorted)
+#
+#  @return k index of the record which starts before t
+#  @return w weight of the record k+1 in the linear interpolation
+def interval_weights(times,t):
+  k = np.searchsorted(times,t,side='right') - 1
+  k = min(max(k,0),len(times)-2)
+  w = min(max((t - times[k])/(times[k+1] - times[k]),0.0),1.0)
+  return k, w
+
+
+
+## Cumulative rainfall curve
+#
+#  the rainfall intensities of the records sr are integrated into the cumulative
+#  depth at the end of each record, the rainfall over any interval is the
+#  difference of the linearly interpolated cumulative depths at its ends.
+#  The curve has no cursor and the same interval can be computed repeatedly
+#  (e.g. if the time step is reduced by the Courant criterion).
+#
+#  The rainfall is the same in all cells.
+#
+class CumulativeRainfall():
+
+  distributed = False
+
+  ## the constructor
+  #
+  #  @param sr rainfall records [end time of the record [s], intensity [m/s]]
+  #  @param itera number of the records
+  def __init__(self,sr,itera):
+
+    if itera == 0:
+      sr = np.zeros([1,2],float)
+      sr[0][0] = 1.0
+
+    sr = np.array(sr,float)
+    ## start and end times of the records [s]
+    self.times = np.zeros(len(sr)+1,float)
+    self.times[1:] = sr[:,0]
+    ## cumulative rainfall depth at self.times [m]
+    self.depth = np.zeros(len(sr)+1,float)
+    self.depth[1:] = np.cumsum(sr[:,1]*np.diff(self.times))
+
+
+  ## Cumulative rainfall depth at the time t
+  #
+  #  the depth is constant after the end of the rainfall record
+  def cumulative_depth(self,t):
+    k, w = interval_weights(self.times,t)
+    return self.depth[k] + w*(self.depth[k+1] - self.depth[k])
+
+
+  ## Returns a rainfall amount for current time step
+  #  if two or more rainfall records belongs to one time step
+  #  the rainfall amount is integrated.
+  def timestep_rainfall(self,total_time,delta_t):
+    return float(self.cumulative_depth(total_time+delta_t) - self.cumulative_depth(total_time))
+
+
+  ## Cumulative rainfall records (times, depth) of the cell i, j
+  def records(self,i,j):
+    return self.times, self.depth
+
+
+
+## Loads the cumulative rainfall of several gauges
+#
+#  each line of the file contains the time [min] and the cumulative
+#  rainfall [mm] of each gauge
+#
+#  @return times times of the records [s], 0 is added at the beginning if missing
+#  @return depth cumulative rainfall depth [m], one column for each gauge
+def load_gauges(fh):
+  x = []
+  with open(fh,'r') as f:
+    for line in f:
+      z = line.split()
+      if len(z) == 0 or z[0].find('#') >= 0:
+        continue
+      x.append([float(item) for item in z])
+
+  if len(x) == 0 or len(set([len(item) for item in x])) != 1:
+    prt.error("Rainfall file", fh, "has to contain the time and the cumulative rainfall of each gauge on each line")
+
+  x = np.array(x,float)
+  x = x[np.argsort(x[:,0],kind='mergesort')]
+  times = x[:,0]*60.0        #prevod na vteriny
+  depth = x[:,1:]/1000.0     #prevod na metry
+
+  if (np.diff(depth,axis=0) < 0).any():
+    prt.error("Rainfall must be imputed in cumulative form")
+
+  if times[0] > 0:
+    times = np.concatenate(([0.0],times))
+    depth = np.vstack((np.zeros([1,depth.shape[1]]),depth))
+
+  return times, depth
+
+
+
+## Rows and columns of the computational cells
+def domain_cells(G):
+  rows = []
+  cols = []
+  for i in G.rr:
+    for j in G.rc[i]:
+      rows.append(i)
+      cols.append(j)
+  return np.array(rows,int), np.array(cols,int)
+
+
+
+## Rainfall of gauge zones
+#
+#  each cell belongs to a zone of one rain gauge, the zones are
+#  given in an ascii raster with the gauge index (starting from 0) in each cell,
+#  the gauge records are in the rainfall file, see load_gauges
+#
+class RainfallZones():
+
+  distributed = True
+
+  def __init__(self,zones_file,rainfall_file,G):
+
+    self.r = G.r
+    self.c = G.c
+    self.rows, self.cols = domain_cells(G)
+    self.times, self.depth = load_gauges(rainfall_file)
+
+    ## gauge index of all cells
+    self.zones = tools.read_ASC_raster(zones_file,G,int)
+    ## gauge index of the computational cells
+    self.zone = self.zones[self.rows,self.cols]
+    n = self.depth.shape[1]
+    if (self.zone < 0).any() or (self.zone >= n).any():
+      prt.error("Rainfall zones in", zones_file, "must be between 0 and", n-1)
+
+    prt.message('Rainfall:')
+    prt.message('\t', n, 'gauge zones from', zones_file)
+
+
+  ## Cumulative rainfall depth of the gauges at the time t
+  def cumulative_depth(self,t):
+    k, w = interval_weights(self.times,t)
+    return self.depth[k] + w*(self.depth[k+1] - self.depth[k])
+
+
+  ## Returns an array of the rainfall amount in each cell for current time step
+  def timestep_rainfall(self,total_time,delta_t):
+    gauges = self.cumulative_depth(total_time+delta_t) - self.cumulative_depth(total_time)
+    rainfall = np.zeros([self.r,self.c],float)
+    rainfall[self.rows,self.cols] = gauges[self.zone]
+    return rainfall
+
+
+  ## Cumulative rainfall records (times, depth) of the cell i, j
+  def records(self,i,j):
+    return self.times, self.depth[:,self.zones[i][j]]
+
+
+
+## Gridded rainfall from a stack of radar rasters
+#
+#  the stack is a numpy binary file (.npy) with the shape [times, rows, columns]
+#  and the cumulative rainfall [mm] in each cell, the times of the rasters [min]
+#  are given in the text file with the same name and the extension .times,
+#  one time on each line
+#
+#  The file is memory-mapped, only the rasters around the current time step
+#  are gathered for the computational cells, the memory therefore does
+#  not depend on the length of the record.
+#
+class RadarStack():
+
+  distributed = True
+
+  ## maximum number of the rasters held in memory
+  n_cached = 4
+
+  def __init__(self,stack_file,G):
+
+    self.r = G.r
+    self.c = G.c
+    self.rows, self.cols = domain_cells(G)
+    self.stack = np.load(stack_file,mmap_mode='r')
+
+    if self.stack.ndim != 3 or self.stack.shape[1:] != (G.r,G.c):
+      prt.error("Radar stack", stack_file, "has the shape", self.stack.shape, ",", ('times',G.r,G.c), "is expected")
+
+    times = np.loadtxt(os.path.splitext(stack_file)[0]+'.times',ndmin=1)*60.0  #prevod na vteriny
+    if len(times) != self.stack.shape[0]:
+      prt.error("Number of the times differs from the number of the rasters in", stack_file)
+    if (np.diff(times) <= 0).any():
+      prt.error("Times of the radar stack", stack_file, "must be ascending")
+
+    # zero rainfall at the beginning if it is not in the stack
+    self.offset = 0
+    if times[0] > 0:
+      times = np.concatenate(([0.0],times))
+      self.offset = 1
+    self.times = times
+    self.cache = {}
+
+    prt.message('Rainfall:')
+    prt.message('\t', self.stack.shape[0], 'radar rasters from', stack_file)
+
+
+  ## Cumulative rainfall depth [m] of the computational cells in the raster k
+  def __raster(self,k):
+    if k not in self.cache:
+      if len(self.cache) >= self.n_cached:
+        del self.cache[min(self.cache)]
+      if k < self.offset:
+        self.cache[k] = np.zeros(len(self.rows),float)
       else:
-        # pokud je total_time + delta_t stale dal nez konec posunuteho zaznamu
-        # vezme celou delku zaznamu a tuto srazku pricte
-        while (sr[z][0] <= ( total_time + delta_t) ) :
-          rainfall += sr[z][1] * (sr[z][0]-sr[z-1][0])
-          z += 1
-          if z > ( iterace - 1 ): break
-        # nakonec pricte to co je v poslednim zaznamu kde je total_time + delta_t pred konce zaznamu
-        # nebo pricte nulu pokud uz tam zadny zaznam neni
-        if z > ( iterace - 1 ):
-          rainfall += 0
-        else :
-          rainfall += sr[z][1] * (total_time+delta_t-sr[z-1][0])
-        
-      tz = z
-
-  return rainfall,tz
-
-
-  
-
-
-
-def current_rain(rain, rainfallm, sum_interception):
-  #jj
-  rain_veg = rain.veg_true
-  rain_ppl = rain.ppl
-  rain_pi  = rain.pi
-  
-  if rain_veg != int(5):
-    interc = rain_ppl * rainfallm # interception is konstant
-    #jj nemelo by to byt interc = (1-rain_ppl) * rainfallm
-    #                             -------------
-    
-    sum_interception += interc # sum of intercepcion
-    NS = rainfallm - interc # netto rainfallm
-    #jj nemela by byt srazka 0 dokun neni naplnena intercepcni zona?
-    #
-    
-    # if potentional interception is overthrown by intercepcion sum, then the rainfall is effetive
-    if sum_interception >= rain_pi:
-        rain_veg = int(5)
-  else:
-    NS = rainfallm
+        self.cache[k] = np.array(self.stack[k-self.offset][self.rows,self.cols],float)/1000.0
+    return self.cache[k]
+
+
+  ## Cumulative rainfall depth of the computational cells at the time t
+  def cumulative_depth(self,t):
+    k, w = interval_weights(self.times,t)
+    d0 = self.__raster(k)
+    return d0 + w*(self.__raster(k+1) - d0)
+
+
+  ## Returns an array of the rainfall amount in each cell for current time step
+  def timestep_rainfall(self,total_time,delta_t):
+    d0 = self.cumulative_depth(total_time)
+    rainfall = np.zeros([self.r,self.c],float)
+    rainfall[self.rows,self.cols] = self.cumulative_depth(total_time+delta_t) - d0
+    return rainfall
+
+
+  ## Cumulative rainfall records (times, depth) of the cell i, j
+  def records(self,i,j):
+    depth = np.array(self.stack[:,i,j],float)/1000.0
+    return self.times, np.concatenate((np.zeros(self.offset),depth))
 
-  return NS, sum_interception, rain_veg
 
 
+## Rainfall of the source multiplied by the factor
+#
+#  used for the rainfall scenarios and the members of main_src.ensemble
+#  (main_src.config.Config.rainfall_factor, optional parameter constants.PARAMETER_RAINFALL_FACTOR)
+#
+class ScaledRainfall():
 
+  def __init__(self,source,factor):
+    self.source = source
+    self.factor = float(factor)
+    self.distributed = source.distributed
 
 
+  def cumulative_depth(self,t):
+    return self.factor*self.source.cumulative_depth(t)
+
+
+  def timestep_rainfall(self,total_time,delta_t):
+    return self.factor*self.source.timestep_rainfall(total_time,delta_t)
+
+
+  def records(self,i,j):
+    times, depth = self.source.records(i,j)
+    return times, self.factor*depth
+
+
+
+## Returns the rainfall of the computation
+#
+#  uniform rainfall of the records sr, or the distributed rainfall if
+#  the radar stack (constants.PARAMETER_RAINFALL_RADAR) or the gauge
+#  zones (constants.PARAMETER_RAINFALL_ZONES) are given
+#
+#  @param config main_src.config.Config
+def rainfall_source(sr,itera,G,config):
+  radar = config.rainfall_radar
+  zones = config.rainfall_zones
+  if radar is not None:
+    source = RadarStack(radar,G)
+  elif zones is not None:
+    rainfall_file = config.rainfall_file
+    if rainfall_file is None:
+      prt.error("Rainfall file with the gauge records has to be given with the rainfall zones")
+    source = RainfallZones(zones,rainfall_file,G)
+  else:
+    source = CumulativeRainfall(sr,itera)
+
+  if float(config.rainfall_factor) != 1.0:
+    prt.message('Rainfall is multiplied by', config.rainfall_factor)
+    return ScaledRainfall(source,config.rainfall_factor)
+  return source
@@ -2,6 +2,9 @@
 #
 #  The computing area is determined  as well as the boundary cells.
 #
+#  The computation is started by run with main_src.config.Config,
+#  the module has no side effects at the import.
+#
 #  \e vypocet probiha v zadanem casovem kroku, pripade je cas kracen podle \b "Couranotva kriteria":
 #    - vystupy jsou rozdelieny do \b zakladnich a \b doplnkovych, podle zvoleneh typu vypoctu
 #    - \b zakladni
@@ -28,161 +31,244 @@ import time
 import os
 import platform
 import sys
+import copy
 #from   main_src.classes_main_arrays import *
-#from   main_src.tools.resolve_partial_computing import *
 
 # importing classes
 from main_src.time_step                  import TimeStep
-from main_src.main_classes.General       import *
+from main_src.main_classes.General       import Globals, set_globals
 from main_src.main_classes.Vegetation    import Vegetation
-from main_src.main_classes.Surface       import Surface
-from main_src.main_classes.Subsurface    import Subsurface
-from main_src.main_classes.CumulativeMax import Cumulative
+from main_src.main_classes.Surface       import surface_class
+from main_src.main_classes.Subsurface    import subsurface_class
+from main_src.main_classes.CumulativeMax import cumulative_class, CumulativePass
+from main_src.courant                    import Courant
 
 
 import main_src.constants                 as constants
-import main_src.courant                   as courant
+import main_src.processes.rainfall        as rain_f
 import main_src.tools.tools               as tools
 import main_src.io_functions.post_proc    as post_proc
 import main_src.io_functions.prt          as prt
 import main_src.io_functions.progress_bar as progress_bar
-from   main_src.tools.tools           import comp_type
-from   main_src.tools.times_prt       import TimesPrt
+import main_src.io_functions.hydrographs  as wf
+from   main_src.io_functions.mass_balance import MassBalance, MassBalancePass
+from   main_src.io_functions.outlets      import outlets
+from   main_src.io_functions.writer       import output_writer
+from   main_src.io_functions.field_store  import field_store
+import main_src.tools.precision           as precision
+import main_src.tools.prep_cache          as prep_cache
+from   main_src.tools.verification    import verification
+from   main_src.tools.resolve_partial_computing import resolve
+from   main_src.tools.times_prt       import TimesPrt, TimesPrtPass
+
+
+
+## Performs the computation
+#
+#  @param config main_src.config.Config, the config is copied,
+#         the parameters taken from the saved data are not written into the given config
+#  @param saved data list already loaded from Config.indata, see main_src.tools.resolve_partial_computing.resolve
+#  @param member main_src.ensemble.Member, its parameters are applied to the prepared data
+def run(config,saved=None,member=None):
+
+  config = copy.copy(config)
+
+  prt.setup(config.arcgis, config.debug_prt)
+  precision.setup(config.precision)
+  prep_cache.setup(config.prep_cache)
+
+  data = resolve(config,saved)
+  if data is None:
+    return
+  if member is not None:
+    member.apply(data)
+
+  set_globals(data, config)
+  # in the outlet-only mode only the outflow of the outlets is recorded
+  outlet_only = config.outlet_only
+  post_proc.setup(config.arcgis, Globals.stream, not(outlet_only))
 
+  isRill, subflow, stream, diffuse = config.comp_type()
 
+  output = data.output
+  rrows  = data.rrows
+  rcols  = data.rcols
+  end_time = data.end_time
 
-isRill, subflow, stream, diffuse = comp_type()
+  progress_bar.setup(config.arcgis, config.progress_interval, sum([len(rcols[i]) for i in rrows]),
+                     end_time, config.progress_json)
 
 
 
+  # the arcgis output is called only from the main thread
+  if config.arcgis:
+    writer = output_writer(0)
+  else:
+    writer = output_writer(config.output_queue)
 
 
+  if config.print_time is not None:
+    times_prt = TimesPrt(config.print_time,writer)
+  else:
+    times_prt = TimesPrtPass()
 
-times_prt = TimesPrt()
 
 
 
 
+  start = time.time()
 
-start = time.time()
+  infiltrationType = int(0)
+  total_time = 0.0 #delta_t bacha delta_t se prepisuje nize u couranta
+  maxIter = 40
 
-infiltrationType = int(0)
-total_time = 0.0 #delta_t bacha delta_t se prepisuje nize u couranta
-tz = 0
-sum_interception = 0
-ratio = 1
-maxIter = 40
+  prt.message("Floating point precision:", precision.precision)
 
 
+  rain_src = rain_f.rainfall_source(data.sr,data.itera,Globals,config)
+  rain_arr = Vegetation(data.mat_ppl,data.mat_pi/1000.0)
+  data.mat_ppl = None
+  data.mat_pi = None
 
-rain_arr = Vegetation(mat_ppl,mat_pi/1000.0)
-mat_ppl = None; del mat_ppl
-mat_pi = None; del mat_pi
 
 
+  Surface    = surface_class(Globals)
+  Subsurface = subsurface_class(Globals)
+  Cumulative = cumulative_class(Globals)
 
-surface = Surface(-surface_retention,mat_inf_index,mat_hcrit,mat_aa,mat_b)
-mat_inf_index = None; del mat_inf_index
-mat_hcrit = None; del mat_hcrit
-mat_aa = None; del mat_aa
-mat_b = None; del mat_b
+  surface = Surface(-data.surface_retention,data.mat_inf_index,data.mat_hcrit,data.mat_aa,data.mat_b)
+  data.mat_inf_index = None
+  data.mat_hcrit = None
+  data.mat_aa = None
+  data.mat_b = None
 
 
-if (subflow == True):
-  subsurface = Subsurface(L_sub = 0.1, Ks = 0.005, vg_n = 1.5, vg_l =  0.5)
-else:
-  subsurface = Subsurface()
+  if (subflow == True):
+    subsurface = Subsurface(L_sub = 0.1, Ks = 0.005, vg_n = 1.5, vg_l =  0.5)
+  else:
+    subsurface = Subsurface()
 
 
 
-cumulative = Cumulative()
-prt.message("--------------------- ------------------- ---------------------")
+  if outlet_only:
+    cumulative = CumulativePass()
+  else:
+    cumulative = Cumulative()
+  prt.message("--------------------- ------------------- ---------------------")
 
 
 
 
 
-courant = courant.Courant()
-delta_t = courant.initial_time_step(surface)
-courant.set_time_step(delta_t)
-delta_t_pre = delta_t
+  courant = Courant(config.max_delta_t)
+  delta_t = courant.initial_time_step(surface)
+  courant.set_time_step(delta_t)
+  delta_t_pre = delta_t
 
 
-prt.message('Corrected time step is', delta_t, '[s]')
+  prt.message('Corrected time step is', delta_t, '[s]')
 
 
 
-import io_functions.hydrographs as wf
-points_shape = points
-if points_shape and points_shape != "#":
-  hydrographs = wf.Hydrographs(array_points,output,mat_tok_usek,Globals)
-  arcgis      = get_argv(constants.PARAMETER_ARCGIS)
-  if not(arcgis):
-    with open(output+'/points.txt', 'w') as f:
-      for i in range(len(array_points)):
-        f.write(str(array_points[i][0]) + ' ' + str(array_points[i][3]) + ' ' + str(array_points[i][4]) + '\n')
-    f.closed
-else:
-  hydrographs = wf.HydrographsPass()
+  points_shape = data.points
+  array_points = data.array_points
+  if points_shape and points_shape != "#" and not(outlet_only):
+    if config.hydrograph_interval > 0.0:
+      hydrographs = wf.AggregatedHydrographs(array_points,output,data.mat_tok_usek,Globals,writer,config.hydrograph_interval)
+    else:
+      hydrographs = wf.Hydrographs(array_points,output,data.mat_tok_usek,Globals,writer)
+    arcgis      = config.arcgis
+    if not(arcgis):
+      with open(output+'/points.txt', 'w') as f:
+        for i in range(len(array_points)):
+          f.write(str(array_points[i][0]) + ' ' + str(array_points[i][3]) + ' ' + str(array_points[i][4]) + '\n')
+      f.closed
+  else:
+    hydrographs = wf.HydrographsPass()
 
 
-time_step = TimeStep(Globals)
+  time_step = TimeStep(Globals)
+  if outlet_only:
+    mass_balance = MassBalancePass()
+  else:
+    mass_balance = MassBalance(output,Globals,surface,cumulative,config.mass_balance)
+  fields = field_store(config,output,Globals,writer)
+  outlet = outlets(config,data.outletCells,output,surface,writer)
+  verify = verification(config,output,surface,subsurface,courant,rain_src,Globals)
 
 
+  ## Writes the rasters and closes all outputs
+  #
+  #  called at the end of the computation and before it is stopped in error,
+  #  the partial results are then complete
+  def close_outputs():
+    writer.put(post_proc.raster_output, output, cumulative, data.mat_slope, Globals, surface.arr)
+    writer.put(hydrographs.closeHydrographs)
+    fields.close()
+    outlet.close()
+    mass_balance.close()
+    verify.close()
+    writer.put(progress_bar.pb.close)
+    writer.close()
 
-for i in rrows:
-  for j in rcols[i]:
-    hydrographs.write_hydrographs_record(i,j,ratio,0.0,0.0,0,delta_t,total_time,surface,subsurface,0.0,)
 
 
-hydrographs.write_hydrographs_record(i,j,ratio,0.0,0.0,0,delta_t,total_time,surface,subsurface,0.0,True)
+  for i in rrows:
+    for j in rcols[i]:
+      hydrographs.write_hydrographs_record(i,j,surface.ratio,0.0,0.0,0,delta_t,total_time,surface,subsurface,0.0,)
 
 
+  hydrographs.write_hydrographs_record(i,j,surface.ratio,0.0,0.0,0,delta_t,total_time,surface,subsurface,0.0,True)
 
-while ( total_time < end_time ):
 
-    time_step.save(surface.arr,subsurface.arr)
-    tz_tmp               = tz
-    sum_interception_tmp = sum_interception
+  # numbers of the state transitions [from, to] of the accepted time steps
+  transitions = np.zeros([3,3],int)
+
+  while ( total_time < end_time ):
+
+    time_step.save(surface.arr,subsurface)
     #ratio_tmp            = ratio
     iter_                = 0
     
     while (iter_ < maxIter):
       iter_ += 1
-      time_step.undo(surface.arr,subsurface.arr)
-      tz                 = tz_tmp
-      sum_interception   = sum_interception_tmp
+      time_step.undo(surface.arr,subsurface)
       #ratio = ratio_tmp
       surface.statechange  = False
       courant.reset()
 
-      ratio_tmp = ratio
-      
-      NS, surface, subsurface, tz, sum_interception, ratio, curr_rain, v_sheet, v_rill = time_step.do(surface, subsurface, rain_arr, courant, Globals, itera, total_time, delta_t, delta_t_pre, tz, sr, combinatIndex, NoDataValue, sum_interception, mat_efect_vrst,ratio, hydrographs)
+      ratio_tmp = surface.ratio.copy()
+    
+      surface, subsurface, curr_rain, v_sheet, v_rill = time_step.do(surface, subsurface, rain_arr, courant, Globals, rain_src, total_time, delta_t, delta_t_pre, data.combinatIndex, data.NoDataValue, data.mat_efect_vrst, hydrographs)
 
       delta_t_tmp = delta_t
       #print 'asdf', ratio, courant.cour_most_rill
-      delta_t, ratio = courant.courant(curr_rain,delta_t,spix,ratio)
-      
-      
+      delta_t, ratio = courant.courant(curr_rain,delta_t,data.spix,surface.ratio,surface.rill_courant)
+    
+    
       #prt.debug('delta_t_tmp ', delta_t_tmp)
       #prt.debug('delta_t     ', delta_t)
       #prt.debug('ratio_tmp   ', ratio_tmp)
       #prt.debug('ratio       ', ratio)
       #prt.debug('cout_most      ', courant.cour_most)
       #prt.debug('cout_most_rill ', courant.cour_most_rill)
-      
-      
-      
-      
+    
+    
+    
+    
       #print total_time, delta_t_tmp, delta_t, ratio_tmp, ratio
 
-      if (delta_t_tmp == delta_t) and (ratio_tmp == ratio) and not(surface.statechange): break
+      if (delta_t_tmp == delta_t) and np.array_equal(ratio_tmp,ratio) and not(surface.statechange): break
 
+    transitions += surface.transitions
+    verify.step(total_time+delta_t)
+    if verify.failed:
+      close_outputs()
+      verify.error()
     timeperc = 100 * (total_time+delta_t) / end_time
     #raw_input()
   
-    progress_bar.pb.update(timeperc,delta_t,iter_,total_time+delta_t)
+    writer.put(progress_bar.pb.update,timeperc,delta_t,iter_,total_time+delta_t)
 
     #print total_time, surface.arr[8][1].V_rest/pixel_area, surface.arr[8][1].V_rill_rest/pixel_area, surface.arr[8][1].h_total_pre, (surface.arr[8][1].V_rest/pixel_area + surface.arr[8][1].V_rill_rest/pixel_area) - surface.arr[8][1].h_total_pre, surface.arr[8][1].state
     
@@ -193,18 +279,22 @@ while ( total_time < end_time ):
       for i in rrows:
         for j in rcols[i]:
           hydrographs.write_hydrographs_record(i,j,ratio,courant.cour_most,courant.cour_most_rill,iter_,delta_t,total_time+delta_t,surface,subsurface,curr_rain)
-      post_proc.raster_output(output, cumulative, mat_slope, Globals, surface.arr)
+      close_outputs()
       prt.error("max iteration in time step was reached\n","\tmaxIter = ", maxIter, '\n\tpartial results are saved in ', output, 'directory')
 
 
-    for i in rrows:
-      for j in rcols[i]:
-        cumulative.update_cumulative(i,j,surface.arr[i][j], subsurface,NS,delta_t)
-        hydrographs.write_hydrographs_record(i,j,ratio,courant.cour_most,courant.cour_most_rill,iter_,delta_t,total_time+delta_t,surface,subsurface,curr_rain)
+    if not(outlet_only):
+      for i in rrows:
+        for j in rcols[i]:
+          cumulative.update_cumulative(i,j,surface.arr[i][j], subsurface,time_step.NS[i][j],delta_t)
+          mass_balance.cell_storage(i,j,surface.arr[i][j])
+          hydrographs.write_hydrographs_record(i,j,ratio,courant.cour_most,courant.cour_most_rill,iter_,delta_t,total_time+delta_t,surface,subsurface,curr_rain)
 
+    rain_arr.update()
     surface.stream_reach_outflow(delta_t)
-    surface.stream_reach_inflow()
     surface.stream_cumulative(total_time+delta_t)
+    mass_balance.update(total_time+delta_t,delta_t,curr_rain)
+    outlet.update(total_time+delta_t,delta_t)
     
     
     delta_t_pre = delta_t
@@ -223,6 +313,7 @@ while ( total_time < end_time ):
     
     
     times_prt.prt(total_time,delta_t,surface)
+    fields.record(total_time+delta_t,delta_t,surface)
  
     if ( end_time - total_time ) < delta_t and ( end_time - total_time ) > 0:
       delta_t = end_time - total_time
@@ -230,45 +321,39 @@ while ( total_time < end_time ):
     total_time = total_time + delta_t
 
 
-#######################################################################
-##########                 End of main loop                 ###########
-#######################################################################
+  #######################################################################
+  ##########                 End of main loop                 ###########
+  #######################################################################
 
 
 
-prt.message("Saving data..")
+  prt.message("Saving data..")
 
  
-prt.message("")
-prt.message("-----------------------------------------------------------")
-prt.message('Total computing time: ',str(time.time()-start))
-
-
-
-post_proc.raster_output(output, cumulative, mat_slope, Globals, surface.arr)
-
-
-
-#tools.make_sur_raster(surface.arr,Globals,total_time+delta_t,output)
-#tools.make_sub_raster(subsurface.arr,Globals,total_time+delta_t,output)
-
-post_proc.stream_table(output+os.sep, surface, tokyLoc)
-
-hydrographs.closeHydrographs()
-prt.message("")
-
-if platform.system() == "Linux" :
-  pid = os.getpid()
-  prt.message("/proc/"+str(pid)+"/status", 'reading...')
-  with open("/proc/"+str(pid)+"/status",'r') as fp:
-    for i, line in enumerate(fp):
-      if i >= 11 and i <= 23 :
-        prt.message(line.replace("\n",""))
-
-
+  prt.message("")
+  prt.message("-----------------------------------------------------------")
+  prt.message('Total computing time: ',str(time.time()-start))
+  if isRill:
+    prt.message('State transitions:')
+    for from_, to_ in [(0,1), (1,2)]:
+      prt.message('\t', from_, '->', to_, ':', transitions[from_][to_])
 
 
 
+  #tools.make_sur_raster(surface.arr,Globals,total_time+delta_t,output)
+  #tools.make_sub_raster(subsurface,Globals,total_time+delta_t,output)
 
+  post_proc.stream_table(output+os.sep, surface, data.tokyLoc)
 
+  # the computation is finished, the arrays are not changed any more
+  close_outputs()
+  verify.error()
+  prt.message("")
 
+  if platform.system() == "Linux" :
+    pid = os.getpid()
+    prt.message("/proc/"+str(pid)+"/status", 'reading...')
+    with open("/proc/"+str(pid)+"/status",'r') as fp:
+      for i, line in enumerate(fp):
+        if i >= 11 and i <= 23 :
+          prt.message(line.replace("\n",""))
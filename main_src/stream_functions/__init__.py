@@ -1,2 +1,2 @@
-__all__ = ["stream","stream_preparation"]
+__all__ = ["stream","stream_preparation","hydraulics"]
 
@@ -0,0 +1,180 @@
+## @package main_src.stream_functions.hydraulics Geometry of the stream reaches cross sections.
+#
+#  Contains the analytic water level in the trapezoid (rectangle and triangle
+#  are its special cases), the base flow (Q365) cache and the stage tables
+#  of the reach shapes.
+#
+#  The reach shapes (TVAR) are:
+#    - 0 trapezoid
+#    - 1 rectangle
+#    - 2 triangle
+#    - 3 parabola
+
+import numpy as np
+
+import main_src.io_functions.prt as prt
+
+
+
+## Water level in trapezoidal reach with the flow area A,
+#
+#   the positive root of
+#   \f[
+#      mh^2 + bh - A = 0
+#   \f]
+#   written as
+#   \f[
+#      h = \frac{2A}{b + \sqrt{b^2 + 4mA}}
+#   \f]
+#   which holds also for the rectangle (m = 0) and the triangle (b = 0)
+#
+#   @return h water level in the trapezoid
+#
+def trapezoid_depth(A,b,m):
+  return 2.0*A/(b + np.sqrt(b*b + 4.0*m*A))
+
+
+
+## Flow area and wetted perimeter of the reaches at the water level h
+#
+#   @param shape TVAR of the reaches
+#   @param b bottom width, in case of parabola the focal distance
+#   @param m side slope
+#   @param h water level
+#
+#   @return A flow area
+#   @return O wetted perimeter
+#
+def cross_section(shape,b,m,h):
+
+  bottom = np.where(shape == 2, 0.0, b)
+  sides  = np.where(shape == 1, 0.0, m)
+
+  A = bottom*h + sides*h*h
+  O = bottom + 2.0*h*np.sqrt(1.0 + sides*sides)
+
+  # parabola y = x^2/(4a), a is the focal distance stored in b
+  B = 4.0*np.sqrt(b*h)
+  A = np.where(shape == 3, 2.0/3.0*B*h, A)
+  O = np.where(shape == 3, B + 8.0*h*h/(3.0*np.maximum(B,1e-12)), O)
+
+  return A, O
+
+
+
+## Stage - area - conveyance tables of the reaches
+#
+#  each reach has its own row of the table, the stages are
+#  refined close to the bottom of the reach
+#
+#  the conveyance is
+#  \f[
+#     K = \frac{1}{n} A R^{2/3}
+#  \f]
+#  so the discharge is \f$ Q = K\sqrt{i} \f$
+#
+class StageTable():
+
+  ## the constructor
+  #
+  #  @param reach main_src.main_classes.Stream.ReachArrs
+  #  @param h_max highest stage stored in the table
+  #  @param n_stages number of the stages in the table
+  def __init__(self,reach,h_max=10.0,n_stages=128):
+
+    self.h_max = h_max
+    stages = h_max*np.linspace(0.0,1.0,n_stages)**2
+
+    self.h = np.tile(stages,(reach.n,1))
+    shape = reach.shape[:,None]
+    A, O = cross_section(shape,reach.b[:,None],reach.m[:,None],self.h)
+    self.A = A
+    self.O = O
+    R = A/np.maximum(O,1e-12)
+    self.K = A*np.power(R,0.6666)/reach.roughness[:,None]
+
+    for id_ in np.where(np.diff(A,axis=1).min(axis=1) <= 0)[0]:
+      prt.error("Stage table of the reach", id_, "is not increasing, check the shape parameters B and M")
+
+
+
+  ## Linear interpolation in the table rows of reaches idx
+  def __interp(self,idx,xp,fp,x):
+    xp = xp[idx]
+    fp = fp[idx]
+    k = (xp <= x[:,None]).sum(axis=1) - 1
+    k = np.clip(k,0,xp.shape[1]-2)
+    row = np.arange(len(idx))
+    x0 = xp[row,k]
+    x1 = xp[row,k+1]
+    w = (x - x0)/(x1 - x0)
+    return fp[row,k] + w*(fp[row,k+1] - fp[row,k])
+
+
+
+  ## Water level in reaches idx with the flow area A
+  def depth(self,idx,A):
+    for id_ in idx[A > self.A[idx,-1]]:
+      prt.debug("Flow area in the reach", id_, "is out of the stage table, h_max =", self.h_max, "m is used")
+    A = np.minimum(A,self.A[idx,-1])
+    return self.__interp(idx,self.A,self.h,A)
+
+
+  ## Flow area in reaches idx at the water level h
+  def area(self,idx,h):
+    return self.__interp(idx,self.h,self.A,h)
+
+
+  ## Wetted perimeter in reaches idx at the water level h
+  def perimeter(self,idx,h):
+    return self.__interp(idx,self.h,self.O,h)
+
+
+  ## Conveyance of reaches idx at the water level h
+  def conveyance(self,idx,h):
+    return self.__interp(idx,self.h,self.K,h)
+
+
+
+## Base flow (Q365) state of the reaches
+#
+#  the base flow depends only on the time step, the water level hp,
+#  the water surface width B and the flow area A of the base flow are
+#  therefore computed only if the time step changes
+#
+class BaseFlow():
+
+  def __init__(self,reach,table):
+    self.reach = reach
+    self.table = table
+    self.dt = None
+    self.hp = np.zeros(reach.n,float)
+    self.B  = np.zeros(reach.n,float)
+    self.A  = np.zeros(reach.n,float)
+
+
+  def update(self,dt):
+
+    if dt == self.dt:
+      return
+
+    reach = self.reach
+    Vp = reach.Q365*dt
+    self.A = Vp/reach.length
+
+    rect  = reach.shape == 1
+    trap  = reach.shape == 0
+    table = (reach.shape == 2) | (reach.shape == 3)
+
+    self.hp[rect] = (self.A/reach.b)[rect]
+    self.B[rect]  = reach.b[rect]
+
+    hp = trapezoid_depth(self.A,reach.b,reach.m)
+    self.hp[trap] = hp[trap]
+    self.B[trap]  = (reach.b + 2.0*hp*reach.m)[trap] #b pro pocatecni stav (Q365)
+
+    idx = np.where(table)[0]
+    if len(idx) > 0:
+      self.hp[idx] = self.table.depth(idx,self.A[idx])
+
+    self.dt = dt
@@ -2,165 +2,108 @@
 
 import math
 import sys
+import numpy as np
 import main_src.io_functions.prt as prt
-from   inspect import currentframe, getframeinfo
+from   main_src.stream_functions.hydraulics import trapezoid_depth
 
-## Jen na debug, umi to zjistit nazev souboru a radek odkud se\n
-#  <em>print frameinfo.filename, frameinfo.lineno</em>\n
-#  tiskne
-frameinfo = getframeinfo(currentframe())
 
+## Manning velocity in reaches idx with the hydraulic radius R
+def velocity(reach,idx,R):
+  return np.power(R,0.6666)*np.power(reach.slope[idx],0.5)/(reach.roughness[idx])  #v
 
-## Newton method to compute water level in trapezoidal reach,
-# 
-#   \f[
-#   h_{n+1} = h_{n} - \frac{f(h_n)}{f^{\prime}(h_n)}
-#   \f]
-#   \f[
-#      f(h) = bh+mh^2 - A
-#   \f]
-#   \f[
-#      f^{\prime}(h) = b+2mh
-#   \f]
-#   
-#   @return h water level in the trapezoid
+
+
+## Limits the outflow of reaches idx by the water volume dV available in the reach
+#  and stores the results
 #   
-def compute_h(A,m,b,err=0.0001,maxIter=20):
-  def feval(h):
-    return b*h+m*h*h-A
-  def dfdheval(h):
-    return b+2.0*m*h
-  # prvni odhad vysky
-  h_pre = A/b
-  h = h_pre
-  iter_ = 1
-  while (feval(h_pre) > err):
-   h = h_pre - feval(h_pre)/dfdheval(h_pre)
-   h_pre = h
-   if iter_ >= maxIter :
-     prt.error("if file", frameinfo.filename, "near line ",frameinfo.lineno, "\n\t newton solver didnt converge after", maxIter, 'iterations (maxIter=',maxIter,')')
-     break
-   iter_ += 1
-  #print 'check', A, b*h+m*h*h
-  return h
-
-
-
-## Function calculates the discharge in rectangular shaped reach of a stream.
+def outflow_volume(reach,idx,dt,dV,S,vs,H):
+  Q_out = S*vs # Vo=Qo.dt=S.R^2/3.i^1/2/(n).dt
+  V_out = Q_out*dt
+  V_out = np.minimum(V_out,dV)
+  reach.vs[idx]     = vs
+  reach.V_out[idx]  = V_out
+  reach.Q_out[idx]  = V_out/dt
+  reach.V_rest[idx] = dV - V_out #V_zbyt
+  reach.h[idx]      = H
+
+
+
+## Function calculates the discharge in rectangular shaped reaches of a stream.
 # 
+#   @param reach main_src.main_classes.Stream.ReachArrs with all reaches
+#   @param idx indexes of the computed reaches
+#   @param dt time step
 #   
-def rectangle(reach,dt):
-  Vp = reach.Q365*dt
-  hp = Vp/(reach.b*reach.length)
-  dV = reach.V_in_from_field + reach.V_rest + reach.V_in_from_reach
-  h  = dV/(reach.b * reach.length)
+def rectangle(reach,idx,dt):
+  b      = reach.b[idx]
+  hp = reach.base.hp[idx]
+  dV = reach.V_in_from_field[idx] + reach.V_rest[idx] + reach.V_in_from_reach[idx]
+  h  = dV/(b*reach.length[idx])
   H = hp + h
-  O = reach.b+2*H
-  S = reach.b*H
+  O = b+2*H
+  S = b*H
   R = S/O
-  reach.vs = math.pow(R,0.6666)*math.pow(reach.slope,0.5)/(reach.roughness)  #v
-  reach.Q_out = S*reach.vs # Vo=Qo.dt=S.R^2/3.i^1/2/(n).dt
-  reach.V_out = reach.Q_out*dt
-  if reach.V_out > dV:
-    reach.V_out = dV
-    reach.Q_out = dV/dt
-    reach.V_rest= 0.0
-  else:
-    reach.Q_out = reach.V_out/dt
-    reach.V_rest = dV - reach.V_out #V_zbyt
-  reach.h = H
+  outflow_volume(reach,idx,dt,dV,S,velocity(reach,idx,R),H)
     
     
     
   
   
-## Function calculates the discharge in trapezoidal shaped reach of a stream.
+## Function calculates the discharge in trapezoidal shaped reaches of a stream.
 # 
+#   @param reach main_src.main_classes.Stream.ReachArrs with all reaches
+#   @param idx indexes of the computed reaches
+#   @param dt time step
 #   
-def trapezoid(reach,dt):
-  
-  Vp = reach.Q365*dt
-  hp = compute_h(A=Vp/reach.length,m=reach.m,b=reach.b)
-  B = reach.b + 2.0*hp*reach.m #b pro pocatecni stav (Q365)
-  Bb = B+hp*reach.m
-  h  = compute_h(A=(reach.V_in_from_field + reach.V_rest + reach.V_in_from_reach)/reach.length,m=reach.m,b=reach.b)
+def trapezoid(reach,idx,dt):
+  b      = reach.b[idx]
+  m      = reach.m[idx]
+  length = reach.length[idx]
+  hp = reach.base.hp[idx]
+  B  = reach.base.B[idx] #b pro pocatecni stav (Q365)
+  h  = trapezoid_depth(A=(reach.V_in_from_field[idx] + reach.V_rest[idx] + reach.V_in_from_reach[idx])/length,b=b,m=m)
   H = hp + h # celkova vyska
-  O = B+2.0*H*math.pow(1+reach.m*reach.m,0.5)
-  S = B*H+reach.m*H*H
-  dS = S - reach.b*hp+reach.m*hp*hp
-  dV = dS*reach.length
+  O = B+2.0*H*np.power(1+m*m,0.5)
+  S = B*H+m*H*H
+  dS = S - (b*hp+m*hp*hp)
+  dV = dS*length
   R = S/O
-  reach.vs = math.pow(R,0.6666)*math.pow(reach.slope,0.5)/(reach.roughness) #v
-  reach.Q_out = S*reach.vs # Vo=Qo.dt=S.R^2/3.i^1/2/(n).dt
-  reach.V_out = reach.Q_out*dt
-  if reach.V_out > dV:
-    reach.V_out = dV
-    reach.Q_out = dV/dt
-    reach.V_rest
-  else: 
-    reach.Q_out = reach.V_out/dt
-    reach.V_rest = dV - reach.V_out #V_zbyt
-  reach.h = H
+  outflow_volume(reach,idx,dt,dV,S,velocity(reach,idx,R),H)
   #prt.mujout.writelines(str(reach.id_) + ';' + str(reach.h) + ';' + str(reach.V_in_from_field) + ';' + str(reach.V_rest) + ';' + str( reach.V_in_from_reach) + ';' + str(reach.V_out) + ';' + str(reach.to_node)+'\n')
   
   
   
+## Function calculates the discharge in reaches which geometry is
+#  evaluated from the stage tables main_src.stream_functions.hydraulics.StageTable.
+#
+#  The base flow area is added to the water volume in the reach, the water level
+#  and the conveyance K are interpolated in the tables, \f$ Q = K\sqrt{i} \f$
+#   
+def tabulated(reach,idx,dt):
+  table = reach.table
+  dV = reach.V_in_from_field[idx] + reach.V_rest[idx] + reach.V_in_from_reach[idx]
+  S  = reach.base.A[idx] + dV/reach.length[idx]
+  H  = table.depth(idx,S)
+  Q_out = table.conveyance(idx,H)*np.power(reach.slope[idx],0.5)
+  vs = np.where(S > 0.0, Q_out/np.maximum(S,1e-12), 0.0)
+  outflow_volume(reach,idx,dt,dV,S,vs,H)
+
+
+
 ## Function calculates the discharge in triangular shaped reach of a stream.
 # 
 #   
-def triangle(reach,dt):
-  pass
-  #Vp = reach.Q365*dt
-  #hp = math.pow(Vp/(reach.length*reach.m),0.5)
-  #B = 2.0*hp*reach.m #b pro pocatecni stav (Q365)
-  #Bb = B + reach.h*reach.m
-  #h  = (reach.V_in_from_field + reach.V_rest + reach.V_in_from_reach)/(Bb * reach.length)
-  #H = hp + h
-  #O = 2.0*H*math.pow(1.0+reach.m*reach.m,0.5)
-  #S = reach.m*H*H
-  #dS = B*reach.h + reach.m*reach.h*reach.h
-  #dV = dS*reach.length
-  #R = S/O
-  #reach.vs = math.pow(R,0.6666)*math.pow(reach.slope,0.5)/(reach.roughness) #v
-  #reach.Q_out = S*reach.vs # Vo=Qo.dt=S.R^2/3.i^1/2/(n).dt
-  #reach.V_out = reach.Q_out*dt
-  #if reach.V_out > dV:
-    #reach.V_out = dV
-    #reach.Q_out = dV/dt
-    #reach.V_rest = 0
-  #else:
-    #reach.Q_out = reach.V_out/dt
-    #reach.V_rest = dV - reach.V_out
-  #reach.h = H
+def triangle(reach,idx,dt):
+  tabulated(reach,idx,dt)
 
 
 
 ## Function calculates the discharge in parabola shaped reach of a stream.
 # 
+#   the focal distance of the parabola is stored in the B attribute of the reach
 # 
-def parabola(reach,dt):
-  pass
-  #a = reach.b   #vzd ohniska od vrcholu
-  #u = 3.0 #(h=B/u  B=f(a))
-  #Vp = reach.Q365*dt
-  #hp = math.pow(Vp*3/(2*reach.length*u),0.5)
-  #B = u*hp #sirka hladiny #b = 3*a/(2*h)
-  #reach.h = math.pow((reach.V_in_from_field + reach.V_rest)/(2*reach.length*math.pow(hp,0.5))+math.pow(hp,1.5),0.6666)  # h = (dV/2.L.hp^0,5+hp^1,5)^0,666
-  #H = hp + reach.h
-  #Bb = u*H
-  #O = Bb+8*H*H/(3*Bb)
-  #S = 2/3*Bb*H
-  #dS = S - 2/3*B*hp
-  #dV = dS*reach.length
-  #R = S/O
-  #reach.Q_out = S*math.pow(R,0.66666)*math.pow(reach.slope,0.5)/(reach.roughness) # Vo=Qo.dt=S.R^2/3.i^1/2/(n).dt
-  #reach.V_out = reach.Q_out*dt
-  #if reach.V_out > dV:
-    #reach.V_out = dV
-    #reach.Q_out = dV/dt
-  #reach.vs = math.pow(R,0.6666)*math.pow(reach.slope,0.5)/(reach.roughness) #v
-  #reach.V_rest = dV - reach.V_out
-  #reach.h = H
+def parabola(reach,idx,dt):
+  tabulated(reach,idx,dt)
 
 
 
@@ -83,7 +83,7 @@ def prepare_streams(dmt, dmt_copy, mat_dmt_fill, null,
 
   #WATER FLOWS ACCORDING DMT:
   #dmt_clip = data_preparation.dmt_clip
-  dmt_fill,flow_direction,flow_accumulation,slope = arcgis_dmtfce.dmtfce(dmt_clip, temp_dp, "TRUE", "TRUE", "NONE")
+  dmt_fill,flow_direction,flow_accumulation,slope = arcgis_dmtfce.cached_dmtfce(dmt_clip, temp_dp, "TRUE", "TRUE", "NONE")
 
   #Setnull
   try:
@@ -3,19 +3,13 @@
 
 
 
-import main_src.processes.rainfall        as rain_f
 import main_src.processes.infiltration    as infilt
-from   main_src.tools.tools               import comp_type
+import main_src.tools.precision           as precision
 import main_src.io_functions.prt          as prt
 import copy
 import numpy as np
 
 
-infilt_capa = 0
-infilt_time = 0
-max_infilt_capa = 0.000
-
-
 
 
 ## Class manages the one time step operation
@@ -30,34 +24,43 @@ class TimeStep:
     self.c = G.c
     self.rr = G.rr
     self.rc = G.rc
-
-    self.V_rest_tmp        = np.zeros([self.r,self.c],float)
-    #self.V_runoff_tmp      = np.zeros([self.r,self.c],float)
-    self.state_tmp         = np.zeros([self.r,self.c],float)
-    self.h_total_pre_tmp   = np.zeros([self.r,self.c],float)
-    self.sur_ret_tmp       = np.zeros([self.r,self.c],float)
-
-    isRill  = comp_type("rill")
-    subflow = comp_type("subflow")
-    stream  = comp_type("stream")
+    float_  = precision.float_
+
+    self.infilt_capa = 0
+    self.infilt_time = 0
+    self.max_infilt_capa = 0.000
+
+    self.V_rest_tmp        = np.zeros([self.r,self.c],float_)
+    #self.V_runoff_tmp      = np.zeros([self.r,self.c],float_)
+    self.state_tmp         = np.zeros([self.r,self.c],float_)
+    self.h_total_pre_tmp   = np.zeros([self.r,self.c],float_)
+    self.sur_ret_tmp       = np.zeros([self.r,self.c],float_)
+    ## net rainfall of each cell in the time step
+    self.NS                = np.zeros([self.r,self.c],float_)
+    ## infiltration of each cell in the time step, inflow into the subsurface
+    self.infiltration      = np.zeros([self.r,self.c],float_)
+
+    isRill  = G.isRill
+    subflow = G.subflow
+    stream  = G.stream
 
     if isRill and not(subflow)  :
-      self.V_rill_rest_tmp   = np.zeros([self.r,self.c],float)
-      #self.V_rill_runoff_tmp = np.zeros([self.r,self.c],float)
-      self.rillWidth_tmp     = np.zeros([self.r,self.c],float)
+      self.V_rill_rest_tmp   = np.zeros([self.r,self.c],float_)
+      #self.V_rill_runoff_tmp = np.zeros([self.r,self.c],float_)
+      self.rillWidth_tmp     = np.zeros([self.r,self.c],float_)
       self.save = self.__saveSurRill
       self.undo = self.__undoSurRill
 
     elif not(isRill) and subflow :
-      self.V_subf_rest_tmp   = np.zeros([self.r,self.c],float)
+      self.V_subf_rest_tmp   = np.zeros([self.r,self.c],float_)
       self.save = self.__saveSurSub
       self.undo = self.__undoSurSub
 
 
     elif isRill and subflow :
-      self.V_rill_rest_tmp   = np.zeros([self.r,self.c],float)
-      self.rillWidth_tmp     = np.zeros([self.r,self.c],float)
-      self.V_subf_rest_tmp   = np.zeros([self.r,self.c],float)
+      self.V_rill_rest_tmp   = np.zeros([self.r,self.c],float_)
+      self.rillWidth_tmp     = np.zeros([self.r,self.c],float_)
+      self.V_subf_rest_tmp   = np.zeros([self.r,self.c],float_)
       self.save = self.__saveSurSubRill
       self.undo = self.__undoSurSubRill
 
@@ -108,44 +111,36 @@ class TimeStep:
         #surArr[i][j].V_runoff_rill=self.V_rill_runoff_tmp[i][j]
 
 
-  def __saveSurSub(self,surArr, subArr):
-    self.__saveSur(surArr, subArr)
-    for i in self.rr:
-      for j in self.rc[i]:
-        self.V_subf_rest_tmp[i][j] = subArr[i][j].V_rest
+  def __saveSurSub(self,surArr, sub):
+    self.__saveSur(surArr, sub)
+    self.V_subf_rest_tmp[:] = sub.V_rest
 
 
-  def __undoSurSub(self,surArr, subArr):
-    self.__undoSur(surArr, subArr)
-    for i in self.rr:
-      for j in self.rc[i]:
-        subArr[i][j].V_rest = self.V_subf_rest_tmp[i][j]
+  def __undoSurSub(self,surArr, sub):
+    self.__undoSur(surArr, sub)
+    sub.V_rest[:] = self.V_subf_rest_tmp
 
 
 
-  def __saveSurSubRill(self,surArr, subArr):
-    self.__saveSur(surArr, subArr)
+  def __saveSurSubRill(self,surArr, sub):
+    self.__saveSur(surArr, sub)
     for i in self.rr:
       for j in self.rc[i]:
         self.V_rill_rest_tmp[i][j] = surArr[i][j].V_rill_rest
         self.rillWidth_tmp[i][j]   = surArr[i][j].rillWidth
-        self.V_subf_rest_tmp[i][j] = subArr[i][j].V_rest
+    self.V_subf_rest_tmp[:] = sub.V_rest
 
-  def __undoSurSubRill(self,surArr, subArr):
-    self.__undoSur(surArr, subArr)
+  def __undoSurSubRill(self,surArr, sub):
+    self.__undoSur(surArr, sub)
     for i in self.rr:
       for j in self.rc[i]:
         surArr[i][j].V_rill_rest = self.V_rill_rest_tmp[i][j]
         surArr[i][j].rillWidth   = self.rillWidth_tmp[i][j]
-        subArr[i][j].V_rest = self.V_subf_rest_tmp[i][j]
+    sub.V_rest[:] = self.V_subf_rest_tmp
 
 
 
-  def do(self,surface, subsurface, rain_arr, courant, G, itera, total_time, delta_t, delta_t_pre, tz, sr, combinatIndex, NoDataValue, sum_interception, mat_efect_vrst,ratio, hydrographs):
-
-    global infilt_capa
-    global max_infilt_capa
-    global infilt_time
+  def do(self,surface, subsurface, rain_arr, courant, G, rain_src, total_time, delta_t, delta_t_pre, combinatIndex, NoDataValue, mat_efect_vrst, hydrographs):
 
     rrows = G.rr
     rcols = G.rc
@@ -155,13 +150,13 @@ class TimeStep:
     #
     # rainfall during time step
     #
-    rainfall, tz = rain_f.timestepRainfall(itera,total_time,delta_t_pre,tz,sr)
-    infilt_capa += rainfall
-    if (infilt_capa < max_infilt_capa) :
-      infilt_time += delta_t_pre
-      NS = 0.0
+    rainfall = rain_src.timestep_rainfall(total_time,delta_t_pre)
+    self.infilt_capa += np.max(rainfall)
+    if (self.infilt_capa < self.max_infilt_capa) :
+      self.infilt_time += delta_t_pre
+      self.NS.fill(0.0)
       rainfall = 0.0
-      return NS, surface, subsurface,  tz, sum_interception, ratio, rainfall, 0.0, 0.0, 0.0
+      return surface, subsurface, rainfall, 0.0, 0.0
 
 
     for iii in combinatIndex:
@@ -169,11 +164,16 @@ class TimeStep:
         k = iii[1]
         s =  iii[2]
         #jj * 100.0 !!! smazat
-        iii[3] = infilt.phlilip(k, s, delta_t_pre, total_time-infilt_time, NoDataValue)
+        iii[3] = infilt.phlilip(k, s, delta_t_pre, total_time-self.infilt_time, NoDataValue)
         #print total_time-infilt_time, iii[3]*1000, k, s
 
     infilt.set_combinatIndex(combinatIndex)
 
+    #
+    # net rainfall of all cells
+    #
+    self.NS = rain_arr.net_rainfall(rainfall)
+    cell_NS = self.NS.tolist()
 
 
     #
@@ -197,8 +197,7 @@ class TimeStep:
         #
         # current cell precipitation
         #
-        #print rain_arr.arr[i][j], rainfall, sum_interception
-        NS, sum_interception, rain_arr.arr[i][j].veg_true = rain_f.current_rain(rain_arr.arr[i][j], rainfall, sum_interception)
+        NS = cell_NS[i][j]
         #
         # Inflows from surroundings cells
         #
@@ -219,6 +218,7 @@ class TimeStep:
         else :
           surBIL, infiltration = infilt.philip_infiltration(surface.arr[i][j].soil_type,surBIL)
           surface.arr[i][j].infiltration = infiltration
+        self.infiltration[i][j] = infiltration
 
         # surface retention
         surBIL = surface.surface_retention(i,j,surBIL)  + subsurface.get_exfiltration(i,j)
@@ -232,56 +232,55 @@ class TimeStep:
         surface.arr[i][j].h_total = h0
         surface_state   = surface.arr[i][j].state
 
-        # subsurface inflow
-        #
-        inflow_sub = subsurface.cell_runoff(i,j,False)
-        subsurface.bilance(i,j,infiltration,inflow_sub/pixel_area,delta_t)
-        subsurface.fill_slope()
-        
-        
-        
-        
-        
-        
-        
         #
-        # Stream cell
+        # Stream cell, the water flows into the reach
         #
         if surface_state >= 1000:
           # toto je pripraveno pro odtok v ryhach
-          q_sheet = 0.0
-          q_rill  = 0.0
-          v_sheet = 0.0
-          rill_courant = 0.0
           surface.arr[i][j].V_runoff = 0.0
           surface.arr[i][j].V_rest   = 0.0
 
-          h_sub = subsurface.runoff_stream_cell(i,j)
 
-          inflowToReach =  h_sub*pixel_area + surface.arr[i][j].h*pixel_area
-          surface.reach_inflows(id_=int(surface_state-1000),inflows=inflowToReach)
+    surface.stream_cells_inflows(pixel_area)
 
-        else:
+    #
+    # states and the sheet and rill water levels of all cells
+    #
+    surface.update_states()
+
+
+    for i in rrows:
+      for j in rcols[i]:
+
+        #
+        # Stream cell
+        #
+        if surface.arr[i][j].state >= 1000:
+          v_sheet = 0.0
+          rill_courant = 0.0
 
-          q_sheet, v_sheet, q_rill, v_rill, ratio, rill_courant = surface.runoff(i,j,delta_t, mat_efect_vrst[i][j], ratio)
-          subsurface.runoff(i,j,delta_t, mat_efect_vrst[i][j])
+        else:
 
-        q_surface = q_sheet+q_rill
+          q_sheet, v_sheet, q_rill, v_rill, rill_courant = surface.runoff(i,j,delta_t, mat_efect_vrst[i][j])
 
         v = v_sheet
         co='sheet'
-        
-        
-        
 
-        #if ratio > ratio_tmpp :
-          ##print '\t, ', ratio_tmpp, ratio #; raw_input()
-          #courant.CFL(i,j,surface.arr[i][j].h,v,delta_t,mat_efect_vrst[i][j],co, rill_courant)
-          #return NS, surface, subsurface,  tz, sum_interception, ratio, rainfall, v_sheet, v_rill
-       
         courant.CFL(i,j,surface.arr[i][j].h,v,delta_t,mat_efect_vrst[i][j],co, rill_courant)
-       
 
 
 
-    return NS, surface, subsurface,  tz, sum_interception, ratio, rainfall, v_sheet, v_rill
+    #
+    # subsurface of all cells, the infiltration of the time step
+    # and the outflow of the previous time step are the inflows
+    #
+    subsurface.bilance(self.infiltration,delta_t)
+    subsurface.runoff(delta_t,mat_efect_vrst)
+
+    rows, cols, h_sub = subsurface.runoff_stream_cells()
+    if len(rows) > 0:
+      id_ = np.array([surface.arr[i][j].state for i, j in zip(rows,cols)],int) - 1000
+      surface.reach_inflows(id_=id_,inflows=np.asarray(h_sub)*pixel_area)
+
+
+    return surface, subsurface, rainfall, v_sheet, v_rill
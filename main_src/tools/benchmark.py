@@ -0,0 +1,295 @@
+## @package main_src.tools.benchmark benchmark catchments and the coefficients of main_src.estimate
+#
+#  The benchmark catchments are synthetic prepared data (main_src.config.Config.indata)
+#  of the given numbers of rows (the columns are 2/3 of the rows, 5 m cells):
+#  a valley with the constant slopes drained by D8 directions into its middle column,
+#  the outlet is at the end of the middle column. In the types of computing with the
+#  stream the middle column is the stream of two reaches. The rainfall is 1 mm/min.
+#
+#  Each catchment is computed with each type of computing in a separate process twice,
+#  without any time step (the end time 0) and to the given end time. The time steps are
+#  taken from the progress records of each time step (Config.progress_json), the peak memory
+#  from /proc/<pid>/status (Linux). The coefficients of main_src.estimate are fitted by
+#  the least squares:
+#    - \b cell_init_time  wall time of the computation without any time step per raster cell
+#    - \b cell_step_time  the rest of the wall time per time step and domain cell
+#    - \b base_memory, cell_memory  peak memory on the raster cells
+#
+#  The coefficients of the components are the differences of the types of computing:
+#  rill = shallowandrillsurface - onlyshallowsurface, stream = shallowrillstreamsurface - shallowandrillsurface,
+#  subflow = surfaceandsubsurfaceflow - shallowandrillsurface. The memory per reach is not fitted,
+#  the catchments have two reaches only.
+#
+#  The end time should not be shorter than 5 min to make the time steps outweigh the construction.
+#  The fitted coefficients are printed in the form of main_src.estimate:\n
+#  <em>python -m main_src.tools.benchmark directory [end time [min]] [rows ...]</em>
+#
+
+import os
+import sys
+import json
+import time
+import subprocess
+import numpy as np
+
+import main_src.tools.save_load_data              as sld
+from   main_src.config                        import Config
+from   main_src.tools.resolve_partial_computing import names
+from   main_src.tools.tools                   import comp_type, int_comp_type
+
+
+
+## types of computing of the benchmark
+types = ['onlyshallowsurface', 'shallowandrillsurface', 'shallowrillstreamsurface',
+         'surfaceandsubsurfaceflow']
+
+## numbers of the rows of the benchmark catchments
+default_rows = [40, 120, 240]
+
+## pixel size [m]
+spix = 5.0
+
+NoDataValue = -9999.0
+
+
+
+## Returns the prepared data of the benchmark catchment
+#
+#  @param rows, cols size of the raster
+#  @param type_of_computing see main_src.tools.tools.comp_type
+#  @param sr, itera rainfall records, see main_src.processes.rainfall.load_precipitation
+#  @param output output directory
+def catchment(rows, cols, type_of_computing, sr, itera, output):
+  type_ = [int_comp_type(i) for i in range(6)].index(type_of_computing)
+  stream = comp_type(type_of_computing, 'stream')
+  middle = cols//2
+
+  i, j = np.mgrid[0:rows,0:cols]
+  mat_dmt = 100.0 - i*0.5 - np.abs(j-middle)*0.2
+
+  mat_nan = np.zeros([rows,cols],float)
+  mat_nan[[0,-1],:] = NoDataValue
+  mat_nan[:,[0,-1]] = NoDataValue
+
+  # the cells with NoDataValue in the neighbourhood are the boundary, the others are computed
+  outside = mat_nan == NoDataValue
+  padded = np.pad(outside, 1, 'constant', constant_values=False)
+  near = np.zeros([rows,cols],bool)
+  for a in (0,1,2):
+    for b in (0,1,2):
+      near |= padded[a:a+rows,b:b+cols]
+  mat_boundary = np.where(outside, NoDataValue, np.where(near, -99.0, 0.0))
+
+  rrows = [r for r in range(rows) if (mat_boundary[r] == 0).any()]
+  rcols = [list(np.nonzero(mat_boundary[r] == 0)[0]) for r in range(rows)]
+  boundaryRows = [r for r in range(rows) if (mat_boundary[r] == -99).any()]
+  boundaryCols = [list(np.nonzero(mat_boundary[r] == -99)[0]) for r in range(rows)]
+
+  # east, west and south in the middle column
+  mat_fd = np.where(j < middle, 1.0, np.where(j > middle, 16.0, 4.0))
+
+  ones = np.ones([rows,cols],float)
+  data = {'boundaryRows'     : boundaryRows,
+          'boundaryCols'     : boundaryCols,
+          'mat_boundary'     : mat_boundary,
+          'rrows'            : rrows,
+          'rcols'            : rcols,
+          'outletCells'      : [[rows-2,middle]],
+          'x_coordinate'     : 0.0,
+          'y_coordinate'     : 0.0,
+          'NoDataValue'      : NoDataValue,
+          'array_points'     : np.array([[0,rows//2,middle,600.0,700.0]]),
+          'cols'             : cols,
+          'rows'             : rows,
+          'combinatIndex'    : [[0,1e-6,1e-4,0],[1,2e-6,2e-4,0]],
+          'delta_t'          : 30.0,
+          'mat_pi'           : 0.5*ones,
+          'mat_ppl'          : 0.2*ones,
+          'surface_retention': 0.001,
+          'mat_inf_index'    : (j >= middle).astype(int),
+          'mat_hcrit'        : 0.004*ones,
+          'mat_aa'           : 30.0*ones,
+          'mat_b'            : 1.6667*ones,
+          'mat_fd'           : mat_fd,
+          'mat_dmt'          : mat_dmt,
+          'mat_efect_vrst'   : spix*ones,
+          'mat_slope'        : 5.0*ones,
+          'mat_nan'          : mat_nan,
+          'mat_a'            : 0.5*ones,
+          'mat_n'            : 0.1*ones,
+          'output'           : output,
+          'pixel_area'       : spix*spix,
+          'points'           : 'points',
+          'poradi'           : 11,
+          'end_time'         : 1200.0,
+          'spix'             : spix,
+          'state_cell'       : np.zeros([rows,cols],float),
+          'temp'             : output,
+          'type_of_computing': type_,
+          'vpix'             : spix,
+          'mfda'             : False,
+          'sr'               : sr,
+          'itera'            : itera,
+          'toky'             : None,
+          'cell_stream'      : None,
+          'mat_tok_usek'     : None,
+          'STREAM_RATIO'     : None,
+          'tokyLoc'          : None}
+
+  if stream:
+    mat_tok_usek = np.zeros([rows,cols],float)
+    mat_tok_usek[1:rows//2,middle]    = 1000
+    mat_tok_usek[rows//2:rows-1,middle] = 1001
+    data['mat_tok_usek'] = mat_tok_usek
+    data['STREAM_RATIO'] = 1
+    # FID, POINT_X, POINT_Y, POINT_X_1, POINT_Y_1, to_node, length, sklon, smoderp, CISLO, TVAR, B, M, DRSNOST, Q365
+    data['toky'] = [[0,1],[0,0],[0,0],[0,0],[0,0],[1,-9999],[35.0,35.0],[0.02,0.02],[0,0],[1,2],
+                    [1,0],[1.0,1.5],[0.0,1.0],[0.05,0.05],[0.001,0.002]]
+
+  return [data[name_] for name_ in names]
+
+
+
+## Peak memory of the process [kB], None if it is not known
+def peak_memory():
+  status = '/proc/' + str(os.getpid()) + '/status'
+  if not os.path.exists(status):
+    return None
+  with open(status) as f:
+    for line in f:
+      if line.startswith('VmHWM:'):
+        return float(line.split()[1])
+  return None
+
+
+
+## Computes one case, called in the separate process
+#
+#  the result is written into the file result.json in the output directory
+def run_case(indata, type_of_computing, output, end_time, rainfall_file):
+  import main_src.runoff as runoff
+  progress = output + os.sep + 'progress.jsonl'
+  config = Config(indata = indata, output = output, type_of_computing = type_of_computing,
+                  end_time = float(end_time), rainfall_file = rainfall_file, max_delta_t = 30.0,
+                  progress_interval = 0.0, progress_json = progress)
+  start = time.time()
+  runoff.run(config)
+  wall_time = time.time() - start
+
+  with open(progress) as f:
+    records = [json.loads(line) for line in f]
+  result = {'wall_time' : wall_time,
+            'steps'     : [record['steps'] for record in records],
+            'step_wall' : [record['wall_time'] for record in records],
+            'dt'        : [record['dt'] for record in records],
+            'memory'    : peak_memory()}
+  with open(output + os.sep + 'result.json', 'w') as f:
+    json.dump(result, f)
+
+
+
+## Computes one case in the separate process
+#
+#  @return result of run_case
+def compute(indata, type_of_computing, output, end_time, rainfall_file):
+  with open(output + '.log', 'a') as log:
+    subprocess.check_call([sys.executable, '-m', 'main_src.tools.benchmark', '--case', indata,
+                           type_of_computing, output, str(end_time), rainfall_file],
+                          stdout=log, stderr=subprocess.STDOUT)
+  with open(output + os.sep + 'result.json') as f:
+    return json.load(f)
+
+
+
+## Computes all cases
+#
+#  @param directory directory of the catchments and the outputs
+#  @param end_time end time of the computations [min]
+#  @param sizes numbers of the rows of the catchments
+#  @return list of the cases (type of computing, rows, cols, domain cells,
+#          result of run_case without the time steps, result of run_case)
+def benchmark(directory, end_time, sizes):
+  import main_src.processes.rainfall as rainfall
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  rainfall_file = directory + os.sep + 'rainfall.txt'
+  with open(rainfall_file, 'w') as f:
+    f.write('1 1\n1000 1000\n')
+  sr, itera = rainfall.load_precipitation(rainfall_file)
+
+  cases = []
+  for rows in sizes:
+    cols = rows*2//3
+    for type_of_computing in types:
+      output = directory + os.sep + type_of_computing + '_' + str(rows)
+      indata = output + '.save'
+      data = catchment(rows, cols, type_of_computing, sr, itera, output)
+      sld.save_data(data, indata)
+      n_cells = sum([len(data[names.index('rcols')][i]) for i in data[names.index('rrows')]])
+
+      if os.path.exists(output + '.log'):
+        os.remove(output + '.log')
+      init = compute(indata, type_of_computing, output, 0.0, rainfall_file)
+      result = compute(indata, type_of_computing, output, end_time, rainfall_file)
+      print type_of_computing, rows, 'x', cols, 'time steps', result['steps'][-1], \
+            'wall time [s] %.1f (%.1f without the time steps)' % (result['wall_time'], init['wall_time']), \
+            'peak memory [kB]', result['memory']
+      cases.append((type_of_computing, rows, cols, n_cells, init, result))
+  return cases
+
+
+
+## Returns the coefficients of main_src.estimate fitted on the cases
+def fit(cases):
+  init_time = {}
+  step_time = {}
+  memory = {}
+  for type_of_computing in types:
+    own = [case[1:] for case in cases if case[0] == type_of_computing]
+    raster = np.array([rows*cols for rows, cols, n_cells, init, result in own], float)
+    cell_steps = np.array([n_cells*result['steps'][-1] for rows, cols, n_cells, init, result in own], float)
+    init_wall = np.array([init['wall_time'] for rows, cols, n_cells, init, result in own])
+    step_wall = np.array([result['wall_time'] for rows, cols, n_cells, init, result in own]) - init_wall
+
+    init_time[type_of_computing] = np.dot(raster, init_wall)/np.dot(raster, raster)
+    step_time[type_of_computing] = np.dot(cell_steps, step_wall)/np.dot(cell_steps, cell_steps)
+    if None not in [result['memory'] for rows, cols, n_cells, init, result in own]:
+      memory[type_of_computing] = np.polyfit(raster, [result['memory'] for rows, cols, n_cells, init, result in own], 1)
+
+  def components(values):
+    return {'surface' : values['onlyshallowsurface'],
+            'rill'    : max(values['shallowandrillsurface'] - values['onlyshallowsurface'], 0.0),
+            'stream'  : max(values['shallowrillstreamsurface'] - values['shallowandrillsurface'], 0.0),
+            'subflow' : max(values['surfaceandsubsurfaceflow'] - values['shallowandrillsurface'], 0.0)}
+
+  coefficients = {'cell_step_time' : components(step_time),
+                  'cell_init_time' : init_time['onlyshallowsurface']}
+  if len(memory) == len(types):
+    coefficients['base_memory'] = memory['onlyshallowsurface'][1]
+    coefficients['cell_memory'] = components(dict([(name_, m[0]) for name_, m in memory.items()]))
+  return coefficients
+
+
+
+## Prints the coefficients in the form of main_src.estimate
+def report(coefficients):
+  def dict_(values, fmt):
+    return '{' + ', '.join(["'%s' : %s" % (name_, fmt % values[name_])
+                            for name_ in ['surface', 'rill', 'stream', 'subflow'] if name_ in values]) + '}'
+  if 'base_memory' in coefficients:
+    print 'base_memory =', '%.0f' % coefficients['base_memory']
+    print 'cell_memory =', dict_(coefficients['cell_memory'], '%.2f')
+  print 'cell_step_time =', dict_(dict([(name_, value*1e6) for name_, value in coefficients['cell_step_time'].items()]), '%.0fe-6')
+  print 'cell_init_time =', '%.0fe-6' % (coefficients['cell_init_time']*1e6)
+
+
+
+if __name__ == "__main__":
+  if len(sys.argv) > 1 and sys.argv[1] == '--case':
+    run_case(*sys.argv[2:])
+  else:
+    if len(sys.argv) < 2:
+      sys.exit('usage: python -m main_src.tools.benchmark directory [end time [min]] [rows ...]')
+    end_time = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    sizes = [int(rows) for rows in sys.argv[3:]] or default_rows
+    report(fit(benchmark(os.path.abspath(sys.argv[1]), end_time, sizes)))
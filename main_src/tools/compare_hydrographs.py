@@ -0,0 +1,96 @@
+#!/usr/bin/python
+
+## @package main_src.tools.compare_hydrographs quantifies the differences of hydrographs of two runs
+#
+#  Typically used to compare a run in the float32 precision (see main_src.tools.precision)
+#  with the reference float64 run of the same data.
+#
+#  usage:\n
+#  <em>python -m main_src.tools.compare_hydrographs reference_output_dir tested_output_dir [report_file]</em>
+#
+#  The time steps of the runs may differ, the tested hydrograph is therefore interpolated
+#  to the times of the reference hydrograph. For each point and each column the report contains
+#  the maximum absolute difference, the maximum difference relative to the maximum of the
+#  reference column and the difference of the column maxima (peaks).
+
+import os
+import sys
+import numpy as np
+
+
+
+## Loads the hydrograph file point*.dat
+#
+#  @return names column names from the header
+#  @return vals  numpy array [time steps, columns]
+def load_hydrograph(file_):
+  names = []
+  rows = []
+  with open(file_,'r') as f:
+    for line in f:
+      if line.startswith('#'):
+        if ';' in line:
+          names = line[1:].strip().split(';')
+        continue
+      z = line.strip().rstrip(';').split(';')
+      if len(z) == 0 or z[0] == '':
+        continue
+      rows.append([float(item) for item in z])
+  n = min([len(row) for row in rows]) if len(rows) > 0 else 0
+  vals = np.array([row[:n] for row in rows],float)
+  return names[:n], vals
+
+
+
+## Compares two hydrographs
+#
+#  @return list of [name, max abs diff, max rel diff, peak ref, peak tested] for each column
+def compare(ref,tst):
+  names, vref = ref
+  names_tst, vtst = tst
+  report = []
+  if vref.shape[0] == 0 or vtst.shape[0] == 0:
+    return report
+  tref = vref[:,0]
+  ttst = vtst[:,0]
+  for k in range(1,min(vref.shape[1],vtst.shape[1])):
+    a = vref[:,k]
+    b = np.interp(tref,ttst,vtst[:,k])
+    diff = np.abs(a-b)
+    scale = np.abs(a).max()
+    if scale > 0.0:
+      rel = diff.max()/scale
+    else:
+      rel = 0.0
+    name = names[k] if k < len(names) else str(k)
+    report.append([name, diff.max(), rel, a.max(), vtst[:,k].max()])
+  return report
+
+
+
+def compare_dirs(ref_dir,tst_dir,out=sys.stdout):
+  files = sorted([f for f in os.listdir(ref_dir) if f.startswith('point') and f.endswith('.dat')])
+  worst = 0.0
+  for f in files:
+    if not os.path.exists(tst_dir+os.sep+f):
+      out.write('# ' + f + ' is missing in ' + tst_dir + '\n')
+      continue
+    report = compare(load_hydrograph(ref_dir+os.sep+f),load_hydrograph(tst_dir+os.sep+f))
+    out.write('# ' + f + '\n')
+    out.write('column;max_abs_diff;max_rel_diff;peak_reference;peak_tested\n')
+    for line in report:
+      worst = max(worst,line[2])
+      out.write(line[0] + ';' + ';'.join([str(item) for item in line[1:]]) + '\n')
+  out.write('# worst relative difference: ' + str(worst) + '\n')
+  return worst
+
+
+
+if __name__ == "__main__":
+  if len(sys.argv) < 3:
+    sys.exit('usage: python -m main_src.tools.compare_hydrographs reference_output_dir tested_output_dir [report_file]')
+  if len(sys.argv) > 3:
+    with open(sys.argv[3],'w') as f:
+      compare_dirs(sys.argv[1],sys.argv[2],f)
+  else:
+    compare_dirs(sys.argv[1],sys.argv[2])
@@ -0,0 +1,134 @@
+## @package main_src.tools.domain boundary and outlet cells of the computational domain
+#
+#  The domain is given by the mask mat_nan (0 in the domain, NoDataValue outside),
+#  the cells are classified on the arrays padded by one cell of NoDataValue,
+#  the neighbours are the eight shifted views of the padded array.
+#  The module does not need arcpy, it is used by main_src.data_preparation
+#  and can be called again whenever the domain mask changes.
+#
+
+import numpy as np
+
+
+
+## shifts of the eight neighbours [row, col]
+neighbours = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+
+
+
+## Returns the view of the padded array shifted to the neighbour di, dj
+#
+#  @param padded array padded by one cell
+#  @param di, dj shift of the neighbour
+def shifted(padded, di, dj):
+  r = padded.shape[0] - 2
+  c = padded.shape[1] - 2
+  return padded[1+di:1+di+r, 1+dj:1+dj+c]
+
+
+
+## Returns the array padded by one cell of the value
+def pad(arr, value):
+  return np.pad(arr, 1, 'constant', constant_values=value)
+
+
+
+## Minimum of the eight neighbours of each cell
+#
+#  @param arr array [rows, cols]
+#  @param fill value outside the array
+def neighbourhood_min(arr, fill=np.inf):
+  padded = pad(arr, fill)
+  nb = shifted(padded, *neighbours[0]).copy()
+  for di, dj in neighbours[1:]:
+    np.minimum(nb, shifted(padded, di, dj), nb)
+  return nb
+
+
+
+## Mask of the boundary cells
+#
+#  The boundary cells are the domain cells at the edge of the raster or next to a cell outside the domain.
+#  The right neighbour (0,1) is not considered, the domain is thus the same as the one of the
+#  previous preparations.
+#
+#  @param mat_nan domain mask
+#  @param noData value outside the domain
+#  @return mask of the domain cells, mask of the boundary cells
+def boundary_mask(mat_nan, noData):
+  r, c = mat_nan.shape
+  domain = mat_nan != noData
+
+  edge = np.zeros([r,c],bool)
+  edge[0,:]  = True
+  edge[-1,:] = True
+  edge[:,0]  = True
+  edge[:,-1] = True
+
+  outside = pad(~domain, False)
+  touch = np.zeros([r,c],bool)
+  for di, dj in neighbours:
+    if (di, dj) != (0,1):
+      touch |= shifted(outside, di, dj)
+
+  return domain, domain & (edge | touch)
+
+
+
+## Identification of cells at the domain boundary
+#
+#  @param r rows
+#  @param c cols
+#  @param mat_nan domain mask
+#  @param noData value outside the domain
+#  @return boundaryRows rows containing a boundary cell
+#  @return boundaryCols columns of the boundary cells in each row
+#  @return rows rows containing a cell of the inner domain
+#  @return cols columns of the inner domain cells in each row
+#  @return mat_boundary -99 in the boundary cells, the mat_nan value elsewhere
+def find_boundary_cells(r, c, mat_nan, noData):
+  mat_nan = np.asarray(mat_nan, float)
+  domain, boundary = boundary_mask(mat_nan, noData)
+
+  mat_boundary = mat_nan.copy()
+  mat_boundary[boundary] = -99
+
+  boundaryRows, boundaryCols = ragged(boundary)
+  rows, cols = ragged(mat_boundary == 0.0)
+
+  return boundaryRows, boundaryCols, rows, cols, mat_boundary
+
+
+
+## Converts the mask to the rows containing a cell of the mask and the columns of each row
+#
+#  @return rows [i, ...], cols [[j, ...] for each row of the raster]
+def ragged(mask):
+  ii, jj = np.nonzero(mask)
+  counts = np.bincount(ii, minlength=mask.shape[0])
+  ends = np.cumsum(counts).tolist()
+  jj = jj.tolist()
+  cols = [jj[end-n:end] for n, end in zip(counts.tolist(), ends)]
+  rows = np.nonzero(counts)[0].tolist()
+  return rows, cols
+
+
+
+## Returns the outlets of the domain
+#
+#  The outlet is the boundary cell which is not higher than any of its neighbours
+#  in the domain, the neighbourhood minimum is evaluated only in the boundary cells.
+#
+#  @param mat_boundary boundary cells (-99), see find_boundary_cells
+#  @param mat_nan domain mask, the neighbours with mat_nan > -1 are in the domain
+#  @param dem digital elevation model
+#  @return outlet cells [[i, j], ...]
+def find_outlets(mat_boundary, mat_nan, dem):
+  dem = np.asarray(dem, float)
+  ii, jj = np.nonzero(np.asarray(mat_boundary) == -99)
+  padded = pad(np.where(np.asarray(mat_nan) > -1, dem, np.inf), np.inf)
+  nb = np.full(len(ii), np.inf)
+  for di, dj in neighbours:
+    np.minimum(nb, padded[ii+1+di, jj+1+dj], nb)
+  lowest = dem[ii, jj] <= nb
+  return np.column_stack([ii[lowest], jj[lowest]]).tolist()
@@ -0,0 +1,51 @@
+## @package main_src.tools.precision floating point precision of the computation
+#
+#  The precision is given by main_src.config.Config.precision (optional parameter constants.PARAMETER_PRECISION)
+#    - \b float64 (default) all arrays are stored in double precision
+#    - \b float32 the parameters and the state arrays are stored in single precision,
+#      the cumulative volumes of the mass balance are accumulated in double precision
+#
+#  Single precision halves the memory of the parameter arrays and of the state arrays
+#  (subsurface, cumulative, time step arrays). The state of the surface cells is held
+#  in the attributes of main_src.main_classes.Surface.SurArrs, which stay Python floats,
+#  its memory is not changed. The peak memory is therefore reduced only by about 2 %
+#  (240x160 catchment of main_src.tools.benchmark).
+
+import sys
+import numpy as np
+
+
+## name of the precision
+precision = 'float64'
+## type of the parameter and the state arrays
+float_ = np.float64
+## type of the cumulative volumes
+float_cum = np.float64
+
+
+
+## Sets the precision of the computation
+#
+#  the arrays take the type at the time they are created, the modules
+#  therefore use precision.float_ and not a copy imported before the setup
+#
+#  @param name float32 | float64
+def setup(name='float64'):
+  global precision, float_
+  precision = str(name).lower().strip()
+  if precision == 'float32':
+    float_ = np.float32
+  elif precision == 'float64':
+    float_ = np.float64
+  else:
+    sys.exit('Precision parameter has to be float32 or float64...')
+
+
+
+## Returns the array in the precision of the computation
+#
+#  None (e.g. missing stream data) is returned as it is
+def cast(arr):
+  if arr is None:
+    return None
+  return np.asarray(arr).astype(float_,copy=False)
@@ -0,0 +1,172 @@
+## @package main_src.tools.prep_cache content addressed cache of the preparation products
+#
+#  The products of the preparation (the conditioned DEM, the flow directions,
+#  the parameters of the runoff, the multiple flow directions, the routing
+#  operators) are stored in the cache directory (main_src.config.Config.prep_cache,
+#  optional parameter constants.PARAMETER_PREP_CACHE) under the digest of
+#  everything they are computed from:
+#    - \b arrays  dtype, shape and the content (the input rasters are read as arrays)
+#    - \b lists   the items
+#    - \b other   the value
+#
+#  A product is reused if its inputs are the same, the key of a product computed
+#  from another product contains the content of the other product, so if one input
+#  is changed only the products depending on it are computed again. The products
+#  given by large python lists (the flow directions, the routing operators) are keyed
+#  by the arrays they are computed from, see PrepCache.cached_key.
+#
+#  The key contains the version of the product (versions), the version has to be
+#  increased whenever the computation of the product is changed, the products of the
+#  former code are then not used.
+#
+#  The cache directory can be shared by several preparations and computations,
+#  the old products are not deleted.
+#
+
+import os
+import hashlib
+import cPickle as pickle
+import numpy as np
+
+import main_src.io_functions.prt as prt
+
+
+
+## versions of the products
+versions = {'dmtfce'        : 1,
+            'parameter_a'   : 2,
+            'critical_level': 2,
+            'D8'            : 1,
+            'Mfda'          : 1,
+            'D8 operator'   : 1,
+            'Mfda operator' : 1}
+
+
+
+## Adds the item to the digest h
+def update_digest(h, item):
+  if isinstance(item, np.ndarray):
+    h.update('array' + item.dtype.str + str(item.shape))
+    h.update(np.ascontiguousarray(item).tostring())
+  elif isinstance(item, (list, tuple)):
+    h.update(type(item).__name__ + str(len(item)))
+    for sub in item:
+      update_digest(h, sub)
+  else:
+    h.update(type(item).__name__ + repr(item))
+
+
+## Returns the digest of the items
+def digest(*items):
+  h = hashlib.sha1()
+  for item in items:
+    update_digest(h, item)
+  return h.hexdigest()
+
+
+
+## Stores the products in the cache directory
+#
+class PrepCache():
+
+  ## the constructor
+  #
+  #  @param dir_ cache directory
+  def __init__(self, dir_):
+    self.dir_ = dir_
+    if not os.path.exists(dir_):
+      os.makedirs(dir_)
+    self.hits = 0
+    self.misses = 0
+
+
+  ## Returns the path of the product
+  def path(self, name_, key):
+    return self.dir_ + os.sep + name_.replace(' ', '_') + '_' + key
+
+
+  ## Returns fce(*args), the result is loaded from the cache if the args are the same
+  #
+  #  @param name_ name of the product
+  #  @param fce function computing the product, the result has to be picklable
+  def cached(self, name_, fce, *args):
+    return self.cached_key(name_, args, fce, *args)
+
+
+  ## Returns fce(*args), the result is loaded from the cache if the key is the same
+  #
+  #  @param name_ name of the product
+  #  @param key items the args are given by (e.g. the arrays instead of the lists computed from them)
+  #  @param fce function computing the product, the result has to be picklable
+  def cached_key(self, name_, key, fce, *args):
+    file_ = self.path(name_, digest(name_, versions[name_], *key)) + '.pkl'
+    if os.path.exists(file_):
+      with open(file_, 'rb') as f:
+        result = pickle.load(f)
+      self.hits += 1
+      prt.message('Preparation cache:', name_, 'loaded from', file_)
+      return result
+
+    result = fce(*args)
+    # the product is written under the temporary name, the cache is never left with a part of the file
+    with open(file_ + '.tmp', 'wb') as f:
+      pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(file_ + '.tmp', file_)
+    self.misses += 1
+    prt.debug('Preparation cache:', name_, 'saved into', file_)
+    return result
+
+
+  ## Returns the directory of the product made of files (rasters)
+  #
+  #  @param name_ name of the product
+  #  @param key digest of the inputs of the product
+  #  @return directory, True if the product is complete in the directory
+  def directory(self, name_, key):
+    dir_ = self.path(name_, digest(versions[name_], key))
+    if not os.path.exists(dir_):
+      os.makedirs(dir_)
+    done = os.path.exists(dir_ + os.sep + 'done')
+    if done:
+      self.hits += 1
+      prt.message('Preparation cache:', name_, 'loaded from', dir_)
+    else:
+      self.misses += 1
+    return dir_, done
+
+
+  ## Marks the product in the directory as complete
+  def done(self, dir_):
+    open(dir_ + os.sep + 'done', 'w').close()
+
+
+
+## Empty class if the products are not cached
+class PrepCachePass():
+  hits = 0
+  misses = 0
+  def cached(self, name_, fce, *args):
+    return fce(*args)
+  def cached_key(self, name_, key, fce, *args):
+    return fce(*args)
+  def directory(self, name_, key):
+    return None, False
+  def done(self, dir_):
+    pass
+
+
+
+## cache of the current computation
+cache = PrepCachePass()
+
+
+
+## Sets the cache of the computation
+#
+#  @param dir_ cache directory, None if the products are not cached
+def setup(dir_=None):
+  global cache
+  if dir_ is None or dir_ == '' or dir_ == '#':
+    cache = PrepCachePass()
+  elif not isinstance(cache, PrepCache) or cache.dir_ != dir_:
+    cache = PrepCache(dir_)
@@ -1,11 +1,19 @@
-import os 
+## @package main_src.tools.resolve_partial_computing prepares the data of the computation
+#
+#  according to main_src.config.Config.partial_computing
+#    - \b full the data are prepared by main_src.data_preparation
+#    - \b dpre the data are prepared by main_src.data_preparation and saved into Config.indata
+#    - \b roff the data are loaded from Config.indata
+#
+#  main_src.data_preparation requires arcpy, it is therefore imported
+#  only if the data are prepared
 
+import os
+import copy
 
-import main_src.constants                         as constants
-from   main_src.tools.tools                   import get_argv
-from   main_src.tools.tools                   import set_argv
-from   main_src.tools.tools                   import prt_sys_argv
-from   main_src.tools.tools                   import int_comp_type
+
+import main_src.io_functions.prt                  as prt
+import main_src.tools.precision                   as precision
 from   main_src.tools.tools                   import int_comp_type
 
 
@@ -14,122 +22,150 @@ from   main_src.tools.tools                   import int_comp_type
 #frameinfo = getframeinfo(currentframe())
 # # # # # # # # # # # # # # # # # # # # # # #
 
-partial_comp = get_argv(constants.PARAMETER_PARTIAL_COMPUTING)
-
-
-if partial_comp == 'full':
-  from main_src.data_preparation import *
-
-elif partial_comp == 'dpre':
-  
-  from    main_src.data_preparation    import *
-  import  main_src.tools.save_load_data    as sld
-  #import  main_src.tools.save_load_data_nopickle    as sld   # preparate
-  
-  dataList = [boundaryRows, boundaryCols, mat_boundary, rrows, rcols, outletCells, x_coordinate, y_coordinate,\
-    NoDataValue, array_points, \
-    cols, rows, combinatIndex, delta_t,  \
-    mat_pi, mat_ppl, \
-    surface_retention, mat_inf_index, mat_hcrit, mat_aa, mat_b,\
-    mat_fd, mat_dmt, mat_efect_vrst, mat_slope, mat_nan, \
-    mat_a,   \
-    mat_n,   \
-    output, pixel_area, points, poradi,  end_time, spix, state_cell, \
-    temp, type_of_computing, vpix, mfda, sr, itera, \
-    toky, cell_stream, mat_tok_usek, STREAM_RATIO, tokyLoc]
-  
-  
-  sld.save_data(dataList,get_argv(constants.PARAMETER_INDATA))
-  #sld.save(dataList,get_argv(constants.PARAMETER_INDATA))    #   preparated
-  
-  
-  sys.exit('data prepared...')
-  
-
-elif partial_comp == 'roff':
-  import  main_src.tools.save_load_data as sld
-  import main_src.processes.rainfall    as rainfall
-  #import  main_src.tools.save_load_data_nopickle    as sld   # preparated
-  
-  
-  indata = get_argv(constants.PARAMETER_INDATA)
-
-  boundaryRows, boundaryCols, \
-  mat_boundary, rrows, rcols, outletCells, \
-  x_coordinate, y_coordinate,\
-  NoDataValue, array_points, \
-  cols, rows, combinatIndex, delta_t,  \
-  mat_pi, mat_ppl, \
-  surface_retention, mat_inf_index, mat_hcrit, mat_aa, mat_b,\
-  mat_fd, mat_dmt, mat_efect_vrst, mat_slope, mat_nan, \
-  mat_a,   \
-  mat_n,   \
-  output, pixel_area, points, poradi,  end_time, spix, state_cell, \
-  temp, type_of_computing, vpix, mfda, sr, itera, \
-  toky, cell_stream, mat_tok_usek, STREAM_RATIO, tokyLoc = sld.load_data(indata)
-
-
-  """
-  boundaryRows, boundaryCols, \
-  mat_boundary, rrows, rcols, outletCells, \
-  x_coordinate, y_coordinate,\
-  NoDataValue, array_points, \
-  cols, rows, combinatIndex, delta_t,  \
-  mat_pi, mat_ppl, \
-  surface_retention, mat_inf_index, mat_hcrit, mat_aa, mat_b,\
-  mat_fd, mat_dmt, mat_efect_vrst, mat_slope, mat_nan, \
-  mat_a,   \
-  mat_n,   \
-  output, pixel_area, points, poradi,  end_time, spix, state_cell, \
-  temp, type_of_computing, vpix, mfda, sr, itera, \
-  toky, cell_stream, mat_tok_usek, STREAM_RATIO, tokyLoc = sld.load(indata)   #preparated
-  """
-
-
-  if get_argv(constants.PARAMETER_PATH_TO_OUTPUT_DIRECTORY) == '-':
-    set_argv(constants.PARAMETER_PATH_TO_OUTPUT_DIRECTORY, output)
-    
-  if get_argv(constants.PARAMETER_END_TIME) == '-':
-    set_argv(constants.PARAMETER_END_TIME, end_time)  
-  
-  if get_argv(constants.PARAMETER_MFDA) == '-':
-    set_argv(constants.PARAMETER_MFDA,mfda)
-    
-  if get_argv(constants.PARAMETER_SURFACE_RETENTION) == '-':
-    set_argv(constants.PARAMETER_SURFACE_RETENTION,surface_retention)
-  
-  if get_argv(constants.PARAMETER_TYPE_COMPUTING) == '-':
-    set_argv(constants.PARAMETER_TYPE_COMPUTING,int_comp_type(type_of_computing))
-  
-  
-  #jj end time se musi takto delta vzdy, neni v save
-  output = get_argv(constants.PARAMETER_PATH_TO_OUTPUT_DIRECTORY)
-  end_time = float(get_argv(constants.PARAMETER_END_TIME))*60.0
-  mfda                    = get_argv(constants.PARAMETER_MFDA)
-  surface_retention       = float(get_argv(constants.PARAMETER_SURFACE_RETENTION))/1000 #prevod z [mm] na [m]
-  
-  
-  
-  arcgis                  = get_argv(constants.PARAMETER_ARCGIS)
-  
-  
-  # ponechani deste z save
-  rainfall_file_path      = get_argv(constants.PARAMETER_PATH_TO_RAINFALL_FILE)
-  if rainfall_file_path == '-' :
-    pass
-  # zmena deste posave, pokud se pocita jen roff
+
+## names of the prepared variables in the order of the saved data list
+names = ['boundaryRows', 'boundaryCols', 'mat_boundary', 'rrows', 'rcols', 'outletCells', 'x_coordinate', 'y_coordinate',
+         'NoDataValue', 'array_points',
+         'cols', 'rows', 'combinatIndex', 'delta_t',
+         'mat_pi', 'mat_ppl',
+         'surface_retention', 'mat_inf_index', 'mat_hcrit', 'mat_aa', 'mat_b',
+         'mat_fd', 'mat_dmt', 'mat_efect_vrst', 'mat_slope', 'mat_nan',
+         'mat_a',
+         'mat_n',
+         'output', 'pixel_area', 'points', 'poradi', 'end_time', 'spix', 'state_cell',
+         'temp', 'type_of_computing', 'vpix', 'mfda', 'sr', 'itera',
+         'toky', 'cell_stream', 'mat_tok_usek', 'STREAM_RATIO', 'tokyLoc']
+
+
+
+## Prepared data of the computation
+#
+#  each variable of the data list is stored in the attribute of the same name
+class PreparedData(object):
+
+  def __init__(self,dataList):
+    for name_, value in zip(names,dataList):
+      setattr(self,name_,value)
+
+  def data_list(self):
+    return [getattr(self,name_) for name_ in names]
+
+
+
+## Returns the data of the computation
+#
+#  in case of the roff computation the parameters given in the config
+#  replace the saved ones, the parameters not given are taken
+#  from the saved data and written into the config
+#
+#  @param config main_src.config.Config
+#  @param saved data list loaded from Config.indata, in the roff computation
+#         the data are not loaded again (e.g. the members of main_src.ensemble)
+#  @return PreparedData or None if the data are only prepared
+def resolve(config,saved=None):
+
+  partial_comp = config.partial_computing
+
+
+  if partial_comp == 'full':
+    import main_src.data_preparation as data_preparation
+    data = PreparedData(data_preparation.prepare_data(config.to_argv()))
+
+  elif partial_comp == 'dpre':
+
+    import  main_src.data_preparation  as data_preparation
+    import  main_src.tools.save_load_data    as sld
+    #import  main_src.tools.save_load_data_nopickle    as sld   # preparate
+
+    data = PreparedData(data_preparation.prepare_data(config.to_argv()))
+
+    sld.save_data(data.data_list(),config.indata)
+    #sld.save(dataList,config.indata)    #   preparated
+
+    prt.message('data prepared...')
+    return None
+
+
+  elif partial_comp == 'roff':
+    import  main_src.tools.save_load_data as sld
+    import main_src.processes.rainfall    as rainfall
+    #import  main_src.tools.save_load_data_nopickle    as sld   # preparated
+
+    if saved is None:
+      saved = sld.load_data(config.indata)
+      #saved = sld.load(config.indata)   #preparated
+    data = PreparedData(saved)
+
+    # the infiltration of the combinations is written into combinatIndex during the computation
+    data.combinatIndex = copy.deepcopy(data.combinatIndex)
+
+
+    if config.output is None:
+      config.output = data.output
+
+    if config.end_time is None:
+      config.end_time = data.end_time/60.0
+
+    if config.mfda is None:
+      config.mfda = data.mfda
+
+    if config.surface_retention is None:
+      config.surface_retention = data.surface_retention*1000
+
+    if config.type_of_computing is None:
+      config.type_of_computing = int_comp_type(data.type_of_computing)
+
+
+    #jj end time se musi takto delta vzdy, neni v save
+    data.output            = config.output
+    data.end_time          = float(config.end_time)*60.0
+    data.mfda              = config.mfda
+    data.surface_retention = float(config.surface_retention)/1000 #prevod z [mm] na [m]
+
+
+    # ponechani deste z save
+    if config.rainfall_file is None :
+      pass
+    # zmena deste posave, pokud se pocita jen roff
+    else:
+      data.sr, data.itera  = rainfall.load_precipitation(config.rainfall_file)
+
+
+
+    if os.path.exists(data.output):
+      import shutil
+      shutil.rmtree(data.output)
+    if not os.path.exists(data.output):
+      os.makedirs(data.output)
+      #os.makedirs(output+os.sep+'prubeh')
+
+    prt.message('--------- po nacteni z save ---------')
+    prt.message(config)
+    prt.message('--------- ---------- - ---- ---------')
+
   else:
-    sr,itera  = rainfall.load_precipitation(rainfall_file_path)
-  
-  
-
-  if os.path.exists(output):
-    import shutil
-    shutil.rmtree(output)
-  if not os.path.exists(output):
-    os.makedirs(output)
-    #os.makedirs(output+os.sep+'prubeh')
-    
-  print '--------- po nacteni z save ---------'    
-  prt_sys_argv()
-  print '--------- ---------- - ---- ---------'    
\ No newline at end of file
+    prt.error('Partial computing has to be full, dpre or roff...')
+
+
+  if config.output is None:
+    config.output = data.output
+  if config.type_of_computing is None:
+    config.type_of_computing = int_comp_type(data.type_of_computing)
+  if config.mfda is None:
+    config.mfda = data.mfda
+  if config.max_delta_t is None:
+    config.max_delta_t = data.delta_t
+
+
+  # parameters of the computation are held in the selected precision
+  data.mat_aa         = precision.cast(data.mat_aa)
+  data.mat_a          = precision.cast(data.mat_a)
+  data.mat_b          = precision.cast(data.mat_b)
+  data.mat_hcrit      = precision.cast(data.mat_hcrit)
+  data.mat_slope      = precision.cast(data.mat_slope)
+  data.mat_n          = precision.cast(data.mat_n)
+  data.mat_efect_vrst = precision.cast(data.mat_efect_vrst)
+  data.mat_pi         = precision.cast(data.mat_pi)
+  data.mat_ppl        = precision.cast(data.mat_ppl)
+
+  return data
@@ -0,0 +1,100 @@
+## @package main_src.tools.runoff_parameters parameters of the surface runoff derived from the slope
+#
+#  The fields are computed from the arrays of main_src.data_preparation,
+#  the cells with NoDataValue in any of the inputs get NoDataValue.
+#  The module does not need arcpy, the fields can be derived again with
+#  the changed parameters of the soil and vegetation table.
+#
+#  The values are the same as the ones of the former cell by cell computation
+#  of main_src.data_preparation.prepare_data, including the cases of the zero slope.
+#
+
+import numpy as np
+
+
+
+## Parameters a and aa of the sheet flow
+#
+#  a = x*slope^y, aa = a/100/n, in the cells with zero slope a = 0.0001
+#
+#  @param mat_slope slope
+#  @param mat_x, mat_y parameters of the soil and vegetation table
+#  @param mat_n Manning n
+#  @param NoDataValue value outside the domain
+#  @return mat_a, mat_aa
+def parameter_a(mat_slope, mat_x, mat_y, mat_n, NoDataValue):
+  mat_slope = np.asarray(mat_slope, float)
+  mat_x     = np.asarray(mat_x, float)
+  mat_y     = np.asarray(mat_y, float)
+  mat_n     = np.asarray(mat_n, float)
+
+  nodata = (mat_x == NoDataValue) | (mat_y == NoDataValue) | (mat_slope == NoDataValue)
+  flat   = ~nodata & (mat_slope == 0.0)
+  slope  = ~nodata & ~flat
+
+  mat_a = np.empty(mat_slope.shape, float)
+  mat_a[nodata] = NoDataValue
+  mat_a[flat]   = 0.0001
+  with np.errstate(all='ignore'):
+    mat_a[slope] = mat_x[slope]*np.power(mat_slope[slope], mat_y[slope])
+
+  mat_aa = np.empty(mat_slope.shape, float)
+  mat_aa[nodata] = NoDataValue
+  with np.errstate(all='ignore'):
+    mat_aa[~nodata] = mat_a[~nodata]/100/mat_n[~nodata]
+
+  return mat_a, mat_aa
+
+
+
+## Critical water level of the rill formation
+#
+#  the minimum of the levels given by the critical velocity (hcrit_v), the critical
+#  shear stress (hcrit_tau) and the critical stream power (hcrit_flux),
+#  in the cells with zero slope the levels are 1000
+#
+#  @param mat_slope slope
+#  @param mat_tau critical shear stress
+#  @param mat_v critical velocity
+#  @param mat_b exponent of the sheet flow
+#  @param mat_aa parameter aa of the sheet flow, see parameter_a
+#  @param NoDataValue value outside the domain
+#  @return mat_hcrit_tau, mat_hcrit_v, mat_hcrit_flux, mat_hcrit
+def critical_level(mat_slope, mat_tau, mat_v, mat_b, mat_aa, NoDataValue):
+  mat_slope = np.asarray(mat_slope, float)
+  mat_tau   = np.asarray(mat_tau, float)
+  mat_v     = np.asarray(mat_v, float)
+  mat_b     = np.asarray(mat_b, float)
+  mat_aa    = np.asarray(mat_aa, float)
+
+  nodata = (mat_slope == NoDataValue) | (mat_tau == NoDataValue)
+  flat   = ~nodata & (mat_slope == 0.0)
+  slope  = ~nodata & ~flat
+
+  mat_hcrit_tau  = np.empty(mat_slope.shape, float)
+  mat_hcrit_v    = np.empty(mat_slope.shape, float)
+  mat_hcrit_flux = np.empty(mat_slope.shape, float)
+  for mat in [mat_hcrit_tau, mat_hcrit_v, mat_hcrit_flux]:
+    mat[nodata] = NoDataValue
+    mat[flat]   = 1000.0
+
+  s   = mat_slope[slope]
+  tau = mat_tau[slope]
+  v   = mat_v[slope]
+  b   = mat_b[slope]
+  aa  = mat_aa[slope]
+  with np.errstate(all='ignore'):
+    mat_hcrit_v[slope]    = np.power(v/aa, 1/(b - 1))
+    mat_hcrit_tau[slope]  = tau / 98.07 / s
+    mat_hcrit_flux[slope] = np.power(tau*v/s/98.07/aa, 1/b)
+
+  # min(hcrit_tau, hcrit_v, hcrit_flux) of python, the later value is taken only if it is lower
+  mat_hcrit = mat_hcrit_tau.copy()
+  with np.errstate(invalid='ignore'):
+    lower = mat_hcrit_v < mat_hcrit
+    mat_hcrit[lower] = mat_hcrit_v[lower]
+    lower = mat_hcrit_flux < mat_hcrit
+    mat_hcrit[lower] = mat_hcrit_flux[lower]
+  mat_hcrit[nodata] = NoDataValue
+
+  return mat_hcrit_tau, mat_hcrit_v, mat_hcrit_flux, mat_hcrit
@@ -52,13 +52,13 @@ def make_sur_raster(surArr,G,t,output):
   make_ASC_raster(outName,arrrill,G)
 
 
-def make_sub_raster(subArr,G,t,output):
+def make_sub_raster(sub,G,t,output):
   rrows = G.rr
   rcols = G.rc
-  arr = np.zeros(np.shape(subArr),float)
+  arr = np.zeros(np.shape(sub.h),float)
   for i in rrows:
     for j in rcols[i]:
-      arr[i][j] =  subArr[i][j].h
+      arr[i][j] =  sub.h[i][j]
 
   outName = output+os.sep+'prubeh'+os.sep+str(int(t)).zfill(10)+'hsub'+".asc"
   make_ASC_raster(outName,arr,G)
@@ -108,14 +108,38 @@ def make_ASC_raster(name_,numpy_arr,G):
 
 
 
+## Reads an ascii raster into the numpy array
+#
+#  the raster must have the same number of rows and columns
+#  as the computational domain
+#
+def read_ASC_raster(name_,G,dtype=float):
+  header = {}
+  with open(name_,'r') as f:
+    for line in f:
+      z = line.split()
+      if len(z) == 2 and z[0][0].isalpha():
+        header[z[0].lower()] = z[1]
+      else:
+        break
+  arr = np.loadtxt(name_,skiprows=len(header),ndmin=2)
+  if arr.shape != (G.r,G.c):
+    sys.exit('Raster ' + name_ + ' has ' + str(arr.shape) + ' rows and columns, ' + str((G.r,G.c)) + ' are expected')
+  return arr.astype(dtype)
+
+
+
+
 ## Returns boolean information about the components of the computation
 #
 #  Return 4 true/values for rill, subflow, stream, diffuse presence/non-presence.\n
 #  Optionally string parameter co_ specify the process user ask for rill | subflow | stream | diffuse
 #
-def comp_type(co_=""):
+#  @param type_of_computing type of computing string, see main_src.config.Config
+#
+def comp_type(type_of_computing,co_=""):
 
-  string_type_of_coputing = get_argv(constants.PARAMETER_TYPE_COMPUTING)
+  string_type_of_coputing = type_of_computing
   string_type_of_coputing = string_type_of_coputing.lower().replace(' ','').replace(',','')  #jj .lower().replace(' ','').replace(',','') udela ze vsecho v tom stringu maly pismena, replace vyhodi mezery a carky
 
   if string_type_of_coputing == "onlyshallowsurface":
@@ -183,45 +207,3 @@ def int_comp_type(intco_):
     return 'surfaceandsubsurfacestreamflow'
   else:
     print 'error in data_preparation, PARAMETER_TYPE_COMPUTING error'
-
-## Returns input parameter from the sys.argv
-#
-def get_argv(id_):
-  iid_ = id_
-  #print '!!!Bacha tools.get_argv jsou plus 1!!!';
-  iid_ += 1
-  return sys.argv[iid_]
-
-def set_argv(id_,value):
-  iid_ = id_
-  #print '!!!Bacha tools.get_argv jsou plus 1!!!';
-  iid_ += 1
-  print sys.argv[iid_]
-  sys.argv[iid_] = value
-
-def prt_sys_argv():
-  for item in sys.argv:
-    print item
-
-
-
-## Transfers string 'true'/'false' in sys.argv to a logical True/False
-#
-def logical_argv(id_):
-  iid_ = id_
-  #print '!!!Bacha tools.get_argv jsou plus 1!!!';
-  iid_ += 1
-  if type(sys.argv[iid_]) == str:
-    if sys.argv[iid_].lower().strip() == 'true':
-      sys.argv[iid_] = True
-    elif sys.argv[iid_].lower().strip() == 'false':
-      sys.argv[iid_] = False
-    else:
-      sys.exit('Logical parameter are not assign correctly...')
-  if type(sys.argv[iid_]) == int:
-    sys.exit('Logical parameter are not assign correctly...')
-  if type(sys.argv[iid_]) == float:
-    sys.exit('Logical parameter are not assign correctly...')
-
-
-
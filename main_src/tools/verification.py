@@ -0,0 +1,394 @@
+## @package main_src.tools.verification comparison of the vectorized kernels with the scalar computation
+#
+#  In the first time steps of the computation (main_src.config.Config.verify_steps,
+#  optional parameter constants.PARAMETER_VERIFY_STEPS) the results of the vectorized
+#  kernels are compared with the former cell by cell computation of the same cells:
+#    - \b states         main_src.main_classes.Surface.SurfaceC.update_states (rill computations only),
+#                        the variables state, h, h_rill, h_pre, h_rillPre
+#    - \b inflow         sheet inflow of main_src.main_classes.Flow route compared with cell_runoff
+#    - \b reach_inflow   lateral inflow of the reaches main_src.main_classes.Stream.Stream.stream_cells_inflows
+#    - \b subsurface     main_src.main_classes.Subsurface.SubsurfaceC bilance (percolation,
+#                        sub_h, exfiltration) and runoff (sub_V_runoff, sub_V_rest), the inflows
+#                        of the bilance are routed as in the computation
+#    - \b ratio          rill sub-steps of the cells adjusted in main_src.courant.Courant.courant
+#                        (rill computations only)
+#    - \b rainfall       main_src.processes.rainfall timestep_rainfall compared with the record
+#                        by record integration of the rainfall intensities of the cell
+#
+#  The comparison is made on the sample of the cells of the domain (Config.verify_cells,
+#  0 for all cells), the reach inflows are compared for all stream cells.
+#  The difference is accepted if |fast - scalar| <= atol + rtol*|scalar| (Config.verify_atol,
+#  Config.verify_rtol). The maximum absolute and relative differences of each variable
+#  are written into the file verification.dat in the output directory, the computation
+#  is stopped if any difference is not accepted.
+#
+
+import os
+import numpy as np
+
+import main_src.io_functions.prt as prt
+import main_src.processes.subsurface as darcy
+
+
+
+## Former cell by cell state machine and the partition of the water level
+#
+#  @return state, h, h_rill, h_pre, h_rillPre
+def cell_state(state, ht, ht_1, hcrit, h_rill, h_rillPre, h_pre):
+  if state >= 1000:
+    return state, ht, h_rill, h_pre, h_rillPre
+
+  if ht > hcrit:
+    if state == 0:
+      state = 1
+    elif state == 1 and not(ht >= ht_1):
+      state = 2
+  elif state == 1:
+    state = 2
+
+  h = ht
+  if state == 0:
+    h_rill = 0.0
+    h_pre = ht
+  elif state == 1:
+    h_rill = ht - hcrit
+    h = hcrit
+    h_pre = hcrit
+    h_rillPre = h_rill
+  elif state == 2:
+    h_rill = h_rillPre
+    if h_rill < ht:
+      h = ht - h_rill
+    else:
+      h_rill = max(ht,0.0)
+      h = 0.0
+
+  return state, h, h_rill, h_pre, h_rillPre
+
+
+
+## Former cell by cell water balance of the subsurface layer
+#
+#  @param bil water of the cell before the percolation [m]
+#  @return percolation, h, exfiltration
+def cell_subsurface(bil, dt, L_sub, Ks, vg_l, vg_m):
+  if (bil > L_sub):
+    S = 1.0
+  else:
+    S = bil/L_sub
+
+  perc = Ks*darcy.relative_unsat_conductivity(S,vg_l,vg_m)*dt
+  if (perc > bil):
+    perc = bil
+  bil -= perc
+
+  if (bil > L_sub):
+    exfilt = bil-L_sub
+    bil = L_sub
+  else:
+    exfilt = 0.0
+
+  return perc, bil, exfilt
+
+
+
+## Former cell by cell Darcy outflow of the subsurface layer
+#
+#  @return V_runoff, V_rest
+def cell_subsurface_runoff(h, Ks, efect_vrst, slope, dt, pixel_area):
+  q = Ks*h*efect_vrst*slope
+  return dt*q, h*pixel_area - dt*q
+
+
+
+## Former adjustment of the rill sub-steps of one cell
+def cell_ratio(ratio, rill_courant, maxratio):
+  if rill_courant < 0.1 and ratio > 1:
+    ratio -= 1
+  if ratio > maxratio:
+    ratio = maxratio
+  return ratio
+
+
+
+## Rainfall of the time step integrated record by record
+#
+#  @param times, depth cumulative rainfall records of the cell
+def cell_rainfall(times, depth, total_time, delta_t):
+  rainfall = 0.0
+  end_time = total_time + delta_t
+  for k in range(len(times)-1):
+    overlap = min(times[k+1], end_time) - max(times[k], total_time)
+    if overlap > 0.0:
+      rainfall += (depth[k+1] - depth[k])/(times[k+1] - times[k])*overlap
+  return rainfall
+
+
+
+## Differences of one variable
+class Difference():
+
+  def __init__(self):
+    self.max_abs = 0.0
+    self.max_rel = 0.0
+    self.n = 0
+    self.n_failed = 0
+
+
+  ## Adds the compared values
+  def add(self, fast, scalar, atol, rtol):
+    fast   = np.asarray(fast, float)
+    scalar = np.asarray(scalar, float)
+    diff = np.abs(fast - scalar)
+    ref  = np.abs(scalar)
+    if len(diff) == 0:
+      return
+    self.max_abs = max(self.max_abs, diff.max())
+    nonzero = ref > 0.0
+    if nonzero.any():
+      self.max_rel = max(self.max_rel, (diff[nonzero]/ref[nonzero]).max())
+    self.n += len(diff)
+    self.n_failed += int(np.count_nonzero(diff > atol + rtol*ref))
+
+
+
+## Compares the vectorized kernels with the scalar computation
+#
+#  the kernels are wrapped in the constructor and
+#  unwrapped after the given number of the time steps
+#
+class Verification():
+
+  ## the constructor
+  #
+  #  @param output output directory
+  #  @param surface main_src.main_classes.Surface.Surface
+  #  @param subsurface main_src.main_classes.Subsurface.Subsurface
+  #  @param courant main_src.courant.Courant
+  #  @param rain_src rainfall source of main_src.processes.rainfall.rainfall_source
+  #  @param G main_src.main_classes.General.Globals
+  #  @param steps number of the verified time steps
+  #  @param cells number of the sampled cells, 0 for all cells
+  #  @param atol absolute tolerance
+  #  @param rtol relative tolerance
+  def __init__(self, output, surface, subsurface, courant, rain_src, G, steps, cells=0, atol=1e-12, rtol=1e-9):
+    self.output = output
+    self.surface = surface
+    self.subsurface = subsurface
+    self.courant = courant
+    self.rain_src = rain_src
+    self.pixel_area = G.pixel_area
+    self.steps = int(steps)
+    self.atol = float(atol)
+    self.rtol = float(rtol)
+    self.n_steps = 0
+    ## names of the variables with the differences not accepted
+    self.failed = []
+
+    rows = surface.rows
+    cols = surface.cols
+    if cells > 0 and cells < len(rows):
+      sample = np.sort(np.random.RandomState(0).choice(len(rows), int(cells), replace=False))
+      rows = rows[sample]
+      cols = cols[sample]
+    self.rows = rows
+    self.cols = cols
+    self.cells = [surface.arr[i][j] for i, j in zip(rows.tolist(), cols.tolist())]
+
+    self.names = ['state', 'h', 'h_rill', 'h_pre', 'h_rillPre', 'inflow', 'reach_inflow',
+                  'percolation', 'sub_h', 'exfiltration', 'sub_V_runoff', 'sub_V_rest',
+                  'ratio', 'rainfall']
+    self.diffs = dict([(name_, Difference()) for name_ in self.names])
+
+    prt.message('Verification:')
+    prt.message('\t', self.steps, 'time steps,', len(self.rows), 'cells, atol', self.atol, 'rtol', self.rtol)
+
+    # cumulative rainfall records of the sampled cells, one record if the rainfall is uniform
+    if rain_src.distributed:
+      self.records = [rain_src.records(i,j) for i, j in zip(rows.tolist(), cols.tolist())]
+    else:
+      self.records = [rain_src.records(rows[0],cols[0])]
+
+    # the kernels are replaced by the instance attributes,
+    # the original kernels are kept in self.kernels
+    self.kernels = {}
+    self.wrapped = []
+    if surface.isRill:
+      self.__wrap(surface, 'update_states', self.__update_states)
+      self.__wrap(courant, 'courant', self.__courant)
+    if hasattr(surface, 'stream_reach'):
+      self.__wrap(surface, 'stream_cells_inflows', self.__stream_cells_inflows)
+    if hasattr(subsurface, 'field_rows'):
+      self.__wrap(subsurface, 'bilance', self.__bilance)
+      self.__wrap(subsurface, 'runoff', self.__subsurface_runoff)
+    self.__wrap(rain_src, 'timestep_rainfall', self.__timestep_rainfall)
+
+
+  ## Replaces the kernel obj.name_ by fce
+  def __wrap(self, obj, name_, fce):
+    self.kernels[name_] = getattr(obj, name_)
+    self.wrapped.append((obj, name_))
+    setattr(obj, name_, fce)
+
+
+  def __update_states(self):
+    pre = [(arr.state, arr.h, arr.h_total_pre, arr.h_crit, arr.h_rill, arr.h_rillPre, arr.h_pre)
+           for arr in self.cells]
+
+    self.kernels['update_states']()
+
+    scalar = zip(*[cell_state(*cell) for cell in pre])
+    for name_, values in zip(['state', 'h', 'h_rill', 'h_pre', 'h_rillPre'], scalar):
+      self.diffs[name_].add([getattr(arr,name_) for arr in self.cells], values, self.atol, self.rtol)
+
+
+  def __stream_cells_inflows(self, pixel_area):
+    reach = self.surface.reach
+    pre = reach.V_in_from_field.copy()
+
+    self.kernels['stream_cells_inflows'](pixel_area)
+
+    scalar = np.zeros(len(pre), float)
+    for i, j in zip(self.surface.stream_rows.tolist(), self.surface.stream_cols.tolist()):
+      scalar[int(self.surface.arr[i][j].state-1000)] += self.surface.arr[i][j].h*pixel_area
+    self.diffs['reach_inflow'].add(reach.V_in_from_field - pre, scalar, self.atol, self.rtol)
+
+
+  def __bilance(self, infilt, dt):
+    sub = self.subsurface
+    rows, cols = self.rows, self.cols
+    inflow = sub.route(sub.V_runoff_pre)[rows,cols]/self.pixel_area
+    bil = infilt[rows,cols] + sub.V_rest[rows,cols]/self.pixel_area + inflow
+
+    self.kernels['bilance'](infilt, dt)
+
+    scalar = zip(*[cell_subsurface(b, dt, sub.L_sub, sub.Ks, sub.vg_l, sub.vg_m) for b in bil])
+    for name_, fast, values in zip(['percolation', 'sub_h', 'exfiltration'],
+                                   [sub.percolation, sub.h, sub.exfiltration], scalar):
+      self.diffs[name_].add(fast[rows,cols], values, self.atol, self.rtol)
+
+
+  def __subsurface_runoff(self, delta_t, efect_vrst):
+    sub = self.subsurface
+
+    self.kernels['runoff'](delta_t, efect_vrst)
+
+    # the water of the stream cells flows into the reaches, see runoff_stream_cells
+    stream = set(zip(sub.stream_rows.tolist(), sub.stream_cols.tolist()))
+    cells = [(i, j) for i, j in zip(self.rows.tolist(), self.cols.tolist()) if (i, j) not in stream]
+    if not cells:
+      return
+    rows = [i for i, j in cells]
+    cols = [j for i, j in cells]
+    V_runoff, V_rest = zip(*[cell_subsurface_runoff(sub.h[i][j], sub.Ks, efect_vrst[i][j], sub.slope[i][j],
+                                                    delta_t, self.pixel_area) for i, j in cells])
+    self.diffs['sub_V_runoff'].add(sub.V_runoff[rows,cols], V_runoff, self.atol, self.rtol)
+    self.diffs['sub_V_rest'].add(sub.V_rest[rows,cols], V_rest, self.atol, self.rtol)
+
+
+  def __courant(self, rainfall, delta_t, efect_vrst, ratio, rill_courant):
+    rows, cols = self.rows, self.cols
+    pre = zip(ratio[rows,cols].tolist(), rill_courant[rows,cols].tolist())
+
+    result = self.kernels['courant'](rainfall, delta_t, efect_vrst, ratio, rill_courant)
+
+    scalar = [cell_ratio(r, c, self.courant.maxratio) for r, c in pre]
+    self.diffs['ratio'].add(ratio[rows,cols], scalar, self.atol, self.rtol)
+    return result
+
+
+  def __timestep_rainfall(self, total_time, delta_t):
+    rainfall = self.kernels['timestep_rainfall'](total_time, delta_t)
+
+    scalar = [cell_rainfall(times, depth, total_time, delta_t) for times, depth in self.records]
+    if self.rain_src.distributed:
+      fast = rainfall[self.rows,self.cols]
+    else:
+      fast = [rainfall]
+    self.diffs['rainfall'].add(fast, scalar, self.atol, self.rtol)
+    return rainfall
+
+
+  ## Compares the routing of the runoff of the previous time step
+  def __inflow(self):
+    surface = self.surface
+    V = np.zeros([surface.r, surface.c], float)
+    for i in surface.rr:
+      for j in surface.rc[i]:
+        V[i][j] = surface.arr[i][j].V_runoff_pre
+    fast = surface.route(V)[self.rows,self.cols]
+    scalar = [surface.cell_runoff(i,j,False) for i, j in zip(self.rows.tolist(), self.cols.tolist())]
+    self.diffs['inflow'].add(fast, scalar, self.atol, self.rtol)
+
+
+  ## Called after each accepted time step
+  #
+  #  @param time time at the end of the time step
+  def step(self, time):
+    if self.n_steps >= self.steps:
+      return
+    self.__inflow()
+    self.n_steps += 1
+    if self.n_steps == self.steps:
+      prt.message('Verification finished at', time, '[s]')
+      self.close()
+
+
+  ## Restores the kernels and writes the differences
+  #
+  #  the variables with the differences not accepted are stored in self.failed,
+  #  the computation is stopped in error after the outputs are closed
+  def close(self):
+    if self.surface is None:
+      return
+    for obj, name_ in self.wrapped:
+      setattr(obj, name_, self.kernels[name_])
+    self.surface = None
+
+    with open(self.output + os.sep + 'verification.dat', 'w') as f:
+      f.write('# verified time steps ' + str(self.n_steps) + ', atol ' + str(self.atol) + ', rtol ' + str(self.rtol) + '\n')
+      f.write('# variable;values;max_abs;max_rel;failed\n')
+      for name_ in self.names:
+        d = self.diffs[name_]
+        if d.n == 0:
+          continue
+        f.write(name_ + ';' + str(d.n) + ';' + str(d.max_abs) + ';' + str(d.max_rel) + ';' + str(d.n_failed) + '\n')
+        prt.message('\t', name_, 'max abs', d.max_abs, 'max rel', d.max_rel, 'failed', d.n_failed, 'of', d.n)
+        if d.n_failed > 0:
+          self.failed.append(name_)
+
+
+  ## Stops the computation if the differences are not accepted
+  def error(self):
+    if self.failed:
+      prt.error('Verification of the vectorized computation failed in', ', '.join(self.failed),
+                '\n\tthe differences are in', self.output + os.sep + 'verification.dat')
+
+
+
+## Empty class if the computation is not verified
+class VerificationPass():
+  failed = []
+  def step(self, time):
+    pass
+  def close(self):
+    pass
+  def error(self):
+    pass
+
+
+
+## Returns the verification of the computation
+#
+#  @param config main_src.config.Config
+#  @param output output directory
+#  @param surface main_src.main_classes.Surface.Surface
+#  @param subsurface main_src.main_classes.Subsurface.Subsurface
+#  @param courant main_src.courant.Courant
+#  @param rain_src rainfall source of main_src.processes.rainfall.rainfall_source
+#  @param G main_src.main_classes.General.Globals
+def verification(config, output, surface, subsurface, courant, rain_src, G):
+  if config.verify_steps is None or int(config.verify_steps) <= 0:
+    return VerificationPass()
+  return Verification(output, surface, subsurface, courant, rain_src, G, config.verify_steps,
+                      config.verify_cells, config.verify_atol, config.verify_rtol)
@@ -0,0 +1,91 @@
+## @package tests.test_calibration simulated discharge of main_src.calibration read from the computed hydrographs
+#
+#  A small benchmark catchment (main_src.tools.benchmark) is computed from the prepared data
+#  without the extra output, the records of the surface points then end with the separator.
+#
+
+import os
+import sys
+import numpy as np
+import pytest
+
+if sys.version_info[0] > 2:
+  pytest.skip('the computation runs in python 2', allow_module_level=True)
+
+import main_src.runoff                    as runoff
+import main_src.processes.rainfall        as rainfall
+import main_src.tools.save_load_data      as sld
+from   main_src.config                import Config
+from   main_src.calibration           import load_simulated, metrics, context_digest
+from   main_src.tools.benchmark       import catchment
+
+
+type_of_computing = 'shallowandrillsurface'
+
+
+
+## Computes the catchment and returns its output directory
+@pytest.fixture(scope='module')
+def output(tmpdir_factory):
+  dir_ = str(tmpdir_factory.mktemp('calibration'))
+  rainfall_file = dir_ + os.sep + 'rainfall.txt'
+  with open(rainfall_file, 'w') as f:
+    f.write('1 1\n1000 1000\n')
+  sr, itera = rainfall.load_precipitation(rainfall_file)
+
+  output = dir_ + os.sep + 'output'
+  indata = dir_ + os.sep + 'indata.save'
+  sld.save_data(catchment(12, 8, type_of_computing, sr, itera, output), indata)
+  runoff.run(Config(indata = indata, partial_computing = 'roff', output = output,
+                    type_of_computing = type_of_computing, end_time = 5.0,
+                    rainfall_file = rainfall_file, max_delta_t = 30.0))
+  return output
+
+
+
+def test_trailing_separator(output):
+  with open(output + os.sep + 'point000.dat') as f:
+    records = [line for line in f if not line.startswith('#')]
+  assert records and all([line.rstrip('\n').endswith(';') for line in records])
+
+
+
+def test_load_simulated(output):
+  times, sim = load_simulated(output, 'point000')
+  assert len(times) == len(sim) > 1
+  assert (np.diff(times) > 0.0).all()
+  assert sim.max() > 0.0
+
+
+
+def test_metrics(output):
+  times, sim = load_simulated(output, 'point000')
+  m = metrics(sim, sim)
+  assert m['nse'] == 1.0 and m['peak'] == 0.0
+  assert abs(m['kge'] - 1.0) < 1e-12
+
+  m = metrics(0.5*sim, sim)
+  assert m['nse'] < 1.0 and m['peak'] == -0.5
+
+
+
+def test_context_digest(tmpdir):
+  rainfall_file = str(tmpdir.join('rainfall.txt'))
+  with open(rainfall_file, 'w') as f:
+    f.write('1 1\n1000 1000\n')
+  config = Config(indata = rainfall_file, rainfall_file = rainfall_file, end_time = 5.0)
+  obs_times, obs = np.array([60.0, 120.0]), np.array([0.0, 1.0])
+  digest = context_digest(config, 'point000', obs_times, obs)
+
+  config.output = str(tmpdir)
+  config.progress_interval = 10.0
+  assert context_digest(config, 'point000', obs_times, obs) == digest
+
+  assert context_digest(config, 'point001', obs_times, obs) != digest
+  assert context_digest(config, 'point000', obs_times, 2.0*obs) != digest
+  config.end_time = 6.0
+  assert context_digest(config, 'point000', obs_times, obs) != digest
+  config.end_time = 5.0
+  with open(rainfall_file, 'w') as f:
+    f.write('1 2\n1000 2000\n')
+  assert context_digest(config, 'point000', obs_times, obs) != digest
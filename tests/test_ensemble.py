@@ -0,0 +1,87 @@
+## @package tests.test_ensemble members of main_src.ensemble computed together in one time loop
+#
+#  A small benchmark catchment (main_src.tools.benchmark) with the sheet flow only is computed
+#  in the outlet-only mode, the outlet hydrographs of the members computed together
+#  are compared with the members computed one after another by main_src.runoff.run.
+#
+
+import os
+import sys
+import numpy as np
+import pytest
+
+if sys.version_info[0] > 2:
+  pytest.skip('the computation runs in python 2', allow_module_level=True)
+
+import main_src.runoff                    as runoff
+import main_src.ensemble                  as ensemble
+import main_src.processes.rainfall        as rainfall
+import main_src.tools.save_load_data      as sld
+from   main_src.config                import Config
+from   main_src.tools.benchmark       import catchment
+
+
+type_of_computing = 'onlyshallowsurface'
+
+
+
+@pytest.fixture(scope='module')
+def indata(tmpdir_factory):
+  dir_ = str(tmpdir_factory.mktemp('ensemble'))
+  rainfall_file = dir_ + os.sep + 'rainfall.txt'
+  with open(rainfall_file, 'w') as f:
+    f.write('1 1\n1000 1000\n')
+  sr, itera = rainfall.load_precipitation(rainfall_file)
+
+  indata = dir_ + os.sep + 'indata.save'
+  sld.save_data(catchment(12, 8, type_of_computing, sr, itera, dir_ + os.sep + 'output'), indata)
+  return indata, rainfall_file
+
+
+def config(indata, output):
+  config = Config(indata = indata[0], partial_computing = 'roff', output = output,
+                  type_of_computing = type_of_computing, end_time = 5.0,
+                  rainfall_file = indata[1], max_delta_t = 30.0)
+  config.outlet_only = True
+  return config
+
+
+def outlets(output, member):
+  return np.loadtxt(output + os.sep + member.name + os.sep + 'outlets.dat', delimiter=';')
+
+
+
+def test_together(indata):
+  assert ensemble.together(config(indata, None), sld.load_data(indata[0]))
+  c = config(indata, None)
+  c.outlet_only = False
+  assert not ensemble.together(c, sld.load_data(indata[0]))
+
+
+
+def test_one_member(indata, tmpdir):
+  member = ensemble.Member('base', surface_retention = 2.0, k = 0.5, s = 0.8, n = 1.2, rainfall = 1.3)
+  ensemble.run(config(indata, str(tmpdir.join('together'))), [member])
+  runoff.run(member.configure(config(indata, str(tmpdir.join('sequential')))), None, member)
+
+  together = outlets(str(tmpdir.join('together')), member)
+  sequential = outlets(str(tmpdir.join('sequential')), member)
+  assert together.shape == sequential.shape
+  assert (together == sequential).all()
+
+
+
+def test_members(indata, tmpdir):
+  members = [ensemble.Member('base'), ensemble.Member('wet', rainfall = 1.5), ensemble.Member('dry', k = 2.0, s = 2.0)]
+  output = str(tmpdir.join('together'))
+  ensemble.run(config(indata, output), members)
+
+  # the common time step
+  times = [outlets(output, member)[:,0] for member in members]
+  assert (times[0] == times[1]).all() and (times[0] == times[2]).all()
+
+  volume = [(outlets(output, member)[:,1]*outlets(output, member)[:,-1]).sum() for member in members]
+  assert volume[1] > volume[0] > volume[2]
+
+  with open(output + os.sep + 'ensemble.txt') as f:
+    assert len([line for line in f if not line.startswith('#')]) == len(members)
@@ -0,0 +1,45 @@
+## @package tests.test_estimate time steps of main_src.estimate against the computation
+#
+#  A small benchmark catchment (main_src.tools.benchmark) is computed, the number of its time steps
+#  is the number of the records of the surface point without the initial one.
+#
+
+import os
+import sys
+import pytest
+
+if sys.version_info[0] > 2:
+  pytest.skip('the computation runs in python 2', allow_module_level=True)
+
+import main_src.runoff                    as runoff
+import main_src.processes.rainfall        as rainfall
+import main_src.tools.save_load_data      as sld
+from   main_src.config                import Config
+from   main_src.estimate              import estimate
+from   main_src.tools.benchmark       import catchment
+
+
+
+@pytest.mark.parametrize('type_of_computing', ['onlyshallowsurface', 'shallowandrillsurface'])
+def test_steps(tmpdir, type_of_computing):
+  rainfall_file = str(tmpdir.join('rainfall.txt'))
+  with open(rainfall_file, 'w') as f:
+    f.write('1 1\n1000 1000\n')
+  sr, itera = rainfall.load_precipitation(rainfall_file)
+
+  output = str(tmpdir.join('output'))
+  indata = str(tmpdir.join('indata.save'))
+  sld.save_data(catchment(12, 8, type_of_computing, sr, itera, output), indata)
+
+  def config():
+    return Config(indata = indata, partial_computing = 'roff', output = output,
+                  type_of_computing = type_of_computing, end_time = 5.0,
+                  rainfall_file = rainfall_file, max_delta_t = 30.0)
+
+  e = estimate(config())
+  runoff.run(config())
+  with open(output + os.sep + 'point000.dat') as f:
+    steps = len([line for line in f if not line.startswith('#')]) - 1
+
+  assert 0 < e.steps_min <= steps <= e.steps_max
+  assert e.time_min <= e.time_max
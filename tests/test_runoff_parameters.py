@@ -0,0 +1,137 @@
+## @package tests.test_runoff_parameters comparison of main_src.tools.runoff_parameters with the loop version
+#
+#  The reference functions are the former cell by cell loops of
+#  main_src.data_preparation.prepare_data, the array functions have to give
+#  the same values bit by bit, including NoDataValue, zero slope and b = 1.
+#
+
+import numpy as np
+
+from main_src.tools.runoff_parameters import parameter_a, critical_level
+
+
+NoDataValue = -9999.0
+
+
+
+## Former loop of the parameters a and aa
+def loop_parameter_a(mat_slope, mat_x, mat_y, mat_n, NoDataValue):
+  rows, cols = mat_slope.shape
+  mat_a = np.zeros([rows,cols],float)
+  mat_aa = np.zeros([rows,cols],float)
+  for i in range(rows):
+    for j in range(cols):
+      slope = mat_slope[i][j]
+      par_x = mat_x[i][j]
+      par_y = mat_y[i][j]
+
+      if par_x == NoDataValue or par_y ==NoDataValue or slope == NoDataValue:
+          par_a = NoDataValue
+          par_aa = NoDataValue
+
+      elif par_x == NoDataValue or par_y ==NoDataValue or slope == 0.0:
+          par_a = 0.0001
+          par_aa = par_a / 100 / mat_n[i][j]
+
+      else:
+          exp = np.power(slope, par_y)
+          par_a = par_x * exp
+          par_aa = par_a / 100 / mat_n[i][j]
+
+      mat_a[i][j] = par_a
+      mat_aa [i][j] = par_aa
+  return mat_a, mat_aa
+
+
+
+## Former loop of the critical water level
+def loop_critical_level(mat_slope, mat_tau, mat_v, mat_b, mat_aa, NoDataValue):
+  rows, cols = mat_slope.shape
+  mat_hcrit_tau = np.zeros([rows,cols],float)
+  mat_hcrit_v = np.zeros([rows,cols],float)
+  mat_hcrit_flux = np.zeros([rows,cols],float)
+  mat_hcrit = np.zeros([rows,cols],float)
+  for i in range(rows):
+      for j in range(cols):
+          if mat_slope[i][j] != NoDataValue and mat_tau[i][j] != NoDataValue:
+              slope = mat_slope[i][j]
+              tau_crit = mat_tau[i][j]
+              v_crit = mat_v[i][j]
+              b = mat_b[i][j]
+              aa = mat_aa[i][j]
+              flux_crit = tau_crit * v_crit
+              exp = 1/(b - 1)
+
+              if slope == 0.0:
+                  hcrit_tau = hcrit_v = hcrit_flux = 1000
+
+              else:
+                  hcrit_v = np.power((v_crit/aa),exp)
+                  hcrit_tau = tau_crit / 98.07 / slope
+                  hcrit_flux = np.power((flux_crit/slope/98.07/aa),(1 / mat_b[i][j]))
+
+              mat_hcrit_tau[i][j] = hcrit_tau
+              mat_hcrit_v[i][j] = hcrit_v
+              mat_hcrit_flux[i][j] = hcrit_flux
+              hcrit = min (hcrit_tau, hcrit_v, hcrit_flux)
+              mat_hcrit[i][j] = hcrit
+          else:
+              mat_hcrit_tau[i][j] = NoDataValue
+              mat_hcrit_v[i][j] = NoDataValue
+              mat_hcrit_flux[i][j] = NoDataValue
+              mat_hcrit[i][j] = NoDataValue
+  return mat_hcrit_tau, mat_hcrit_v, mat_hcrit_flux, mat_hcrit
+
+
+
+## Random fields with NoDataValue, zero slope and b = 1
+def fields(seed, rows=23, cols=17):
+  rnd = np.random.RandomState(seed)
+  shape = [rows,cols]
+  mat_slope = rnd.uniform(0.0, 0.5, shape)
+  mat_slope[rnd.rand(rows,cols) < 0.1] = 0.0
+  mat_x   = rnd.uniform(5.0, 15.0, shape)
+  mat_y   = rnd.uniform(0.2, 0.6, shape)
+  mat_n   = rnd.uniform(0.01, 0.3, shape)
+  mat_tau = rnd.uniform(5.0, 30.0, shape)
+  mat_v   = rnd.uniform(0.1, 0.5, shape)
+  mat_b   = rnd.uniform(1.2, 2.0, shape)
+  mat_b[rnd.rand(rows,cols) < 0.05] = 1.0
+  for mat in [mat_slope, mat_x, mat_y, mat_tau]:
+    mat[rnd.rand(rows,cols) < 0.05] = NoDataValue
+  return mat_slope, mat_x, mat_y, mat_n, mat_tau, mat_v, mat_b
+
+
+
+def assert_same(result, reference):
+  assert len(result) == len(reference)
+  for mat, ref in zip(result, reference):
+    np.testing.assert_array_equal(mat, ref)
+
+
+
+def test_parameter_a():
+  for seed in range(5):
+    mat_slope, mat_x, mat_y, mat_n, mat_tau, mat_v, mat_b = fields(seed)
+    with np.errstate(all='ignore'):
+      reference = loop_parameter_a(mat_slope, mat_x, mat_y, mat_n, NoDataValue)
+    assert_same(parameter_a(mat_slope, mat_x, mat_y, mat_n, NoDataValue), reference)
+
+
+
+def test_critical_level():
+  for seed in range(5):
+    mat_slope, mat_x, mat_y, mat_n, mat_tau, mat_v, mat_b = fields(seed)
+    with np.errstate(all='ignore'):
+      mat_a, mat_aa = loop_parameter_a(mat_slope, mat_x, mat_y, mat_n, NoDataValue)
+      reference = loop_critical_level(mat_slope, mat_tau, mat_v, mat_b, mat_aa, NoDataValue)
+    assert_same(critical_level(mat_slope, mat_tau, mat_v, mat_b, mat_aa, NoDataValue), reference)
+
+
+
+def test_no_data():
+  mat = np.zeros([2,2]) + NoDataValue
+  mat_a, mat_aa = parameter_a(mat, mat, mat, mat, NoDataValue)
+  assert (mat_a == NoDataValue).all() and (mat_aa == NoDataValue).all()
+  for result in critical_level(mat, mat, mat, mat, mat, NoDataValue):
+    assert (result == NoDataValue).all()